@@ -0,0 +1,190 @@
+"""
+Headless batch checks for the Personal Domain Health Monitor
+
+Usage:
+    python -m domain_monitor check --input urls.txt --concurrency 200 --format jsonl
+"""
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+
+from domain_monitor import DomainMonitor
+from result_buffer import ResultBuffer
+
+logger = logging.getLogger(__name__)
+
+def read_urls(path):
+    """
+    Read URLs from a file, one per line
+
+    Blank lines and lines starting with '#' are skipped.
+
+    Args:
+        path (str): File path, or '-' for standard input
+
+    Returns:
+        list: URLs in file order
+    """
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, or None if it is empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def format_result(result, output_format):
+    """Render one check result as a line of output"""
+    if output_format == 'jsonl':
+        return json.dumps(result, default=str)
+
+    status = 'UP' if result['is_up'] else 'DOWN'
+    response_time = f"{result['response_time']:.0f}ms" if result.get('response_time') is not None else '-'
+    line = f"{status:<4} {result.get('status_code') or '-':>3} {response_time:>8}  {result['url']}"
+    if result.get('error'):
+        line += f"  ({result['error']})"
+    return line
+
+def summarize(results, wall_time):
+    """
+    Build the throughput summary for a batch
+
+    Args:
+        results (list): Check results
+        wall_time (float): Seconds the batch took
+
+    Returns:
+        dict: Counts, checks per second and p50/p95 latency in ms
+    """
+    latencies = [result['response_time'] for result in results if result.get('response_time') is not None]
+    durations = [result['check_duration'] for result in results if result.get('check_duration') is not None]
+    return {
+        'checks': len(results),
+        'up': sum(1 for result in results if result['is_up']),
+        'down': sum(1 for result in results if not result['is_up']),
+        'wall_time_seconds': round(wall_time, 3),
+        'checks_per_second': round(len(results) / wall_time, 2) if wall_time > 0 else None,
+        'latency_p50_ms': percentile(latencies, 0.50),
+        'latency_p95_ms': percentile(latencies, 0.95),
+        'check_duration_p50_ms': percentile(durations, 0.50),
+        'check_duration_p95_ms': percentile(durations, 0.95)
+    }
+
+def run_check(args):
+    """
+    Run the 'check' command
+
+    Returns:
+        int: Exit status: 0 if every site is up, 1 if any is down, 2 on bad input
+    """
+    try:
+        urls = read_urls(args.input)
+    except OSError as e:
+        print(f"Cannot read {args.input}: {str(e)}", file=sys.stderr)
+        return 2
+    if not urls:
+        print("No URLs to check", file=sys.stderr)
+        return 2
+
+    websites = [
+        {'id': index, 'url': url, 'check_ssl': not args.no_ssl, 'check_security': not args.no_security}
+        for index, url in enumerate(urls)
+    ]
+
+    data_manager = None
+    registered = {}
+    if args.db:
+        # Only needed when storing, so plain runs never touch a database
+        from data_manager import DataManager
+        from website_manager import WebsiteManager
+
+        data_manager = DataManager(args.db)
+        data_manager.initialize_database()
+        data_manager.start_writer()
+        registered = {website['url'].rstrip('/'): website['id']
+                      for website in WebsiteManager(data_manager).get_all_websites()}
+        unregistered = [url for url in urls if url.rstrip('/') not in registered]
+        if unregistered:
+            logger.warning(f"{len(unregistered)} URLs are not registered websites; their results won't be stored")
+
+    domain_monitor = DomainMonitor(
+        timeout=args.timeout,
+        retry_attempts=args.retries + 1,
+        pool_maxsize=args.concurrency
+    )
+    results = []
+    output = sys.stdout
+    results_buffer = ResultBuffer(data_manager) if data_manager is not None else None
+
+    def handle_result(website, result):
+        results.append(result)
+        output.write(format_result(result, args.format) + '\n')
+        output.flush()
+        website_id = registered.get(website['url'].rstrip('/'))
+        if results_buffer is not None and website_id is not None:
+            results_buffer.add(website_id, result)
+
+    start_time = time.monotonic()
+    asyncio.run(domain_monitor.check_many_async(
+        websites,
+        concurrency=args.concurrency,
+        on_result=handle_result,
+        deadline=args.deadline
+    ))
+    summary = summarize(results, time.monotonic() - start_time)
+    domain_monitor.sessions.close()
+    if data_manager is not None:
+        results_buffer.close()
+        data_manager.stop_writer()
+
+    # The summary goes to stderr so stdout stays pure results for piping
+    if args.format == 'jsonl':
+        print(json.dumps({'summary': summary}), file=sys.stderr)
+    else:
+        print(f"Checked {summary['checks']} of {len(urls)} URLs in {summary['wall_time_seconds']}s "
+              f"({summary['checks_per_second']} checks/s): {summary['up']} up, {summary['down']} down",
+              file=sys.stderr)
+        print(f"Latency p50 {summary['latency_p50_ms']} ms, p95 {summary['latency_p95_ms']} ms; "
+              f"check time p50 {summary['check_duration_p50_ms']} ms, p95 {summary['check_duration_p95_ms']} ms",
+              file=sys.stderr)
+
+    if summary['checks'] < len(urls):
+        return 1
+    return 0 if summary['down'] == 0 else 1
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(prog='python -m domain_monitor',
+                                     description='Personal Domain Health Monitor batch checks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help='check a list of URLs once and exit')
+    check.add_argument('--input', '-i', required=True, help="file with one URL per line, or '-' for stdin")
+    check.add_argument('--concurrency', '-c', type=int, default=20, help='checks in flight at once (default 20)')
+    check.add_argument('--format', '-f', choices=['jsonl', 'text'], default='text', help='output format (default text)')
+    check.add_argument('--timeout', type=int, default=10, help='per-request timeout in seconds (default 10)')
+    check.add_argument('--retries', type=int, default=1, help='retries for failed connections (default 1)')
+    check.add_argument('--deadline', type=float, default=None, help='abandon checks still running after this many seconds')
+    check.add_argument('--no-ssl', action='store_true', help='skip SSL certificate checks')
+    check.add_argument('--no-security', action='store_true', help='skip security header checks')
+    check.add_argument('--db', help='also store results for registered websites in this database')
+    check.add_argument('--verbose', '-v', action='store_true', help='log progress to stderr')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+
+    return run_check(args)
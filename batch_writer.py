@@ -0,0 +1,184 @@
+"""
+Batched database writer for the Personal Domain Health Monitor
+"""
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class BatchWriter:
+    """
+    Runs database writes on a single thread, many to a transaction.
+
+    Writes queue up and are committed together once ``batch_rows`` of them
+    are waiting or ``batch_ms`` after the first one arrived, whichever comes
+    first, so a full check costs a handful of commits (and fsyncs) instead of
+    several per result. Each write runs inside its own savepoint: one that
+    fails is rolled back alone and the rest of its batch still commits.
+
+    submit() returns a Future that completes when the write is committed, or
+    fails with the write's exception.
+    """
+
+    def __init__(self, connect, batch_ms=50, batch_rows=500):
+        """
+        Args:
+            connect (callable): Returns the sqlite3 connection to write on;
+                called on the writer thread
+            batch_ms (int): Longest a write waits for others to share its commit
+            batch_rows (int): Most writes committed in one transaction
+        """
+        self.connect = connect
+        self.batch_seconds = max(0, batch_ms) / 1000
+        self.batch_rows = max(1, int(batch_rows))
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.errors = 0
+        self.largest_batch = 0
+
+    def start(self):
+        """Start the writer thread"""
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        logger.info(f"Database writer started (batches of up to {self.batch_rows} writes "
+                    f"every {self.batch_seconds * 1000:.0f}ms)")
+
+    def stop(self, timeout=30):
+        """Commit everything queued so far, then stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Database writer did not stop; {self._queue.qsize()} writes may be lost")
+        self._thread = None
+
+    def submit(self, operation, *args):
+        """
+        Queue a write
+
+        Args:
+            operation (callable): Called as operation(cursor, *args) on the
+                writer thread, inside the batch's transaction; must not commit
+            *args: Arguments for operation
+
+        Returns:
+            Future: Completes with operation's return value once committed
+        """
+        future = Future()
+        self._queue.put((future, operation, args))
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Wait until every write queued so far is committed
+
+        Args:
+            timeout (float, optional): Seconds to wait
+
+        Returns:
+            bool: True if the writes were committed in time
+        """
+        try:
+            self.submit(lambda cursor: None).result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def backlog(self):
+        """Number of writes waiting for the writer thread"""
+        return self._queue.qsize()
+
+    def _run(self):
+        conn = self.connect()
+        stopping = False
+
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            # Gather more writes until the batch is full or its time is up
+            batch = [item]
+            commit_at = time.monotonic() + self.batch_seconds
+            while len(batch) < self.batch_rows:
+                try:
+                    item = self._queue.get(timeout=max(0, commit_at - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(conn, batch)
+
+        try:
+            # Fold the WAL back into the database so it starts small next time
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except Exception as e:
+            logger.warning(f"Final WAL checkpoint failed: {str(e)}")
+        logger.info(f"Database writer stopped after {self.writes} writes in {self.batches} batches")
+
+    def _write(self, conn, batch):
+        """Run one batch of writes in a single transaction"""
+        cursor = conn.cursor()
+        outcomes = []
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for future, operation, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT write")
+                try:
+                    outcomes.append((future, operation(cursor, *args), None))
+                    cursor.execute("RELEASE write")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write")
+                    cursor.execute("RELEASE write")
+                    logger.error(f"Database write failed: {str(e)}")
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Database error committing {len(batch)} writes: {str(e)}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            for future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            with self._lock:
+                self.errors += len(batch)
+            return
+
+        with self._lock:
+            self.batches += 1
+            self.writes += len(outcomes)
+            self.errors += sum(1 for _, _, error in outcomes if error is not None)
+            self.largest_batch = max(self.largest_batch, len(outcomes))
+
+        for future, value, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+
+    def get_stats(self):
+        """Return writer counters"""
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'writes': self.writes,
+                'errors': self.errors,
+                'largest_batch': self.largest_batch,
+                'backlog': self._queue.qsize()
+            }
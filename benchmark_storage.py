@@ -0,0 +1,99 @@
+"""
+Check result storage benchmark for the Personal Domain Health Monitor
+
+Usage:
+    python benchmark_storage.py --rows 10000 --sites 1000
+    python benchmark_storage.py --rows 20000 --sites 2000 --down 0.5   # many incident transitions
+"""
+import os
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+
+from data_manager import DataManager
+
+def make_results(rows, sites, down_fraction):
+    """Build (website_id, result) pairs that look like successive check cycles"""
+    results = []
+    for index in range(rows):
+        is_up = random.random() >= down_fraction
+        results.append((index % sites + 1, {
+            'url': f"https://site{index % sites + 1}.example",
+            'timestamp': datetime.now().isoformat(),
+            'is_up': is_up,
+            'status_code': 200 if is_up else 503,
+            'response_time': round(random.uniform(20, 800), 2),
+            'ssl_valid': True,
+            'ssl_days_remaining': 60,
+            'security_score': 80,
+            'dns_time': 1.2,
+            'connect_time': 10.5,
+            'tls_time': 20.1,
+            'ttfb': 50.3,
+            'download_time': 4.4,
+            'retry_count': 0
+        }))
+    return results
+
+def new_database(directory, name, sites):
+    """Create a database with the given number of websites"""
+    data_manager = DataManager(os.path.join(directory, name))
+    data_manager.initialize_database()
+    conn = data_manager._get_connection()
+    conn.executemany("INSERT INTO websites (name, url) VALUES (?, ?)",
+                     [(f"site{i}", f"https://site{i}.example") for i in range(1, sites + 1)])
+    conn.commit()
+    return data_manager
+
+def bench(label, data_manager, store, results):
+    """Time one storage method and check every row arrived"""
+    start_time = time.perf_counter()
+    store(data_manager, results)
+    elapsed = time.perf_counter() - start_time
+
+    stored = data_manager._get_cursor().execute("SELECT COUNT(*) FROM check_results").fetchone()[0]
+    print(f"{label:<28} {elapsed:8.3f}s  {len(results) / elapsed:10.0f} rows/s  ({stored} stored)")
+    data_manager.close()
+    return elapsed
+
+def store_one_by_one(data_manager, results):
+    for website_id, result in results:
+        data_manager.store_check_result(website_id, result)
+
+def store_with_writer(data_manager, results):
+    data_manager.start_writer()
+    for website_id, result in results:
+        data_manager.store_check_result(website_id, result)
+    data_manager.stop_writer()
+
+def store_bulk(data_manager, results):
+    data_manager.store_check_results_bulk(results).result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare check result storage methods')
+    parser.add_argument('--rows', type=int, default=10000, help='results to store (default 10000)')
+    parser.add_argument('--sites', type=int, default=1000, help='websites the results belong to (default 1000)')
+    parser.add_argument('--down', type=float, default=0.05, help='fraction of results that are down (default 0.05)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    results = make_results(args.rows, args.sites, args.down)
+    directory = tempfile.mkdtemp(prefix='domain-monitor-bench-')
+    try:
+        print(f"Storing {args.rows} results for {args.sites} websites")
+        single = bench('store_check_result', new_database(directory, 'single.db', args.sites),
+                       store_one_by_one, results)
+        writer = bench('store_check_result + writer', new_database(directory, 'writer.db', args.sites),
+                       store_with_writer, results)
+        bulk = bench('store_check_results_bulk', new_database(directory, 'bulk.db', args.sites),
+                     store_bulk, results)
+        print(f"Speed-up over one by one: writer {single / writer:.1f}x, bulk {single / bulk:.1f}x")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Expiry-aware TLS certificate cache for the Personal Domain Health Monitor
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import OpenSSL.crypto as crypto
+
+logger = logging.getLogger(__name__)
+
+
+def parse_certificate(der):
+    """
+    Parse a DER-encoded certificate into the fields the monitor uses
+
+    Args:
+        der (bytes): DER-encoded certificate
+
+    Returns:
+        dict: serial number, validity, issuer, subject and SANs
+    """
+    x509 = crypto.load_certificate(crypto.FILETYPE_ASN1, der)
+    issuer = x509.get_issuer()
+    subject = x509.get_subject()
+
+    san_list = []
+    for i in range(x509.get_extension_count()):
+        ext = x509.get_extension(i)
+        if ext.get_short_name() == b'subjectAltName':
+            # Parse SANs (format: "DNS:example.com, DNS:www.example.com")
+            for san in str(ext).split(', '):
+                if san.startswith('DNS:'):
+                    san_list.append(san[4:])
+
+    return {
+        'serial_number': format(x509.get_serial_number(), 'x'),
+        'version': x509.get_version(),
+        'not_before': datetime.strptime(x509.get_notBefore().decode('utf-8'), "%Y%m%d%H%M%SZ"),
+        'not_after': datetime.strptime(x509.get_notAfter().decode('utf-8'), "%Y%m%d%H%M%SZ"),
+        'issuer': {
+            'organization': issuer.O,
+            'common_name': issuer.CN,
+            'country': issuer.C
+        },
+        'subject': {
+            'organization': subject.O,
+            'common_name': subject.CN,
+            'country': subject.C
+        },
+        'subject_alt_names': san_list
+    }
+
+
+class CertificateCache:
+    """
+    Caches peer certificates by (host, port).
+
+    An entry is served until it is older than ``ttl`` or the certificate is
+    within ``refresh_days`` of expiring, after which callers are expected to
+    fetch a fresh one. Storing a certificate whose serial number differs from
+    the cached one replaces the entry. When a DataManager is given, entries are
+    persisted so a restart doesn't trigger a handshake for every site.
+    """
+
+    def __init__(self, data_manager=None, ttl=timedelta(hours=6), refresh_days=14):
+        self.data_manager = data_manager
+        self.ttl = ttl
+        self.refresh_days = refresh_days
+        self._lock = threading.Lock()
+        self._entries = None
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self):
+        """Load persisted certificates on first use"""
+        if self._entries is not None:
+            return
+
+        entries = {}
+        if self.data_manager is not None:
+            try:
+                for row in self.data_manager.get_ssl_certificates():
+                    entry = self._build_entry(row['der'], datetime.fromisoformat(row['fetched_at']))
+                    entry['persisted_at'] = entry['fetched_at']
+                    entries[(row['host'], row['port'])] = entry
+            except Exception as e:
+                logger.error(f"Error loading cached SSL certificates: {str(e)}")
+        self._entries = entries
+
+    def _build_entry(self, der, fetched_at):
+        entry = parse_certificate(der)
+        entry['der'] = bytes(der)
+        entry['fetched_at'] = fetched_at
+        return entry
+
+    def is_fresh(self, entry, now=None):
+        """Check whether an entry can be served without a new handshake"""
+        now = now or datetime.now()
+        if now - entry['fetched_at'] > self.ttl:
+            return False
+        # Force a refresh as expiry approaches so renewals are noticed quickly
+        return entry['not_after'] - now > timedelta(days=self.refresh_days)
+
+    def get(self, host, port=443):
+        """
+        Get a fresh cached certificate
+
+        Returns:
+            dict or None: Cache entry, or None if missing or due for refresh
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get((host, port))
+            if entry is not None and self.is_fresh(entry):
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def store(self, host, port, der):
+        """
+        Cache a certificate seen on a live connection
+
+        Args:
+            host (str): Hostname
+            port (int): Port
+            der (bytes): DER-encoded certificate
+
+        Returns:
+            dict: The cache entry
+        """
+        now = datetime.now()
+        der = bytes(der)
+
+        with self._lock:
+            self._ensure_loaded()
+            previous = self._entries.get((host, port))
+            if previous is not None and previous['der'] == der:
+                # Same certificate seen again: just extend its freshness
+                entry = dict(previous, fetched_at=now)
+            else:
+                entry = self._build_entry(der, now)
+                entry['persisted_at'] = None
+                if previous is not None and previous['serial_number'] != entry['serial_number']:
+                    logger.info(f"Certificate for {host}:{port} changed "
+                                f"(serial {previous['serial_number']} -> {entry['serial_number']})")
+
+            persist = (self.data_manager is not None and
+                       (entry['persisted_at'] is None or now - entry['persisted_at'] > self.ttl / 2))
+            if persist:
+                entry['persisted_at'] = now
+            self._entries[(host, port)] = entry
+
+        if persist:
+            self.data_manager.store_ssl_certificate(
+                host, port, entry['serial_number'], entry['not_after'].isoformat(),
+                entry['der'], now.isoformat()
+            )
+
+        return entry
+
+    def invalidate(self, host, port=443):
+        """Drop a cached certificate so the next check performs a handshake"""
+        with self._lock:
+            self._ensure_loaded()
+            self._entries.pop((host, port), None)
+
+    def get_stats(self):
+        """Return cache statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries or {}),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,293 @@
+"""
+Bounded thread-pool fan-out for the Personal Domain Health Monitor
+"""
+import time
+import heapq
+import socket
+import logging
+import itertools
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+class _CheckJob:
+    """A single website check waiting for, or holding, a worker slot"""
+
+    def __init__(self, website, on_result, cycle, on_start=None):
+        self.website = website
+        self.on_result = on_result
+        self.on_start = on_start
+        self.cycle = cycle
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.attempts = 0
+        self.host_key = None
+
+
+class CheckPool:
+    """
+    Runs website checks on a fixed-size thread pool.
+
+    The pool enforces two limits: a global worker limit (the executor size) and
+    a per-host limit keyed by resolved IP address, so many subdomains served by
+    one origin are not all checked at the same moment. Jobs over the per-host
+    limit wait in a per-host queue instead of holding a worker.
+
+    A failed attempt doesn't sleep on its worker: it is handed to a timer
+    thread and resubmitted once its backoff has elapsed, so a flapping site
+    never delays the checks queued behind it.
+    """
+
+    def __init__(self, domain_monitor, max_workers=20, per_host_limit=4):
+        self.domain_monitor = domain_monitor
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='check')
+
+        self._lock = threading.Lock()
+        self._host_active = defaultdict(int)
+        self._host_pending = defaultdict(deque)
+        self._in_flight = 0
+        # Jobs submitted (or parked behind their host) that haven't started yet
+        self._queued = 0
+
+        # Retries waiting out their backoff, as (due, seq, job)
+        self._deferred = []
+        self._deferred_seq = itertools.count()
+        self._deferred_cond = threading.Condition()
+        self._timer_thread = None
+        self._stopping = False
+
+    def shutdown(self, wait=True):
+        """Stop the timer and worker threads"""
+        with self._deferred_cond:
+            self._stopping = True
+            self._deferred_cond.notify()
+        self.executor.shutdown(wait=wait)
+
+    def run_cycle(self, websites, on_result=None, deadline=None):
+        """
+        Check a batch of websites and wait for all of them to finish
+
+        With a deadline, checks that haven't started when it passes are
+        dropped and the call returns; checks already running finish in the
+        background and still report through on_result.
+
+        Args:
+            websites (list): Website dicts with 'url' and optional 'check_ssl'/'check_security',
+                in the order they should be started
+            on_result (callable, optional): Called as on_result(website, result)
+                from a worker thread as each check completes
+            deadline (float, optional): Seconds the cycle may take
+
+        Returns:
+            dict: Cycle statistics (wall time, peak in-flight checks, queue wait,
+                and the checks dropped or still running at the deadline)
+        """
+        cycle = self._new_cycle(len(websites))
+        if not websites:
+            cycle['done'].set()
+
+        start_time = time.monotonic()
+        if deadline:
+            cycle['deadline'] = start_time + deadline
+        for website in websites:
+            self._enqueue(_CheckJob(website, on_result, cycle))
+
+        finished = cycle['done'].wait(timeout=deadline or None)
+
+        with self._lock:
+            waits = list(cycle['queue_waits'])
+            unfinished = cycle['remaining'] - (len(websites) - cycle['started'])
+        if not finished:
+            logger.warning(f"Check cycle hit its {deadline}s deadline: "
+                           f"{len(websites) - cycle['started']} checks dropped, {unfinished} still running")
+        return {
+            'wall_time_seconds': round(time.monotonic() - start_time, 3),
+            'peak_in_flight': cycle['peak_in_flight'],
+            'avg_queue_wait_ms': round(sum(waits) / len(waits) * 1000, 2) if waits else 0,
+            'max_queue_wait_ms': round(max(waits) * 1000, 2) if waits else 0,
+            'retries': cycle['retries'],
+            'deadline_exceeded': not finished,
+            'dropped': len(websites) - cycle['started'] if not finished else 0,
+            'unfinished': unfinished if not finished else 0
+        }
+
+    def submit(self, website, on_result=None, on_done=None, on_start=None):
+        """
+        Queue a single website check without waiting for it
+        
+        Args:
+            website (dict): Website dict with 'url' and optional 'check_ssl'/'check_security'
+            on_result (callable, optional): Called as on_result(website, result) when the check completes
+            on_done (callable, optional): Called with no arguments once the check has
+                finished, including any retries, whether or not it succeeded
+            on_start (callable, optional): Called with no arguments when the check
+                first gets a worker
+        """
+        cycle = self._new_cycle(1, on_done=on_done)
+        self._enqueue(_CheckJob(website, on_result, cycle, on_start=on_start))
+
+    def backlog(self):
+        """Number of checks waiting for a worker or a per-host slot"""
+        with self._lock:
+            return self._queued
+
+    def get_stats(self):
+        """Return the current load on the pool"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'in_flight': self._in_flight,
+                'queued': self._queued
+            }
+
+    def _new_cycle(self, count, on_done=None):
+        """Bookkeeping shared by the jobs of one batch"""
+        return {
+            'remaining': count,
+            'started': 0,
+            'deadline': None,
+            'done': threading.Event(),
+            'on_done': on_done,
+            'peak_in_flight': 0,
+            'queue_waits': [],
+            'retries': 0
+        }
+
+    def _enqueue(self, job):
+        """Hand a job that hasn't started to the executor"""
+        with self._lock:
+            self._queued += 1
+        self.executor.submit(self._run, job)
+
+    def _host_key(self, url):
+        """Group checks by resolved IP, falling back to the hostname"""
+        hostname = urlparse(url).hostname or url
+        try:
+            return self.domain_monitor.resolver.resolve(hostname)
+        except (socket.error, UnicodeError):
+            return hostname
+
+    def _run(self, job):
+        """Worker entry point: take a per-host slot or park the job behind its host"""
+        if job.host_key is None:
+            job.host_key = self._host_key(job.website['url'])
+
+        cycle = job.cycle
+        with self._lock:
+            if (job.attempts == 0 and cycle['deadline'] is not None
+                    and time.monotonic() > cycle['deadline']):
+                # The cycle is over; don't start new checks for it
+                self._queued -= 1
+                expired = True
+            else:
+                expired = False
+                if self._host_active[job.host_key] >= self.per_host_limit:
+                    self._host_pending[job.host_key].append(job)
+                    return
+
+                self._queued -= 1
+                self._host_active[job.host_key] += 1
+                self._in_flight += 1
+                if job.attempts == 0:
+                    cycle['started'] += 1
+                cycle['peak_in_flight'] = max(cycle['peak_in_flight'], self._in_flight)
+                cycle['queue_waits'].append(time.monotonic() - job.enqueued_at)
+
+        if expired:
+            self._complete(cycle)
+            return
+
+        website = job.website
+        first_attempt = job.started_at is None
+        if first_attempt:
+            job.started_at = time.monotonic()
+        job.attempts += 1
+        done = True
+        try:
+            if first_attempt and job.on_start:
+                job.on_start()
+            result = self.domain_monitor.check_domain(
+                website['url'],
+                check_ssl=website.get('check_ssl', True),
+                check_security=website.get('check_security', True),
+                max_attempts=1
+            )
+            delay = self.domain_monitor.next_retry_delay(result, job.attempts, job.started_at)
+            if delay is not None:
+                done = False
+                self._defer(job, delay)
+            else:
+                self.domain_monitor.record_attempts(result, job.attempts, job.started_at)
+                if job.on_result:
+                    job.on_result(website, result)
+        except Exception as e:
+            logger.error(f"Error checking {website['url']}: {str(e)}")
+        finally:
+            self._finish(job, done=done)
+
+    def _defer(self, job, delay):
+        """Schedule a retry of the job after delay seconds"""
+        logger.debug(f"Retrying {job.website['url']} in {delay:.2f}s (attempt {job.attempts + 1})")
+        with self._deferred_cond:
+            heapq.heappush(self._deferred, (time.monotonic() + delay, next(self._deferred_seq), job))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._timer_loop, name='check-retry', daemon=True)
+                self._timer_thread.start()
+            self._deferred_cond.notify()
+
+    def _timer_loop(self):
+        """Resubmit deferred retries as their backoff elapses"""
+        while True:
+            with self._deferred_cond:
+                while not self._stopping:
+                    if self._deferred and self._deferred[0][0] <= time.monotonic():
+                        break
+                    timeout = self._deferred[0][0] - time.monotonic() if self._deferred else None
+                    self._deferred_cond.wait(timeout)
+                if self._stopping:
+                    return
+                job = heapq.heappop(self._deferred)[2]
+
+            job.enqueued_at = time.monotonic()
+            self._enqueue(job)
+
+    def _finish(self, job, done=True):
+        """Release the job's host slot and hand it to the next parked job"""
+        with self._lock:
+            self._host_active[job.host_key] -= 1
+            self._in_flight -= 1
+
+            pending = self._host_pending[job.host_key]
+            next_job = pending.popleft() if pending else None
+            if not pending:
+                self._host_pending.pop(job.host_key, None)
+            if not self._host_active[job.host_key]:
+                self._host_active.pop(job.host_key, None)
+
+            if not done:
+                job.cycle['retries'] += 1
+
+        if next_job is not None:
+            self.executor.submit(self._run, next_job)
+        if done:
+            self._complete(job.cycle)
+
+    def _complete(self, cycle):
+        """Count a finished (or dropped) job against its cycle"""
+        on_done = None
+        with self._lock:
+            cycle['remaining'] -= 1
+            if cycle['remaining'] <= 0:
+                cycle['done'].set()
+                on_done = cycle['on_done']
+
+        if on_done is not None:
+            try:
+                on_done()
+            except Exception as e:
+                logger.error(f"Error in check completion callback: {str(e)}")
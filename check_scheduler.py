@@ -0,0 +1,478 @@
+"""
+Per-website check scheduling for the Personal Domain Health Monitor
+"""
+import zlib
+import time
+import heapq
+import random
+import logging
+import itertools
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveIntervalPolicy:
+    """
+    Picks a site's check interval from its recent results.
+
+    A failing site (down, needing retries, or with an open incident) is
+    checked every ``confirmation_interval`` seconds until it has passed
+    ``recovery_checks`` checks in a row. A site that has passed
+    ``stable_after`` checks in a row has its interval multiplied by
+    ``backoff_factor`` for every further ``stable_after`` passes. The result
+    is clamped to the site's own min/max bounds, falling back to the policy's.
+    """
+
+    def __init__(self, confirmation_interval=30, stable_after=10, backoff_factor=1.5,
+                 min_interval=30, max_interval=3600, recovery_checks=3):
+        self.confirmation_interval = confirmation_interval
+        self.stable_after = max(1, int(stable_after))
+        self.backoff_factor = max(1.0, backoff_factor)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.recovery_checks = max(1, int(recovery_checks))
+
+    def bounds(self, website, base):
+        """
+        Get a site's interval bounds
+
+        Without per-site bounds the policy's are used, widened to include the
+        site's base interval so e.g. an hourly site isn't forced faster.
+
+        Returns:
+            tuple: (min seconds, max seconds)
+        """
+        low = website.get('min_check_interval_seconds') or min(self.min_interval, base)
+        high = website.get('max_check_interval_seconds') or max(self.max_interval, base)
+        return low, max(low, high)
+
+    def interval(self, website, base, streak=0, failing=False):
+        """
+        Get a site's current check interval
+
+        Args:
+            website (dict): Website dict
+            base (int): The site's configured interval in seconds
+            streak (int): Number of consecutive passing checks
+            failing (bool): Whether the site is on the confirmation schedule
+
+        Returns:
+            float: Interval in seconds
+        """
+        low, high = self.bounds(website, base)
+        if failing:
+            # Never slower than the site's normal schedule
+            interval = min(self.confirmation_interval, base)
+        elif streak < self.stable_after:
+            interval = base
+        else:
+            steps = min(streak // self.stable_after, 64)
+            interval = base * self.backoff_factor ** steps
+        return max(low, min(high, interval))
+
+    def update(self, state, result):
+        """
+        Fold a check result into a site's state
+
+        Args:
+            state (dict): 'streak' and 'failing', updated in place
+            result (dict): Check result
+        """
+        if not result['is_up'] or result.get('retry_count'):
+            state['streak'] = 0
+            state['failing'] = True
+        else:
+            state['streak'] += 1
+            if state['failing'] and state['streak'] >= self.recovery_checks:
+                state['failing'] = False
+
+
+class CheckScheduler:
+    """
+    Dispatches each website's check when it is due.
+
+    Next-due times live in a min-heap, so the scheduler thread sleeps until
+    the earliest one and only checks the sites whose own interval
+    (``check_interval_seconds`` on the website, else ``default_interval``)
+    has elapsed. Checks run on the CheckPool. The website list is reloaded
+    every ``reload_interval`` seconds to pick up added, edited and deleted
+    sites.
+
+    Each site is pinned to a phase within its interval derived from a stable
+    hash of its id, so checks are spread evenly over the interval instead of
+    all starting at once, and each site keeps the same slot across restarts.
+    An optional random delay of up to ``jitter`` seconds is added on top.
+
+    With an AdaptiveIntervalPolicy the interval also follows each site's
+    recent results: failing sites are rechecked quickly and long-stable
+    sites are checked less often. Sites with an open incident (as reported by
+    ``load_open_incidents`` on each reload) are treated as failing.
+
+    When a site's slot comes round while its previous check is still running
+    (an overrun), ``overrun_mode`` decides what happens: 'skip' drops the
+    slot, 'coalesce' runs one more check as soon as the running one ends.
+    When the scheduler falls behind (checks start more than ``max_lag``
+    seconds late, or a full pool's worth of checks is already queued),
+    low-priority sites give up their slot until the next one.
+
+    With WorkLeases, only the sites this instance holds leases on are
+    scheduled. The website list is then reloaded (and the leases reclaimed)
+    at least every third of the lease length, so sites given up to or taken
+    over from peer instances move promptly, and a site whose lease lapsed
+    between reloads is not checked.
+    """
+
+    def __init__(self, check_pool, load_websites, default_interval=300, on_result=None,
+                 on_summary=None, reload_interval=60, summary_interval=30, jitter=0,
+                 policy=None, load_open_incidents=None, overrun_mode='coalesce', max_lag=30,
+                 leases=None):
+        """
+        Args:
+            check_pool (CheckPool): Pool the checks run on
+            load_websites (callable): Returns the current list of website dicts
+            default_interval (int): Seconds between checks for sites without their own interval
+            on_result (callable, optional): Called as on_result(website, result) for every check
+            on_summary (callable, optional): Called with a summary dict every
+                summary_interval seconds when checks have completed
+            reload_interval (int): Seconds between website list reloads
+            summary_interval (int): Seconds between summaries
+            jitter (float): Maximum random delay added to each dispatch, in seconds
+            policy (AdaptiveIntervalPolicy, optional): Adapts intervals to recent results
+            load_open_incidents (callable, optional): Returns the ids of websites
+                with an open incident
+            overrun_mode (str): 'skip' or 'coalesce'
+            max_lag (float): Start lag in seconds past which low-priority sites are deferred
+            leases (WorkLeases, optional): Shares the sites with other checker instances
+        """
+        self.check_pool = check_pool
+        self.load_websites = load_websites
+        self.default_interval = max(1, int(default_interval))
+        self.on_result = on_result
+        self.on_summary = on_summary
+        self.reload_interval = reload_interval
+        self.summary_interval = summary_interval
+        self.jitter = max(0.0, jitter)
+        self.policy = policy
+        self.load_open_incidents = load_open_incidents
+        if overrun_mode not in ('skip', 'coalesce'):
+            logger.warning(f"Unknown overrun mode '{overrun_mode}', using 'coalesce'")
+            overrun_mode = 'coalesce'
+        self.overrun_mode = overrun_mode
+        self.max_lag = max_lag
+        self.leases = leases
+        if leases is not None:
+            self.reload_interval = min(reload_interval, leases.lease_seconds / 3)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # (due, seq, website_id); entries whose due no longer matches _due are stale.
+        # Times are wall-clock so phase slots line up across restarts.
+        self._heap = []
+        self._seq = itertools.count()
+        self._due = {}
+        self._slot = {}
+        self._websites = {}
+        self._in_flight = set()
+        # Sites to check again as soon as their running check ends (coalesced overruns)
+        self._rerun = set()
+        self._status = {}
+        # website_id -> {'streak', 'failing'} for the adaptive policy
+        self._health = {}
+
+        self.dispatched = 0
+        self.overruns = 0
+        self.coalesced = 0
+        self.deferred = 0
+        self._checked_since_summary = 0
+        # Seconds between each check's due time and the moment it got a worker
+        self._lags = []
+        self._last_lag = 0.0
+
+    def base_interval(self, website):
+        """Get a website's configured check interval in seconds"""
+        return max(1, int(website.get('check_interval_seconds') or self.default_interval))
+
+    def interval_for(self, website):
+        """Get a website's current check interval in seconds"""
+        base = self.base_interval(website)
+        if self.policy is None:
+            return base
+        state = self._health.get(website['id']) or {'streak': 0, 'failing': False}
+        return max(1, int(self.policy.interval(website, base, **state)))
+
+    def phase_offset(self, website):
+        """Get a site's stable offset within its interval, in seconds"""
+        return zlib.crc32(str(website['id']).encode('utf-8')) / 2 ** 32 * self.interval_for(website)
+
+    def next_slot(self, website, after):
+        """
+        Get a site's first phase slot strictly after a point in time
+
+        Args:
+            website (dict): Website dict
+            after (float): Unix timestamp
+
+        Returns:
+            float: Unix timestamp of the slot
+        """
+        interval = self.interval_for(website)
+        offset = self.phase_offset(website)
+        return ((after - offset) // interval + 1) * interval + offset
+
+    def start(self, first_check_now=False, initial_status=None):
+        """
+        Load the websites and start the scheduler thread
+
+        Args:
+            first_check_now (bool): Check every site immediately instead of one
+                interval from now (e.g. when no initial sweep was run)
+            initial_status (dict, optional): website_id -> is_up from an initial
+                sweep, so summaries count every site from the start
+        """
+        self.reload(first_check_now=first_check_now)
+        with self._lock:
+            for website_id, is_up in (initial_status or {}).items():
+                if website_id in self._websites:
+                    self._status[website_id] = is_up
+                    self._health[website_id] = {'streak': 1 if is_up else 0, 'failing': not is_up}
+        self._next_reload = time.time() + self.reload_interval
+        self._next_summary = time.time() + self.summary_interval
+        self._thread = threading.Thread(target=self._loop, name='check-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Check scheduler started with {len(self._websites)} websites")
+
+    def shutdown(self):
+        """Stop dispatching checks"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def reload(self, first_check_now=True):
+        """
+        Sync the schedule with the website list
+
+        New sites are scheduled immediately (or at their next phase slot when
+        first_check_now is False), deleted sites are dropped, and a site whose
+        interval got shorter moves to its new slot if that comes sooner.
+        """
+        try:
+            websites = self.load_websites()
+            if self.leases is not None:
+                websites = self.leases.claim(websites)
+            websites = {website['id']: website for website in websites}
+            open_incidents = set(self.load_open_incidents()) if self.load_open_incidents else set()
+        except Exception as e:
+            logger.error(f"Error loading websites for scheduling: {str(e)}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for website_id in set(self._websites) - set(websites):
+                self._due.pop(website_id, None)
+                self._slot.pop(website_id, None)
+                self._status.pop(website_id, None)
+                self._health.pop(website_id, None)
+                self._rerun.discard(website_id)
+
+            for website_id, website in websites.items():
+                previous = self._websites.get(website_id)
+                previous_interval = self.interval_for(previous) if previous is not None else None
+                state = self._health.setdefault(website_id, {'streak': 0, 'failing': False})
+                if website_id in open_incidents and not state['failing']:
+                    state.update(streak=0, failing=True)
+
+                if previous is None:
+                    if first_check_now:
+                        self._schedule(website, now, jitter=False)
+                    else:
+                        self._schedule(website, self.next_slot(website, now))
+                elif self.interval_for(website) < previous_interval:
+                    self._reschedule_sooner(website, now)
+
+            self._websites = websites
+        self._wake.set()
+
+    def _reschedule_sooner(self, website, now):
+        """Move a site to its next slot if that is sooner; must hold the lock"""
+        slot = self.next_slot(website, now)
+        if slot < self._slot.get(website['id'], float('inf')):
+            self._schedule(website, slot)
+            self._wake.set()
+
+    def _schedule(self, website, slot, jitter=True):
+        """Set a site's next slot and due time; must hold the lock"""
+        website_id = website['id']
+        due = slot
+        if jitter and self.jitter:
+            # Never jitter a check into the next slot
+            due += random.uniform(0, min(self.jitter, self.interval_for(website) / 2))
+        self._slot[website_id] = slot
+        self._due[website_id] = due
+        heapq.heappush(self._heap, (due, next(self._seq), website_id))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # Cleared before the heap is read, so a wake-up set from here on
+            # (a site rescheduled sooner) cuts the wait below short
+            self._wake.clear()
+            now = time.time()
+            if now >= self._next_reload:
+                self.reload()
+                self._next_reload = now + self.reload_interval
+            if now >= self._next_summary:
+                self._publish_summary()
+                self._next_summary = now + self.summary_interval
+
+            due = []
+            with self._lock:
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if self._due.get(entry[2]) == entry[0]:
+                        due.append(entry)
+                wait = min(self._next_reload, self._next_summary) - now
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - now)
+
+            for due_at, _, website_id in due:
+                self._dispatch(website_id, due_at, now)
+
+            if not due:
+                self._wake.wait(max(0.0, wait))
+
+    def _dispatch(self, website_id, due_at, now):
+        """Hand a due site to the check pool and schedule its next check"""
+        with self._lock:
+            website = self._websites.get(website_id)
+            if website is None:
+                return
+            # Stay on the site's phase grid; missed slots are not caught up, and a
+            # slot less than half an interval away (after an off-grid check) is skipped
+            after = max(now, self._slot[website_id] + self.interval_for(website) / 2)
+            self._schedule(website, self.next_slot(website, after))
+
+            if website_id in self._in_flight:
+                # The previous check is still running (e.g. waiting out retries)
+                self.overruns += 1
+                if self.overrun_mode == 'coalesce' and website_id not in self._rerun:
+                    self._rerun.add(website_id)
+                    self.coalesced += 1
+                logger.debug(f"Overrun for {website['url']}: previous check still running "
+                             f"({'coalesced' if self.overrun_mode == 'coalesce' else 'skipped'})")
+                return
+
+            if self.leases is not None and not self.leases.holds(website_id):
+                logger.debug(f"Lease on {website['url']} lapsed; leaving it to its new owner")
+                return
+
+            if website.get('priority') == 'low' and self._behind():
+                self.deferred += 1
+                logger.debug(f"Deferring low-priority {website['url']} to its next slot")
+                return
+
+            self._in_flight.add(website_id)
+            self.dispatched += 1
+
+        self._submit(website, due_at)
+
+    def _behind(self):
+        """Whether checks are starting late; must hold the lock"""
+        return (self._last_lag > self.max_lag or
+                self.check_pool.backlog() >= self.check_pool.max_workers)
+
+    def _submit(self, website, due_at):
+        website_id = website['id']
+        self.check_pool.submit(
+            website,
+            on_result=self._handle_result,
+            on_done=lambda: self._check_done(website_id),
+            on_start=lambda: self._record_lag(time.time() - due_at)
+        )
+
+    def _record_lag(self, lag):
+        with self._lock:
+            self._last_lag = max(0.0, lag)
+            self._lags.append(self._last_lag)
+
+    def _check_done(self, website_id):
+        with self._lock:
+            website = self._websites.get(website_id)
+            if website_id in self._rerun and website is not None:
+                # A slot was missed while this check ran; make it up once
+                self._rerun.discard(website_id)
+                self.dispatched += 1
+                rerun = True
+            else:
+                self._in_flight.discard(website_id)
+                rerun = False
+
+        if rerun:
+            self._submit(website, time.time())
+
+    def _handle_result(self, website, result):
+        with self._lock:
+            website_id = website['id']
+            if website_id in self._websites:
+                self._status[website_id] = result['is_up']
+                if self.policy is not None:
+                    # Use the latest copy so edits since dispatch are respected
+                    current = self._websites[website_id]
+                    previous_interval = self.interval_for(current)
+                    self.policy.update(self._health.setdefault(website_id, {'streak': 0, 'failing': False}), result)
+                    interval = self.interval_for(current)
+                    if interval != previous_interval:
+                        logger.info(f"Check interval for {website['url']} is now {interval}s")
+                    if interval < previous_interval:
+                        self._reschedule_sooner(current, time.time())
+            self._checked_since_summary += 1
+
+        if self.on_result:
+            self.on_result(website, result)
+
+    def _publish_summary(self):
+        """Report fleet status if any checks completed since the last summary"""
+        with self._lock:
+            if not self._checked_since_summary:
+                return
+            summary = {
+                'timestamp': datetime.now().isoformat(),
+                'websites_checked': self._checked_since_summary,
+                'websites_up': sum(1 for is_up in self._status.values() if is_up),
+                'websites_down': sum(1 for is_up in self._status.values() if not is_up),
+                'scheduler': self._stats()
+            }
+            lags = self._lags
+            summary['scheduler']['lag_avg_ms'] = round(sum(lags) / len(lags) * 1000, 2) if lags else 0
+            summary['scheduler']['lag_max_ms'] = round(max(lags) * 1000, 2) if lags else 0
+            self._checked_since_summary = 0
+            self._lags = []
+
+        if self.on_summary:
+            try:
+                self.on_summary(summary)
+            except Exception as e:
+                logger.error(f"Error publishing check summary: {str(e)}")
+
+    def _stats(self):
+        return {
+            'websites': len(self._websites),
+            'in_flight': len(self._in_flight),
+            'dispatched': self.dispatched,
+            'overrun_mode': self.overrun_mode,
+            'overruns': self.overruns,
+            'coalesced': self.coalesced,
+            'deferred_low_priority': self.deferred,
+            'pool': self.check_pool.get_stats(),
+            'confirming': sum(1 for state in self._health.values() if state['failing']),
+            'backed_off': sum(1 for website in self._websites.values()
+                              if self.interval_for(website) > self.base_interval(website))
+        }
+
+    def get_stats(self):
+        """Return scheduler counters"""
+        with self._lock:
+            return self._stats()
@@ -0,0 +1,361 @@
+"""
+Multi-process check shards for the Personal Domain Health Monitor
+"""
+import os
+import queue
+import zlib
+import time
+import signal
+import logging
+import itertools
+import threading
+import multiprocessing
+
+from check_pool import CheckPool
+
+logger = logging.getLogger(__name__)
+
+class _CertificateForwarder:
+    """
+    Stands in for a shard's DataManager in its CertificateCache: persisted
+    certificates are read from the database as usual, but new ones are sent
+    to the parent process to store
+    """
+
+    def __init__(self, data_manager, results):
+        self.data_manager = data_manager
+        self.results = results
+
+    def get_ssl_certificates(self):
+        return self.data_manager.get_ssl_certificates()
+
+    def store_ssl_certificate(self, host, port, serial_number, not_after, der, fetched_at):
+        self.results.put(('certificate', host, port, der))
+
+
+def _shard_main(shard, engine_factory, engine_args, max_workers, per_host_limit, tasks, results):
+    """
+    Worker process entry point: run checks on a local CheckPool and send
+    every event back on the shared results queue
+    """
+    # The parent handles Ctrl+C and stops the shards itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    engine = engine_factory(*engine_args)
+    cert_cache = getattr(engine, 'cert_cache', None)
+    if cert_cache is not None and cert_cache.data_manager is not None:
+        # Only the parent writes to the database
+        cert_cache.data_manager = _CertificateForwarder(cert_cache.data_manager, results)
+
+    check_pool = CheckPool(engine, max_workers=max_workers, per_host_limit=per_host_limit)
+    logger.info(f"Check shard {shard} started (pid {os.getpid()})")
+
+    def run_cycle(cycle_id, websites, deadline):
+        stats = check_pool.run_cycle(
+            websites,
+            on_result=lambda website, result: results.put(('cycle_result', cycle_id, website, result)),
+            deadline=deadline
+        )
+        results.put(('cycle_done', cycle_id, len(websites), stats))
+
+    while True:
+        message = tasks.get()
+        if message is None:
+            break
+
+        if message[0] == 'check':
+            job_id, website = message[1], message[2]
+            check_pool.submit(
+                website,
+                on_result=lambda website, result, job_id=job_id: results.put(('result', job_id, result)),
+                on_done=lambda job_id=job_id: results.put(('done', job_id)),
+                on_start=lambda job_id=job_id: results.put(('start', job_id))
+            )
+        elif message[0] == 'cycle':
+            threading.Thread(target=run_cycle, args=message[1:], name=f'shard-{shard}-cycle',
+                             daemon=True).start()
+
+    check_pool.shutdown(wait=True)
+    logger.info(f"Check shard {shard} stopped")
+
+
+class ShardedChecker:
+    """
+    Spreads website checks across worker processes.
+
+    Websites are partitioned by a stable hash of their id, so each site is
+    always checked by the same shard. Every shard builds its own check engine
+    with ``engine_factory(*engine_args)`` and runs it on a CheckPool of
+    ``max_workers`` threads, so JSON handling, TLS parsing and result
+    building use one core per shard instead of sharing one interpreter.
+
+    Results come back on a single multiprocessing queue and all callbacks run
+    on one collector thread in the parent, which stays the only process that
+    writes to the database: certificates the shards see are passed to
+    ``on_certificate`` rather than stored by the shard.
+
+    Offers the same run_cycle/submit/backlog/get_stats interface as
+    CheckPool, so it can stand in for one under a full check or the
+    CheckScheduler.
+    """
+
+    def __init__(self, engine_factory, engine_args=(), shard_count=2, max_workers=20, per_host_limit=4,
+                 late_result_grace=300, on_certificate=None):
+        """
+        Args:
+            engine_factory (callable): Module-level function returning a
+                DomainMonitor; called once in each worker process
+            engine_args (tuple): Arguments for engine_factory (must be picklable)
+            shard_count (int): Number of worker processes
+            max_workers (int): Check threads per shard
+            per_host_limit (int): Concurrent checks per host within a shard
+            late_result_grace (float): Seconds a cycle waits, after its shards
+                have reported, for results of checks that outlived its deadline
+            on_certificate (callable, optional): Called as on_certificate(host, port, der)
+                on the collector thread for each certificate a shard needs stored
+        """
+        self.engine_factory = engine_factory
+        self.engine_args = engine_args
+        self.shard_count = max(1, int(shard_count))
+        self.workers_per_shard = max(1, int(max_workers))
+        self.max_workers = self.workers_per_shard * self.shard_count
+        self.per_host_limit = per_host_limit
+        self.late_result_grace = late_result_grace
+        self.on_certificate = on_certificate
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._processes = []
+        self._tasks = []
+        self._results = None
+        self._collector = None
+
+        # job_id -> submit() callbacks; cycle_id -> run_cycle() bookkeeping
+        self._jobs = {}
+        self._cycles = {}
+        self._queued = 0
+        self._in_flight = 0
+
+    def shard_for(self, website):
+        """Get the shard a website is checked on"""
+        return zlib.crc32(str(website['id']).encode('utf-8')) % self.shard_count
+
+    def start(self):
+        """Start the worker processes and the result collector"""
+        context = multiprocessing.get_context()
+        self._results = context.Queue()
+        for shard in range(self.shard_count):
+            tasks = context.Queue()
+            process = context.Process(
+                target=_shard_main,
+                args=(shard, self.engine_factory, self.engine_args, self.workers_per_shard,
+                      self.per_host_limit, tasks, self._results),
+                name=f'check-shard-{shard}',
+                daemon=True
+            )
+            process.start()
+            self._tasks.append(tasks)
+            self._processes.append(process)
+
+        self._collector = threading.Thread(target=self._collect, name='shard-results', daemon=True)
+        self._collector.start()
+        logger.info(f"Started {self.shard_count} check shards with {self.workers_per_shard} workers each")
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        for tasks in self._tasks:
+            tasks.put(None)
+        if wait:
+            for process in self._processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    logger.warning(f"Check shard {process.name} did not stop, terminating it")
+                    process.terminate()
+        if self._results is not None:
+            self._results.put(None)
+
+    def run_cycle(self, websites, on_result=None, deadline=None):
+        """
+        Check a batch of websites across the shards and wait for all of them
+
+        Args:
+            websites (list): Website dicts, in the order they should be started
+            on_result (callable, optional): Called as on_result(website, result)
+                on the collector thread as each check completes
+            deadline (float, optional): Seconds the cycle may take; see CheckPool.run_cycle
+
+        Returns:
+            dict: Cycle statistics combined across shards, as for CheckPool.run_cycle
+        """
+        groups = {}
+        for website in websites:
+            groups.setdefault(self.shard_for(website), []).append(website)
+
+        cycle_id = next(self._ids)
+        cycle = {
+            'on_result': on_result,
+            'shards': len(groups),
+            'stats': [],
+            'expected': None,
+            'received': 0,
+            'done': threading.Event(),
+            'finished_at': None
+        }
+        if not groups:
+            cycle['done'].set()
+        with self._lock:
+            self._cycles[cycle_id] = cycle
+
+        start_time = time.monotonic()
+        for shard, shard_websites in groups.items():
+            self._tasks[shard].put(('cycle', cycle_id, shard_websites, deadline))
+
+        # Shards enforce the deadline themselves; the margin covers the queue hops
+        if not cycle['done'].wait(timeout=deadline + 5 if deadline else None):
+            logger.warning(f"Check shards did not finish their cycle: "
+                           f"{len(cycle['stats'])} of {cycle['shards']} reported")
+
+        with self._lock:
+            stats = list(cycle['stats'])
+            if not groups:
+                self._cycles.pop(cycle_id, None)
+            elif cycle['finished_at'] is None:
+                # A shard that never reports must not keep the cycle forever
+                cycle['finished_at'] = time.monotonic()
+
+        total = sum(count for count, _ in stats)
+        return {
+            'wall_time_seconds': round(time.monotonic() - start_time, 3),
+            'peak_in_flight': sum(s['peak_in_flight'] for _, s in stats),
+            'avg_queue_wait_ms': round(sum(count * s['avg_queue_wait_ms'] for count, s in stats) / total, 2)
+                                 if total else 0,
+            'max_queue_wait_ms': max((s['max_queue_wait_ms'] for _, s in stats), default=0),
+            'retries': sum(s['retries'] for _, s in stats),
+            'deadline_exceeded': len(stats) < cycle['shards'] or any(s['deadline_exceeded'] for _, s in stats),
+            'dropped': sum(s['dropped'] for _, s in stats),
+            'unfinished': sum(s['unfinished'] for _, s in stats),
+            'shards': cycle['shards']
+        }
+
+    def submit(self, website, on_result=None, on_done=None, on_start=None):
+        """
+        Queue a single website check on its shard without waiting for it
+
+        Callbacks are as for CheckPool.submit and run on the collector thread.
+        """
+        job_id = next(self._ids)
+        with self._lock:
+            self._jobs[job_id] = {'website': website, 'on_result': on_result,
+                                  'on_done': on_done, 'on_start': on_start, 'started': False}
+            self._queued += 1
+        self._tasks[self.shard_for(website)].put(('check', job_id, website))
+
+    def backlog(self):
+        """Number of submitted checks that haven't started on their shard"""
+        with self._lock:
+            return self._queued
+
+    def get_stats(self):
+        """Return the current load across the shards"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'in_flight': self._in_flight,
+                'queued': self._queued,
+                'shards': self.shard_count,
+                'shards_alive': sum(1 for process in self._processes if process.is_alive())
+            }
+
+    def _collect(self):
+        """Run the callbacks for every event the shards send back"""
+        while True:
+            try:
+                message = self._results.get(timeout=self.late_result_grace / 10)
+            except queue.Empty:
+                self._expire_cycles()
+                continue
+            if message is None:
+                return
+            try:
+                self._handle(message)
+            except Exception as e:
+                logger.error(f"Error handling check shard message {message[0]}: {str(e)}")
+
+    def _expire_cycles(self):
+        """
+        Forget finished cycles still waiting on results after the grace period
+
+        A check that raised in its shard never sends a result, so its cycle
+        would otherwise wait (and hold its on_result callback) forever.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [cycle_id for cycle_id, cycle in self._cycles.items()
+                       if cycle['finished_at'] is not None and
+                       now - cycle['finished_at'] > self.late_result_grace]
+            for cycle_id in expired:
+                cycle = self._cycles.pop(cycle_id)
+                logger.warning(f"Gave up waiting for late results of check cycle {cycle_id} "
+                               f"({cycle['received']} of {cycle['expected']} received)")
+
+    def _handle(self, message):
+        kind = message[0]
+
+        if kind == 'certificate':
+            if self.on_certificate:
+                self.on_certificate(*message[1:])
+            return
+
+        if kind in ('cycle_result', 'cycle_done'):
+            cycle_id = message[1]
+            with self._lock:
+                cycle = self._cycles.get(cycle_id)
+            if cycle is None:
+                return
+
+            if kind == 'cycle_result':
+                if cycle['on_result']:
+                    cycle['on_result'](message[2], message[3])
+                with self._lock:
+                    cycle['received'] += 1
+            else:
+                with self._lock:
+                    count, stats = message[2], message[3]
+                    cycle['stats'].append((count, stats))
+                    cycle['expected'] = (cycle['expected'] or 0) + count - stats['dropped']
+                    if len(cycle['stats']) == cycle['shards']:
+                        cycle['done'].set()
+                        cycle['finished_at'] = time.monotonic()
+
+            # Checks still running at the deadline report after their shard's
+            # summary, so the cycle is kept until they have all arrived
+            with self._lock:
+                if (len(cycle['stats']) == cycle['shards'] and
+                        cycle['received'] >= cycle['expected']):
+                    self._cycles.pop(cycle_id, None)
+            self._expire_cycles()
+            return
+
+        job_id = message[1]
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if kind == 'start':
+                job['started'] = True
+                self._queued -= 1
+                self._in_flight += 1
+            elif kind == 'done':
+                del self._jobs[job_id]
+                if job['started']:
+                    self._in_flight -= 1
+                else:
+                    # Dropped before it got a worker
+                    self._queued -= 1
+
+        if kind == 'start' and job['on_start']:
+            job['on_start']()
+        elif kind == 'result' and job['on_result']:
+            job['on_result'](job['website'], message[2])
+        elif kind == 'done' and job['on_done']:
+            job['on_done']()
@@ -19,6 +19,34 @@ class Config:
         self.CHECK_INTERVAL_MINUTES = 5
         self.RETRY_ATTEMPTS = 2
         self.CONNECTION_TIMEOUT = 10
+        self.CHECK_CONCURRENCY = 20
+        self.PER_HOST_CONCURRENCY = 4
+        self.CHECK_ENGINE = "threads"
+        self.PING_METHOD = "auto"
+        self.SSL_CACHE_TTL_HOURS = 6
+        self.SSL_REFRESH_DAYS = 14
+        self.DNS_CACHE_TTL_SECONDS = 300
+        self.RETRY_BACKOFF_SECONDS = 1
+        self.RETRY_BACKOFF_MAX_SECONDS = 30
+        self.RETRY_JITTER = 0.5
+        self.CHECK_DEADLINE_SECONDS = 60
+        self.DISPATCH_JITTER_SECONDS = 0
+        self.ADAPTIVE_SCHEDULING = True
+        self.CONFIRMATION_INTERVAL_SECONDS = 30
+        self.STABLE_AFTER_CHECKS = 10
+        self.INTERVAL_BACKOFF_FACTOR = 1.5
+        self.MIN_CHECK_INTERVAL_SECONDS = 30
+        self.MAX_CHECK_INTERVAL_SECONDS = 3600
+        self.OVERRUN_MODE = "coalesce"
+        self.CYCLE_DEADLINE_SECONDS = 0
+        self.MAX_SCHEDULER_LAG_SECONDS = 30
+        self.SHARD_COUNT = 1
+        self.STATUS_CHANNEL_PORT = 5055
+        self.INSTANCE_ID = ""
+        self.LEASE_SECONDS = 90
+        self.WRITE_BATCH_MS = 50
+        self.WRITE_BATCH_ROWS = 500
+        self.MONITOR_SETTINGS = {}
         self.SMTP_SERVER = ""
         self.SMTP_PORT = 587
         self.SMTP_USERNAME = ""
@@ -30,6 +58,11 @@ class Config:
         self.DEFAULT_HTTP_HEADERS = {
             "User-Agent": "Domain-Health-Monitor/1.0"
         }
+        self.HTTP_POOL_MAXSIZE = 10
+        self.HTTP_IDLE_TIMEOUT = 120
+        self.HTTP_MAX_BODY_BYTES = 1048576
+        self.HTTP_BODY_HASH = "sha256"
+        self.HTTP_SETTINGS = {}
 
         # Try to load from config file
         if os.path.exists(self.config_path):
@@ -46,6 +79,35 @@ class Config:
                     self.CHECK_INTERVAL_MINUTES = monitor_settings.get('check_interval_minutes', self.CHECK_INTERVAL_MINUTES)
                     self.RETRY_ATTEMPTS = monitor_settings.get('retry_attempts', self.RETRY_ATTEMPTS)
                     self.CONNECTION_TIMEOUT = monitor_settings.get('connection_timeout', self.CONNECTION_TIMEOUT)
+                    self.CHECK_CONCURRENCY = monitor_settings.get('check_concurrency', self.CHECK_CONCURRENCY)
+                    self.PER_HOST_CONCURRENCY = monitor_settings.get('per_host_concurrency', self.PER_HOST_CONCURRENCY)
+                    self.CHECK_ENGINE = monitor_settings.get('check_engine', self.CHECK_ENGINE)
+                    self.PING_METHOD = monitor_settings.get('ping_method', self.PING_METHOD)
+                    self.SSL_CACHE_TTL_HOURS = monitor_settings.get('ssl_cache_ttl_hours', self.SSL_CACHE_TTL_HOURS)
+                    self.SSL_REFRESH_DAYS = monitor_settings.get('ssl_refresh_days', self.SSL_REFRESH_DAYS)
+                    self.DNS_CACHE_TTL_SECONDS = monitor_settings.get('dns_cache_ttl_seconds', self.DNS_CACHE_TTL_SECONDS)
+                    self.RETRY_BACKOFF_SECONDS = monitor_settings.get('retry_backoff_seconds', self.RETRY_BACKOFF_SECONDS)
+                    self.RETRY_BACKOFF_MAX_SECONDS = monitor_settings.get('retry_backoff_max_seconds', self.RETRY_BACKOFF_MAX_SECONDS)
+                    self.RETRY_JITTER = monitor_settings.get('retry_jitter', self.RETRY_JITTER)
+                    self.CHECK_DEADLINE_SECONDS = monitor_settings.get('check_deadline_seconds', self.CHECK_DEADLINE_SECONDS)
+                    self.DISPATCH_JITTER_SECONDS = monitor_settings.get('dispatch_jitter_seconds', self.DISPATCH_JITTER_SECONDS)
+                    self.ADAPTIVE_SCHEDULING = monitor_settings.get('adaptive_scheduling', self.ADAPTIVE_SCHEDULING)
+                    self.CONFIRMATION_INTERVAL_SECONDS = monitor_settings.get('confirmation_interval_seconds', self.CONFIRMATION_INTERVAL_SECONDS)
+                    self.STABLE_AFTER_CHECKS = monitor_settings.get('stable_after_checks', self.STABLE_AFTER_CHECKS)
+                    self.INTERVAL_BACKOFF_FACTOR = monitor_settings.get('interval_backoff_factor', self.INTERVAL_BACKOFF_FACTOR)
+                    self.MIN_CHECK_INTERVAL_SECONDS = monitor_settings.get('min_check_interval_seconds', self.MIN_CHECK_INTERVAL_SECONDS)
+                    self.MAX_CHECK_INTERVAL_SECONDS = monitor_settings.get('max_check_interval_seconds', self.MAX_CHECK_INTERVAL_SECONDS)
+                    self.OVERRUN_MODE = monitor_settings.get('overrun_mode', self.OVERRUN_MODE)
+                    self.CYCLE_DEADLINE_SECONDS = monitor_settings.get('cycle_deadline_seconds', self.CYCLE_DEADLINE_SECONDS)
+                    self.MAX_SCHEDULER_LAG_SECONDS = monitor_settings.get('max_scheduler_lag_seconds', self.MAX_SCHEDULER_LAG_SECONDS)
+                    self.SHARD_COUNT = monitor_settings.get('shard_count', self.SHARD_COUNT)
+                    self.STATUS_CHANNEL_PORT = monitor_settings.get('status_channel_port', self.STATUS_CHANNEL_PORT)
+                    self.INSTANCE_ID = monitor_settings.get('instance_id', self.INSTANCE_ID)
+                    self.LEASE_SECONDS = monitor_settings.get('lease_seconds', self.LEASE_SECONDS)
+                    self.WRITE_BATCH_MS = monitor_settings.get('write_batch_ms', self.WRITE_BATCH_MS)
+                    self.WRITE_BATCH_ROWS = monitor_settings.get('write_batch_rows', self.WRITE_BATCH_ROWS)
+                    # Keep the raw section so the settings page can round-trip keys it doesn't edit
+                    self.MONITOR_SETTINGS = dict(monitor_settings)
 
                     # Email settings
                     email_settings = config_data.get('email_settings', {})
@@ -66,6 +128,11 @@ class Config:
                     headers = http_settings.get('default_headers', {})
                     if headers:
                         self.DEFAULT_HTTP_HEADERS.update(headers)
+                    self.HTTP_POOL_MAXSIZE = http_settings.get('pool_maxsize', self.HTTP_POOL_MAXSIZE)
+                    self.HTTP_IDLE_TIMEOUT = http_settings.get('idle_timeout', self.HTTP_IDLE_TIMEOUT)
+                    self.HTTP_MAX_BODY_BYTES = http_settings.get('max_body_bytes', self.HTTP_MAX_BODY_BYTES)
+                    self.HTTP_BODY_HASH = http_settings.get('body_hash', self.HTTP_BODY_HASH)
+                    self.HTTP_SETTINGS = dict(http_settings)
 
             except Exception as e:
                 print(f"Error loading config file: {str(e)}")
@@ -75,6 +142,12 @@ class Config:
         self.CHECK_INTERVAL_MINUTES = int(os.environ.get('DOMAIN_MONITOR_CHECK_INTERVAL', self.CHECK_INTERVAL_MINUTES))
         self.RETRY_ATTEMPTS = int(os.environ.get('DOMAIN_MONITOR_RETRY_ATTEMPTS', self.RETRY_ATTEMPTS))
         self.CONNECTION_TIMEOUT = int(os.environ.get('DOMAIN_MONITOR_TIMEOUT', self.CONNECTION_TIMEOUT))
+        self.CHECK_CONCURRENCY = int(os.environ.get('DOMAIN_MONITOR_CHECK_CONCURRENCY', self.CHECK_CONCURRENCY))
+        self.PER_HOST_CONCURRENCY = int(os.environ.get('DOMAIN_MONITOR_PER_HOST_CONCURRENCY', self.PER_HOST_CONCURRENCY))
+        self.CHECK_ENGINE = os.environ.get('DOMAIN_MONITOR_CHECK_ENGINE', self.CHECK_ENGINE)
+        self.SHARD_COUNT = int(os.environ.get('DOMAIN_MONITOR_SHARD_COUNT', self.SHARD_COUNT))
+        self.INSTANCE_ID = os.environ.get('DOMAIN_MONITOR_INSTANCE_ID', self.INSTANCE_ID)
+        self.PING_METHOD = os.environ.get('DOMAIN_MONITOR_PING_METHOD', self.PING_METHOD)
         self.SMTP_SERVER = os.environ.get('DOMAIN_MONITOR_SMTP_SERVER', self.SMTP_SERVER)
         self.SMTP_PORT = int(os.environ.get('DOMAIN_MONITOR_SMTP_PORT', self.SMTP_PORT))
         self.SMTP_USERNAME = os.environ.get('DOMAIN_MONITOR_SMTP_USERNAME', self.SMTP_USERNAME)
@@ -99,7 +172,34 @@ class Config:
             "monitor_settings": {
                 "check_interval_minutes": 5,
                 "retry_attempts": 2,
-                "connection_timeout": 10
+                "connection_timeout": 10,
+                "check_concurrency": 20,
+                "per_host_concurrency": 4,
+                "check_engine": "threads",
+                "ping_method": "auto",
+                "ssl_cache_ttl_hours": 6,
+                "ssl_refresh_days": 14,
+                "dns_cache_ttl_seconds": 300,
+                "retry_backoff_seconds": 1,
+                "retry_backoff_max_seconds": 30,
+                "retry_jitter": 0.5,
+                "check_deadline_seconds": 60,
+                "dispatch_jitter_seconds": 0,
+                "adaptive_scheduling": True,
+                "confirmation_interval_seconds": 30,
+                "stable_after_checks": 10,
+                "interval_backoff_factor": 1.5,
+                "min_check_interval_seconds": 30,
+                "max_check_interval_seconds": 3600,
+                "overrun_mode": "coalesce",
+                "cycle_deadline_seconds": 0,
+                "max_scheduler_lag_seconds": 30,
+                "shard_count": 1,
+                "status_channel_port": 5055,
+                "instance_id": "",
+                "lease_seconds": 90,
+                "write_batch_ms": 50,
+                "write_batch_rows": 500
             },
             "email_settings": {
                 "smtp_server": "smtp.gmail.com",
@@ -116,7 +216,11 @@ class Config:
             "http_settings": {
                 "default_headers": {
                     "User-Agent": "Domain-Health-Monitor/1.0"
-                }
+                },
+                "pool_maxsize": 10,
+                "idle_timeout": 120,
+                "max_body_bytes": 1048576,
+                "body_hash": "sha256"
             }
         }
 
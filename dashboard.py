@@ -4,20 +4,40 @@ Web dashboard for the Personal Domain Health Monitor
 import os
 import json
 import logging
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
 from flask_wtf import FlaskForm
 from flask_wtf.csrf import CSRFProtect
 from wtforms import StringField, TextAreaField, BooleanField, SelectField, FieldList, EmailField
-from wtforms.validators import DataRequired, URL, Email, Optional
+from wtforms.validators import DataRequired, URL, Email, Optional, NumberRange, ValidationError
 from wtforms import StringField, IntegerField, PasswordField
 logger = logging.getLogger(__name__)
 from config import Config
-def create_app(data_manager, website_manager, domain_monitor):
-    """Create Flask app for the dashboard"""
+from lazy_imports import lazy_import
+
+# Imported on first use: they cost more start-up time and memory than the rest of the app
+pd = lazy_import('pandas')
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
+# Limits for /api/dispatch-histogram
+HISTOGRAM_MAX_MINUTES = 24 * 60
+HISTOGRAM_MAX_BUCKET_SECONDS = 3600
+HISTOGRAM_MAX_BUCKETS = 1440
+
+def create_app(data_manager, website_manager, domain_monitor, status_listener=None, check_progress=None):
+    """
+    Create Flask app for the dashboard
+
+    Args:
+        data_manager (DataManager): Database access
+        website_manager (WebsiteManager): Website CRUD
+        domain_monitor (DomainMonitor): Used for on-demand checks
+        status_listener (StatusListener, optional): Live status from a separate
+            checker process; when given, status APIs prefer it over the database
+        check_progress (callable, optional): Returns the running full check's
+            progress dict, or None
+    """
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'your-secret-key'  # Change in production
     csrf = CSRFProtect(app)
@@ -40,11 +60,19 @@ def create_app(data_manager, website_manager, domain_monitor):
         name = StringField('Name', validators=[DataRequired()])
         url = StringField('URL', validators=[DataRequired(), URL()])
         description = TextAreaField('Description')
+        check_interval_seconds = IntegerField('Check Interval (seconds)', validators=[Optional(), NumberRange(min=10)])
+        min_check_interval_seconds = IntegerField('Fastest Check Interval (seconds)', validators=[Optional(), NumberRange(min=10)])
+        max_check_interval_seconds = IntegerField('Slowest Check Interval (seconds)', validators=[Optional(), NumberRange(min=10)])
+        priority = SelectField('Priority', choices=[('high', 'High'), ('normal', 'Normal'), ('low', 'Low')], default='normal')
         check_ssl = BooleanField('Check SSL Certificate', default=True)
         check_security = BooleanField('Perform Security Checks', default=True)
         alerts_enabled = BooleanField('Enable Alerts', default=True)
         alert_emails = TextAreaField('Alert Emails (one per line)')
         alert_phone = StringField('Alert Phone Number')
+
+        def validate_max_check_interval_seconds(self, field):
+            if field.data and self.min_check_interval_seconds.data and field.data < self.min_check_interval_seconds.data:
+                raise ValidationError('Must not be less than the fastest check interval')
         # Add this right after your existing WebsiteForm class
     class ConfigForm(FlaskForm):
         # Database settings
@@ -71,9 +99,10 @@ def create_app(data_manager, website_manager, domain_monitor):
         """Dashboard home page"""
         websites = website_manager.get_all_websites()
 
-        # Get latest status for each website
+        # Get latest status for each website, all in one query
+        latest_checks = data_manager.get_latest_check_results()
         for website in websites:
-            latest_check = data_manager.get_latest_check_result(website['id'])
+            latest_check = latest_checks.get(website['id'])
             if latest_check:
                 website['status'] = 'Up' if latest_check['is_up'] else 'Down'
                 website['latest_check'] = latest_check
@@ -93,9 +122,10 @@ def create_app(data_manager, website_manager, domain_monitor):
         """List all websites"""
         websites = website_manager.get_all_websites()
 
-        # Get latest status for each website
+        # Get latest status for each website, all in one query
+        latest_checks = data_manager.get_latest_check_results()
         for website in websites:
-            latest_check = data_manager.get_latest_check_result(website['id'])
+            latest_check = latest_checks.get(website['id'])
             if latest_check:
                 website['status'] = 'Up' if latest_check['is_up'] else 'Down'
                 website['latest_check'] = latest_check
@@ -121,6 +151,10 @@ def create_app(data_manager, website_manager, domain_monitor):
                 name=form.name.data,
                 url=form.url.data,
                 description=form.description.data,
+                check_interval_seconds=form.check_interval_seconds.data,
+                min_check_interval_seconds=form.min_check_interval_seconds.data,
+                max_check_interval_seconds=form.max_check_interval_seconds.data,
+                priority=form.priority.data,
                 check_ssl=form.check_ssl.data,
                 check_security=form.check_security.data,
                 alerts_enabled=form.alerts_enabled.data,
@@ -151,6 +185,10 @@ def create_app(data_manager, website_manager, domain_monitor):
             form.name.data = website['name']
             form.url.data = website['url']
             form.description.data = website['description']
+            form.check_interval_seconds.data = website.get('check_interval_seconds')
+            form.min_check_interval_seconds.data = website.get('min_check_interval_seconds')
+            form.max_check_interval_seconds.data = website.get('max_check_interval_seconds')
+            form.priority.data = website.get('priority') or 'normal'
             form.check_ssl.data = website['check_ssl']
             form.check_security.data = website['check_security']
             form.alerts_enabled.data = website['alerts_enabled']
@@ -172,6 +210,10 @@ def create_app(data_manager, website_manager, domain_monitor):
                 name=form.name.data,
                 url=form.url.data,
                 description=form.description.data,
+                check_interval_seconds=form.check_interval_seconds.data,
+                min_check_interval_seconds=form.min_check_interval_seconds.data,
+                max_check_interval_seconds=form.max_check_interval_seconds.data,
+                priority=form.priority.data,
                 check_ssl=form.check_ssl.data,
                 check_security=form.check_security.data,
                 alerts_enabled=form.alerts_enabled.data,
@@ -263,6 +305,47 @@ def create_app(data_manager, website_manager, domain_monitor):
             'incidents': incidents,
             'timestamp': datetime.now().isoformat()
         })
+
+    @app.route('/api/incident-events', methods=['GET'])
+    def api_incident_events():
+        """API endpoint to get incidents opened or resolved since the caller last asked"""
+        after = request.args.get('after', 0, type=int)
+        # Live from a --checker process, else from this process's own writes
+        source = status_listener if status_listener else data_manager
+        recent = source.get_incident_events()
+        latest = recent[-1]['seq'] if recent else 0
+        # A restarted checker numbers its events from 1 again
+        events = [event for event in recent if event['seq'] > after] if after <= latest else recent
+
+        names = {}
+        for event in events:
+            if event['website_id'] not in names:
+                website = website_manager.get_website(event['website_id'])
+                names[event['website_id']] = website['name'] if website else None
+        events = [dict(event, website_name=names[event['website_id']]) for event in events]
+
+        return jsonify({
+            'success': True,
+            'events': events,
+            'latest': latest,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    @app.route('/api/dispatch-histogram', methods=['GET'])
+    def api_dispatch_histogram():
+        """API endpoint to get how check start times are spread over time"""
+        # Clamped so a request can't make the server build millions of buckets
+        minutes = min(max(request.args.get('minutes', 60, type=int), 1), HISTOGRAM_MAX_MINUTES)
+        bucket_seconds = min(max(request.args.get('bucket', 10, type=int), 1), HISTOGRAM_MAX_BUCKET_SECONDS)
+        bucket_seconds = max(bucket_seconds, -(-minutes * 60 // HISTOGRAM_MAX_BUCKETS))
+        histogram = data_manager.get_dispatch_histogram(minutes=minutes, bucket_seconds=bucket_seconds)
+
+        return jsonify({
+            'success': True,
+            'histogram': histogram,
+            'timestamp': datetime.now().isoformat()
+        })
+
     @app.route('/api/websites/<int:website_id>/check', methods=['POST'])
     def api_check_website(website_id):
         """API endpoint to trigger a manual check"""
@@ -278,8 +361,8 @@ def create_app(data_manager, website_manager, domain_monitor):
                 check_security=website.get('check_security', True)
             )
 
-            # Store result
-            data_manager.store_check_result(website_id, result)
+            # Store result, and wait for it so the page reload that follows shows it
+            data_manager.store_check_result(website_id, result).result(timeout=10)
 
             return jsonify({
                 'success': True,
@@ -302,10 +385,10 @@ def create_app(data_manager, website_manager, domain_monitor):
         try:
             # Parse domain from URL
             from urllib.parse import urlparse
-            domain = urlparse(website['url']).netloc
+            parsed_url = urlparse(website['url'])
 
-            # Get SSL info
-            ssl_info = domain_monitor.get_ssl_info(domain)
+            # Get SSL info (served from the certificate cache when fresh)
+            ssl_info = domain_monitor.get_ssl_info(parsed_url.hostname, parsed_url.port or 443)
 
             return jsonify({
                 'success': True,
@@ -336,7 +419,15 @@ def create_app(data_manager, website_manager, domain_monitor):
             'days': [stat['day'] for stat in daily_stats],
             'uptime': [stat['uptime_percentage'] for stat in daily_stats],
             'response_time': [stat['avg_response_time'] for stat in daily_stats],
-            'security_score': [stat['avg_security_score'] for stat in daily_stats]
+            'security_score': [stat['avg_security_score'] for stat in daily_stats],
+            # Per-phase averages (ms), to see which part of a check is getting slower
+            'phases': {
+                'dns_time': [stat['avg_dns_time'] for stat in daily_stats],
+                'connect_time': [stat['avg_connect_time'] for stat in daily_stats],
+                'tls_time': [stat['avg_tls_time'] for stat in daily_stats],
+                'ttfb': [stat['avg_ttfb'] for stat in daily_stats],
+                'download_time': [stat['avg_download_time'] for stat in daily_stats]
+            }
         }
 
         return jsonify({
@@ -371,10 +462,13 @@ def create_app(data_manager, website_manager, domain_monitor):
         """API endpoint to get the latest status of all websites"""
         websites = website_manager.get_all_websites()
 
-        # Get latest status for each website
+        # Get latest status for each website, all in one query
+        latest_checks = data_manager.get_latest_check_results()
         status_data = []
         for website in websites:
-            latest_check = data_manager.get_latest_check_result(website['id'])
+            latest_check = status_listener.get_status(website['id']) if status_listener else None
+            if latest_check is None:
+                latest_check = latest_checks.get(website['id'])
             status = {
                 'id': website['id'],
                 'name': website['name'],
@@ -391,10 +485,25 @@ def create_app(data_manager, website_manager, domain_monitor):
             'timestamp': datetime.now().isoformat()
         })
 
+    @app.route('/api/check-progress', methods=['GET'])
+    def api_check_progress():
+        """API endpoint to get the progress of the running full check"""
+        progress = check_progress() if check_progress else None
+        return jsonify({
+            'success': progress is not None,
+            'data': progress
+        })
+
     @app.route('/api/last-check', methods=['GET'])
     def api_last_check():
         """API endpoint to get information about the last monitoring check"""
         try:
+            summary = status_listener.get_summary() if status_listener else None
+            if summary is not None:
+                return jsonify({
+                    'success': True,
+                    'data': summary
+                })
             if os.path.exists('last_check.json'):
                 with open('last_check.json', 'r') as f:
                     last_check = json.load(f)
@@ -439,11 +548,12 @@ def create_app(data_manager, website_manager, domain_monitor):
                 # Create config dict
                 config_data = {
                     'database_path': form.database_path.data,
-                    'monitor_settings': {
-                        'check_interval_minutes': form.check_interval_minutes.data,
-                        'retry_attempts': form.retry_attempts.data,
-                        'connection_timeout': form.connection_timeout.data
-                    },
+                    'monitor_settings': dict(
+                        config.MONITOR_SETTINGS,
+                        check_interval_minutes=form.check_interval_minutes.data,
+                        retry_attempts=form.retry_attempts.data,
+                        connection_timeout=form.connection_timeout.data
+                    ),
                     'email_settings': {
                         'smtp_server': form.smtp_server.data,
                         'smtp_port': form.smtp_port.data,
@@ -454,9 +564,10 @@ def create_app(data_manager, website_manager, domain_monitor):
                         'twilio_account_sid': form.twilio_account_sid.data,
                         'twilio_phone_number': form.twilio_phone_number.data
                     },
-                    'http_settings': {
-                        'default_headers': config.DEFAULT_HTTP_HEADERS
-                    }
+                    'http_settings': dict(
+                        config.HTTP_SETTINGS,
+                        default_headers=config.DEFAULT_HTTP_HEADERS
+                    )
                 }
 
                 # Only update passwords if provided
@@ -534,6 +645,16 @@ def create_app(data_manager, website_manager, domain_monitor):
                 </nav>
 
                 <div class="container mt-4">
+                    <div id="check-progress" class="alert alert-info py-2 d-none">
+                        <div class="d-flex justify-content-between mb-1">
+                            <small><i class="bi bi-hourglass-split"></i> Checking websites&hellip;</small>
+                            <small id="check-progress-count"></small>
+                        </div>
+                        <div class="progress" style="height: 6px;">
+                            <div id="check-progress-bar" class="progress-bar" role="progressbar" style="width: 0%"></div>
+                        </div>
+                    </div>
+
                     {% for category, message in get_flashed_messages(with_categories=true) %}
                     <div class="alert alert-{{ category }} alert-dismissible fade show">
                         {{ message }}
@@ -558,11 +679,76 @@ def create_app(data_manager, website_manager, domain_monitor):
                 document.addEventListener('DOMContentLoaded', function() {
                     const AUTO_REFRESH_INTERVAL = 60000; // 60 seconds fallback
                     const CHECK_COMPLETION_INTERVAL = 5000; // 5 seconds, to check if monitoring tasks completed
+                    const PROGRESS_INTERVAL = 1000; // 1 second while a full check is running
 
                     // Get stored last check timestamp from localStorage (if any)
                     let lastCheckTimestamp = localStorage.getItem('lastCheckTimestamp');
                     let lastUpdateTimestamp = new Date().toISOString();
                     let autoRefreshEnabled = true;
+                    let lastProgressCount = null;
+                    let lastIncidentSeq = null;
+
+                    // Function to show the running full check's progress and stream its results into the page
+                    function checkProgress() {
+                        fetch('/api/check-progress')
+                            .then(response => response.json())
+                            .then(data => {
+                                const banner = document.getElementById('check-progress');
+                                const progress = data.success ? data.data : null;
+                                if (!progress || !progress.running) {
+                                    banner.classList.add('d-none');
+                                    lastProgressCount = null;
+                                    setTimeout(checkProgress, CHECK_COMPLETION_INTERVAL);
+                                    return;
+                                }
+
+                                const percent = progress.total ? Math.round(progress.checked / progress.total * 100) : 0;
+                                document.getElementById('check-progress-bar').style.width = `${percent}%`;
+                                document.getElementById('check-progress-count').textContent =
+                                    `${progress.checked} of ${progress.total} (${progress.up} up, ${progress.down} down)`;
+                                banner.classList.remove('d-none');
+
+                                if (progress.checked !== lastProgressCount) {
+                                    lastProgressCount = progress.checked;
+                                    fetchWebsiteStatus(true);
+                                }
+                                setTimeout(checkProgress, PROGRESS_INTERVAL);
+                            })
+                            .catch(error => {
+                                console.error('Error checking progress:', error);
+                                setTimeout(checkProgress, CHECK_COMPLETION_INTERVAL);
+                            });
+                    }
+
+                    // Function to announce incidents as they open and resolve
+                    function checkIncidentEvents() {
+                        fetch(`/api/incident-events?after=${lastIncidentSeq === null ? 0 : lastIncidentSeq}`)
+                            .then(response => response.json())
+                            .then(data => {
+                                if (!data.success) return;
+
+                                // The first poll only notes how far the events go
+                                if (lastIncidentSeq !== null && data.events.length > 0) {
+                                    data.events.forEach(event => {
+                                        const name = event.website_name || `Website ${event.website_id}`;
+                                        if (event.event === 'opened') {
+                                            showNotification(`${name} is down: incident opened`, 'danger');
+                                        } else {
+                                            showNotification(`${name} is back up after ${formatDuration(event.duration) || 'less than a second'}`, 'success');
+                                        }
+                                    });
+                                    // Also refreshes the incidents list on pages that have one
+                                    fetchWebsiteStatus(true);
+                                }
+                                lastIncidentSeq = data.latest;
+                            })
+                            .catch(error => {
+                                console.error('Error checking incident events:', error);
+                            })
+                            .finally(() => {
+                                setTimeout(checkIncidentEvents, CHECK_COMPLETION_INTERVAL);
+                            });
+                    }
 
                     // Function to check if a new monitoring task has completed
                     function checkMonitoringCompletion() {
@@ -623,16 +809,18 @@ def create_app(data_manager, website_manager, domain_monitor):
                     }
 
                     // Function to show a notification to the user
-                    function showNotification(message) {
+                    function showNotification(message, level = 'info') {
                         // Create a notification container in the UI
                         const container = document.querySelector('.container');
                         if (container) {
                             const notification = document.createElement('div');
-                            notification.className = 'alert alert-info alert-dismissible fade show';
+                            notification.className = `alert alert-${level} alert-dismissible fade show`;
                             notification.innerHTML = `
-                                ${message}
+                                <span></span>
                                 <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
                             `;
+                            // As text, since messages can include website names
+                            notification.querySelector('span').textContent = message;
 
                             // Insert at the top of the container
                             container.insertBefore(notification, container.firstChild);
@@ -889,6 +1077,8 @@ def create_app(data_manager, website_manager, domain_monitor):
                     prepareWebsiteTables();
                     setTimeout(fetchWebsiteStatus, 5000); // Initial delay before first refresh
                     setTimeout(checkMonitoringCompletion, 2000); // Start checking for monitor task completions
+                    checkProgress(); // Show an initial check that is already running
+                    checkIncidentEvents(); // Announce incidents opening and resolving
                 });
                 </script>
 
@@ -975,6 +1165,16 @@ def create_app(data_manager, website_manager, domain_monitor):
                         {% endif %}
                     </div>
                 </div>
+
+                <div class="card mb-4">
+                    <div class="card-header d-flex justify-content-between align-items-center">
+                        <h5 class="mb-0">Check Dispatch (Last Hour)</h5>
+                        <small class="text-muted" id="dispatchSummary"></small>
+                    </div>
+                    <div class="card-body">
+                        <canvas id="dispatchChart" height="100"></canvas>
+                    </div>
+                </div>
             </div>
 
             <div class="col-md-4">
@@ -1034,6 +1234,85 @@ def create_app(data_manager, website_manager, domain_monitor):
             </div>
         </div>
         {% endblock %}
+
+        {% block scripts %}
+        <script>
+        document.addEventListener('DOMContentLoaded', function() {
+            const DISPATCH_REFRESH_INTERVAL = 60000; // 1 minute
+            let dispatchChart = null;
+
+            // Checks started per 10-second bucket; a flat histogram means load is evenly spread
+            function fetchDispatchHistogram() {
+                fetch('/api/dispatch-histogram?minutes=60&bucket=10')
+                    .then(response => response.json())
+                    .then(data => {
+                        if (!data.success) return;
+                        const histogram = data.histogram;
+                        const labels = histogram.buckets.map(b => new Date(b.time).toLocaleTimeString());
+                        const counts = histogram.buckets.map(b => b.checks);
+
+                        document.getElementById('dispatchSummary').textContent =
+                            `mean ${histogram.mean}/bucket, peak ${histogram.max}` +
+                            (histogram.peak_to_mean ? ` (${histogram.peak_to_mean}x)` : '');
+
+                        if (dispatchChart) {
+                            dispatchChart.data.labels = labels;
+                            dispatchChart.data.datasets[0].data = counts;
+                            dispatchChart.update();
+                            return;
+                        }
+
+                        const ctx = document.getElementById('dispatchChart').getContext('2d');
+                        dispatchChart = new Chart(ctx, {
+                            type: 'bar',
+                            data: {
+                                labels: labels,
+                                datasets: [{
+                                    label: 'Checks started',
+                                    data: counts,
+                                    backgroundColor: 'rgba(0, 123, 255, 0.5)',
+                                    borderColor: 'rgba(0, 123, 255, 1)',
+                                    borderWidth: 1,
+                                    barPercentage: 1.0,
+                                    categoryPercentage: 1.0
+                                }]
+                            },
+                            options: {
+                                animation: false,
+                                scales: {
+                                    y: {
+                                        beginAtZero: true,
+                                        title: {
+                                            display: true,
+                                            text: 'Checks per 10s'
+                                        }
+                                    },
+                                    x: {
+                                        ticks: {
+                                            maxTicksLimit: 12
+                                        }
+                                    }
+                                },
+                                plugins: {
+                                    legend: {
+                                        display: false
+                                    }
+                                }
+                            }
+                        });
+                    })
+                    .catch(error => {
+                        console.error('Error fetching dispatch histogram:', error);
+                    })
+                    .finally(() => {
+                        setTimeout(fetchDispatchHistogram, DISPATCH_REFRESH_INTERVAL);
+                    });
+            }
+
+            fetchDispatchHistogram();
+        });
+        </script>
+        {% endblock %}
         """
 
         # Create websites list template
@@ -1219,6 +1498,57 @@ def create_app(data_manager, website_manager, domain_monitor):
                         <textarea class="form-control" id="description" name="description" rows="2">{{ form.description.data or '' }}</textarea>
                     </div>
 
+                    <div class="mb-3">
+                        <label for="check_interval_seconds" class="form-label">Check Interval in Seconds (Optional)</label>
+                        <input type="number" min="10" class="form-control {% if form.check_interval_seconds.errors %}is-invalid{% endif %}"
+                               id="check_interval_seconds" name="check_interval_seconds"
+                               value="{{ form.check_interval_seconds.data or '' }}" placeholder="Use the global check interval">
+                        {% if form.check_interval_seconds.errors %}
+                            <div class="invalid-feedback">
+                                {% for error in form.check_interval_seconds.errors %}
+                                    {{ error }}
+                                {% endfor %}
+                            </div>
+                        {% endif %}
+                        <small class="form-text text-muted">
+                            How often this site is checked, e.g. 30 for critical endpoints or 3600 for brochure sites
+                        </small>
+                    </div>
+
+                    <div class="row mb-3">
+                        {% for field in [form.min_check_interval_seconds, form.max_check_interval_seconds] %}
+                        <div class="col-md-6">
+                            <label for="{{ field.name }}" class="form-label">{{ field.label.text }} (Optional)</label>
+                            <input type="number" min="10" class="form-control {% if field.errors %}is-invalid{% endif %}"
+                                   id="{{ field.name }}" name="{{ field.name }}" value="{{ field.data or '' }}">
+                            {% if field.errors %}
+                                <div class="invalid-feedback">
+                                    {% for error in field.errors %}
+                                        {{ error }}
+                                    {% endfor %}
+                                </div>
+                            {% endif %}
+                        </div>
+                        {% endfor %}
+                        <div class="col-12">
+                            <small class="form-text text-muted">
+                                Failing sites are rechecked faster and long-stable sites slower, within these bounds
+                            </small>
+                        </div>
+                    </div>
+
+                    <div class="mb-3">
+                        <label for="priority" class="form-label">Priority</label>
+                        <select class="form-select" id="priority" name="priority">
+                            {% for value, label in form.priority.choices %}
+                                <option value="{{ value }}" {% if form.priority.data == value %}selected{% endif %}>{{ label }}</option>
+                            {% endfor %}
+                        </select>
+                        <small class="form-text text-muted">
+                            Low-priority checks are postponed when the monitor falls behind
+                        </small>
+                    </div>
+
                     <div class="row mb-3">
                         <div class="col-md-4">
                             <div class="form-check">
@@ -2,14 +2,46 @@
 Data storage and retrieval for the Personal Domain Health Monitor
 """
 import os
+import math
+import time
 import sqlite3
 import json
 import logging
 import threading
 from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import Future
+
+from batch_writer import BatchWriter
 
 logger = logging.getLogger(__name__)
 
+# WAL pages written before SQLite folds them back into the database file
+WAL_AUTOCHECKPOINT_PAGES = 1000
+# Size the WAL file is truncated to after a checkpoint
+WAL_SIZE_LIMIT_BYTES = 64 * 1024 * 1024
+# Incident transitions kept for get_incident_events
+MAX_INCIDENT_EVENTS = 100
+
+CHECK_RESULT_INSERT = '''
+INSERT INTO check_results (
+    website_id, timestamp, is_up, status_code, response_time,
+    error, ssl_valid, ssl_days_remaining, security_score,
+    ping_time, redirect_url, content_size, details,
+    dns_time, connect_time, tls_time, ttfb, download_time,
+    retry_count, final_attempt_outcome
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Point a site's status at a newly stored result, unless a newer one is already there
+WEBSITE_STATUS_UPSERT = '''
+INSERT INTO website_status (website_id, check_result_id, timestamp) VALUES (?, ?, ?)
+ON CONFLICT(website_id) DO UPDATE SET
+    check_result_id = excluded.check_result_id,
+    timestamp = excluded.timestamp
+WHERE excluded.timestamp >= website_status.timestamp
+'''
+
 class DataManager:
     """
     Handles data storage and retrieval for the application.
@@ -21,6 +53,15 @@ class DataManager:
     
     def __init__(self, db_path):
         self.db_path = db_path
+        # Set by start_writer; check results are written synchronously until then
+        self.writer = None
+        # Open incidents by website id, loaded on first use and kept in step
+        # with every write (see _update_incidents)
+        self._incident_lock = threading.Lock()
+        self._open_incidents = None
+        self._incident_subscribers = []
+        self._incident_events = deque(maxlen=MAX_INCIDENT_EVENTS)
+        self._incident_seq = 0
     
     def _get_connection(self):
         """Get a thread-local database connection"""
@@ -28,6 +69,11 @@ class DataManager:
             self._local.conn = sqlite3.connect(self.db_path)
             # Enable foreign keys
             self._local.conn.execute("PRAGMA foreign_keys = ON")
+            # In WAL mode NORMAL only syncs at checkpoints; a commit survives an
+            # application crash, and readers never wait for the writer
+            self._local.conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn.execute(f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT_PAGES}")
+            self._local.conn.execute(f"PRAGMA journal_size_limit = {WAL_SIZE_LIMIT_BYTES}")
             # Return rows as dictionaries
             self._local.conn.row_factory = sqlite3.Row
         return self._local.conn
@@ -45,11 +91,71 @@ class DataManager:
             self._local.conn = None
             self._local.cursor = None
     
+    def start_writer(self, batch_ms=50, batch_rows=500):
+        """
+        Send check results through a batched writer thread from now on
+        
+        Args:
+            batch_ms (int): Longest a result waits to share a commit
+            batch_rows (int): Most results committed in one transaction
+        """
+        if self.writer is None:
+            self.writer = BatchWriter(self._get_connection, batch_ms=batch_ms, batch_rows=batch_rows)
+            self.writer.start()
+    
+    def stop_writer(self):
+        """Commit any queued results and stop the writer thread"""
+        if self.writer is not None:
+            self.writer.stop()
+            self.writer = None
+    
+    def flush(self, timeout=None):
+        """
+        Wait until every check result stored so far is committed
+        
+        Returns:
+            bool: True if they were committed in time
+        """
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout=timeout)
+    
+    def _write(self, operation, *args):
+        """
+        Run a write on the writer thread, or right away if there is none
+        
+        Args:
+            operation (callable): Called as operation(cursor, *args); must not commit
+            
+        Returns:
+            Future: Completes when the write is committed
+        """
+        if self.writer is not None:
+            return self.writer.submit(operation, *args)
+        
+        conn = self._get_connection()
+        future = Future()
+        try:
+            value = operation(self._get_cursor(), *args)
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Database write failed: {str(e)}")
+            conn.rollback()
+            future.set_exception(e)
+            return future
+        future.set_result(value)
+        return future
+    
     def initialize_database(self):
         """Create database tables if they don't exist"""
         conn = self._get_connection()
         cursor = self._get_cursor()
         
+        # Write-ahead logging lets dashboard requests read while results are
+        # being written, instead of failing with "database is locked". The
+        # mode is stored in the database file, so this only changes it once
+        cursor.execute("PRAGMA journal_mode = WAL")
+        
         # Create websites table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS websites (
@@ -62,11 +168,23 @@ class DataManager:
             alerts_enabled BOOLEAN DEFAULT 1,
             alert_emails TEXT,
             alert_phone TEXT,
+            check_interval_seconds INTEGER,
+            min_check_interval_seconds INTEGER,
+            max_check_interval_seconds INTEGER,
+            priority TEXT DEFAULT 'normal',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         ''')
         
+        # Per-site check intervals, bounds and priority, added to databases created before they existed
+        self._add_missing_columns(cursor, 'websites', {
+            'check_interval_seconds': 'INTEGER',
+            'min_check_interval_seconds': 'INTEGER',
+            'max_check_interval_seconds': 'INTEGER',
+            'priority': "TEXT DEFAULT 'normal'"
+        })
+        
         # Create check_results table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS check_results (
@@ -84,10 +202,35 @@ class DataManager:
             redirect_url TEXT,
             content_size INTEGER,
             details TEXT,
+            dns_time REAL,
+            connect_time REAL,
+            tls_time REAL,
+            ttfb REAL,
+            download_time REAL,
+            retry_count INTEGER DEFAULT 0,
+            final_attempt_outcome TEXT,
             FOREIGN KEY (website_id) REFERENCES websites(id) ON DELETE CASCADE
         )
         ''')
         
+        # Add per-phase timing and retry columns to databases created before they existed
+        self._add_missing_columns(cursor, 'check_results', {
+            'dns_time': 'REAL',
+            'connect_time': 'REAL',
+            'tls_time': 'REAL',
+            'ttfb': 'REAL',
+            'download_time': 'REAL',
+            'retry_count': 'INTEGER DEFAULT 0',
+            'final_attempt_outcome': 'TEXT'
+        })
+        
+        # Per-site time-range queries and "latest result" lookups seek this index
+        # instead of scanning every site's history
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_check_results_website_time
+        ON check_results (website_id, timestamp)
+        ''')
+        
         # Create incidents table (for tracking downtime)
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS incidents (
@@ -102,113 +245,520 @@ class DataManager:
         )
         ''')
         
+        # Create ssl_certificates table (certificate cache shared by checks and the API)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ssl_certificates (
+            host TEXT NOT NULL,
+            port INTEGER NOT NULL,
+            serial_number TEXT,
+            not_after TIMESTAMP,
+            der BLOB NOT NULL,
+            fetched_at TIMESTAMP,
+            PRIMARY KEY (host, port)
+        )
+        ''')
+        
+        # Create work_leases table (which checker instance owns each site; times are Unix seconds)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS work_leases (
+            website_id INTEGER PRIMARY KEY,
+            instance_id TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            FOREIGN KEY (website_id) REFERENCES websites(id) ON DELETE CASCADE
+        )
+        ''')
+        
+        # Create checker_instances table (heartbeats, so work is split between live instances)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS checker_instances (
+            instance_id TEXT PRIMARY KEY,
+            heartbeat_at REAL NOT NULL
+        )
+        ''')
+        
+        # Create website_status table (each site's latest check result, kept
+        # current on every write so status pages don't query per site)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS website_status (
+            website_id INTEGER PRIMARY KEY,
+            check_result_id INTEGER NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            FOREIGN KEY (website_id) REFERENCES websites(id) ON DELETE CASCADE
+        )
+        ''')
+        
+        # Backfill sites checked before the table existed
+        cursor.execute('''
+        INSERT INTO website_status (website_id, check_result_id, timestamp)
+        SELECT r.website_id, r.id, r.timestamp
+        FROM websites w
+        JOIN check_results r ON r.id = (
+            SELECT id FROM check_results
+            WHERE website_id = w.id
+            ORDER BY timestamp DESC
+            LIMIT 1
+        )
+        WHERE w.id NOT IN (SELECT website_id FROM website_status)
+        ''')
+        if cursor.rowcount > 0:
+            logger.info(f"Backfilled the latest status of {cursor.rowcount} websites")
+        
         conn.commit()
     
+    def _add_missing_columns(self, cursor, table, columns):
+        """
+        Add columns that an older database is missing
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor to use
+            table (str): Table name
+            columns (dict): Column name -> SQL type/default clause
+        """
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row['name'] for row in cursor.fetchall()}
+        
+        for name, definition in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+                logger.info(f"Added column {table}.{name}")
+    
     def store_check_result(self, website_id, result):
         """
         Store a check result in the database
         
+        With the writer started (see start_writer) the result is queued and
+        committed with others; otherwise it is written before returning.
+        
         Args:
             website_id (int): ID of the website
             result (dict): Check result
+            
+        Returns:
+            Future: Completes once the result and any incident change are
+                committed, or fails with the database error
         """
-        conn = self._get_connection()
-        cursor = self._get_cursor()
+        return self._write_with_events(self._insert_check_result, website_id, result)
+    
+    def _insert_check_result(self, cursor, events, website_id, result):
+        """Insert a check result and open or resolve its incident; the caller commits"""
+        row = self._check_result_row(website_id, result)
+        cursor.execute(CHECK_RESULT_INSERT, row)
         
+        # row[1] is the result's timestamp
+        cursor.execute(WEBSITE_STATUS_UPSERT, (website_id, cursor.lastrowid, row[1]))
+        
+        # Check if need to create or resolve an incident, in the same transaction
+        self._update_incidents(cursor, events, website_id, result)
+    
+    def _check_result_row(self, website_id, result):
+        """Build the check_results row for a result, in CHECK_RESULT_INSERT order"""
         # Convert any complex data to JSON string
         details = {k: v for k, v in result.items() if k not in [
             'url', 'timestamp', 'is_up', 'status_code', 'response_time', 
             'error', 'ssl_valid', 'ssl_days_remaining', 'security_score',
-            'ping_time', 'redirect_url', 'content_size'
+            'ping_time', 'redirect_url', 'content_size',
+            'dns_time', 'connect_time', 'tls_time', 'ttfb', 'download_time',
+            'retry_count', 'final_attempt_outcome'
         ]}
         
-        try:
-            cursor.execute('''
-            INSERT INTO check_results (
-                website_id, timestamp, is_up, status_code, response_time,
-                error, ssl_valid, ssl_days_remaining, security_score,
-                ping_time, redirect_url, content_size, details
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                website_id,
-                result.get('timestamp', datetime.now().isoformat()),
-                result.get('is_up', False),
-                result.get('status_code'),
-                result.get('response_time'),
-                result.get('error'),
-                result.get('ssl_valid'),
-                result.get('ssl_days_remaining'),
-                result.get('security_score'),
-                result.get('ping_time'),
-                result.get('redirect_url'),
-                result.get('content_size'),
-                json.dumps(details) if details else None
-            ))
-            
-            conn.commit()
+        return (
+            website_id,
+            result.get('timestamp', datetime.now().isoformat()),
+            result.get('is_up', False),
+            result.get('status_code'),
+            result.get('response_time'),
+            result.get('error'),
+            result.get('ssl_valid'),
+            result.get('ssl_days_remaining'),
+            result.get('security_score'),
+            result.get('ping_time'),
+            result.get('redirect_url'),
+            result.get('content_size'),
+            json.dumps(details) if details else None,
+            result.get('dns_time'),
+            result.get('connect_time'),
+            result.get('tls_time'),
+            result.get('ttfb'),
+            result.get('download_time'),
+            result.get('retry_count', 0),
+            result.get('final_attempt_outcome')
+        )
+    
+    def store_check_results_bulk(self, results):
+        """
+        Store many check results in one transaction
+        
+        Rows are inserted with a single executemany, and the incidents the
+        batch opens or resolves with one statement per kind. Results for
+        websites that no longer exist are skipped.
+        
+        Args:
+            results (iterable): (website_id, result) pairs, oldest first
             
-            # Check if need to create or resolve an incident
-            self._update_incidents(website_id, result.get('is_up', False))
+        Returns:
+            Future: Completes with the number of results stored once they
+                are committed, or fails with the database error
+        """
+        return self._write_with_events(self._insert_check_results_bulk, list(results))
+    
+    def _insert_check_results_bulk(self, cursor, events, results):
+        """Insert a batch of check results and their incident changes; the caller commits"""
+        if not results:
+            return 0
+        
+        # A website deleted mid-check would fail the foreign key and with it the whole batch
+        cursor.execute("SELECT id FROM websites")
+        existing = {row['id'] for row in cursor.fetchall()}
+        results = [(website_id, result) for website_id, result in results if website_id in existing]
+        
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM check_results")
+        last_id = cursor.fetchone()[0]
+        cursor.executemany(CHECK_RESULT_INSERT,
+                           [self._check_result_row(website_id, result) for website_id, result in results])
+        
+        # Each site's last row in the batch becomes its status (SQLite takes
+        # the bare timestamp column from the row with MAX(id))
+        cursor.execute('''
+        INSERT INTO website_status (website_id, check_result_id, timestamp)
+        SELECT website_id, MAX(id), timestamp FROM check_results
+        WHERE id > ?
+        GROUP BY website_id
+        ON CONFLICT(website_id) DO UPDATE SET
+            check_result_id = excluded.check_result_id,
+            timestamp = excluded.timestamp
+        WHERE excluded.timestamp >= website_status.timestamp
+        ''', (last_id,))
+        
+        self._update_incidents_bulk(cursor, events, results)
+        
+        return len(results)
+    
+    def _update_incidents_bulk(self, cursor, events, results):
+        """
+        Open and resolve the incidents for a batch of results; the caller commits
+        
+        Each site's results are walked in order against the open-incident
+        cache, so a site that went down and back up within the batch still
+        gets its incident. The transitions are then written with one
+        statement per kind instead of a round trip per site. Incidents start
+        and end at the timestamps of the results that opened and resolved them.
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor of the write's transaction
+            events (list): Transition events are appended here
+            results (list): (website_id, result) pairs, oldest first
+        """
+        with self._incident_lock:
+            if self._open_incidents is None:
+                self._open_incidents = self._load_open_incidents(cursor)
+            open_incidents = dict(self._open_incidents)
+        
+        # website_id -> (incident, end_time) for incidents open before the batch
+        resolves = {}
+        # (website_id, start_time, end_time, opening result) for incidents opened
+        # and resolved within the batch
+        closed = []
+        # website_id -> (start_time, opening result) for incidents still open after the batch
+        opening = {}
+        for website_id, result in results:
+            timestamp = result.get('timestamp') or datetime.now().isoformat()
+            is_up = result.get('is_up', False)
+            if website_id in opening:
+                if is_up:
+                    start_time, opened_by = opening.pop(website_id)
+                    closed.append((website_id, start_time, timestamp, opened_by))
+            elif website_id in open_incidents and website_id not in resolves:
+                if is_up:
+                    resolves[website_id] = (open_incidents[website_id], timestamp)
+            elif not is_up:
+                opening[website_id] = (timestamp, result)
+        
+        if resolves:
+            # Nothing to do for incidents another process resolved first
+            ids = [incident['id'] for incident, _ in resolves.values()]
+            cursor.execute(f'''
+            SELECT id FROM incidents WHERE resolved = 0 AND id IN ({', '.join('?' * len(ids))})
+            ''', ids)
+            still_open = {row['id'] for row in cursor.fetchall()}
+        
+            updates = []
+            for website_id, (incident, end_time) in resolves.items():
+                if incident['id'] not in still_open:
+                    continue
+                duration = self._duration(incident['start_time'], end_time)
+                updates.append((end_time, duration, incident['id']))
+                events.append({'event': 'resolved', 'website_id': website_id,
+                               'incident_id': incident['id'], 'start_time': incident['start_time'],
+                               'end_time': end_time, 'duration': duration})
+            cursor.executemany('''
+            UPDATE incidents SET
+                resolved = 1,
+                end_time = ?,
+                duration = ?
+            WHERE id = ?
+            ''', updates)
+        
+        if closed or opening:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM incidents")
+            last_id = cursor.fetchone()[0]
+        
+            cursor.executemany('''
+            INSERT INTO incidents (website_id, start_time, end_time, duration, resolved)
+            VALUES (?, ?, ?, ?, 1)
+            ''', [(website_id, start_time, end_time, self._duration(start_time, end_time))
+                  for website_id, start_time, end_time, _ in closed])
+        
+            # Unless another process already has one open for the site
+            cursor.executemany('''
+            INSERT INTO incidents (website_id, start_time)
+            SELECT ?, ? WHERE NOT EXISTS (
+                SELECT 1 FROM incidents WHERE website_id = ? AND resolved = 0
+            )
+            ''', [(website_id, start_time, website_id) for website_id, (start_time, _) in opening.items()])
+        
+            cursor.execute('''
+            SELECT id, website_id, start_time, end_time, duration, resolved FROM incidents
+            WHERE id > ?
+            ORDER BY id
+            ''', (last_id,))
+            # The closed incidents come first, in insertion order
+            rows = cursor.fetchall()
+            for index, row in enumerate(rows):
+                opened_by = closed[index][3] if index < len(closed) else opening[row['website_id']][1]
+                events.append(self._opened_event(row['website_id'], row['id'], row['start_time'], opened_by))
+                if row['resolved']:
+                    events.append({'event': 'resolved', 'website_id': row['website_id'],
+                                   'incident_id': row['id'], 'start_time': row['start_time'],
+                                   'end_time': row['end_time'], 'duration': row['duration']})
+        
+        opened = {}
+        if opening:
+            # Includes incidents another process opened for these sites
+            ids = list(opening)
+            cursor.execute(f'''
+            SELECT id, website_id, start_time FROM incidents
+            WHERE resolved = 0 AND website_id IN ({', '.join('?' * len(ids))})
+            ''', ids)
+            opened = {row['website_id']: {'id': row['id'], 'start_time': row['start_time']}
+                      for row in cursor.fetchall()}
+        
+        with self._incident_lock:
+            if self._open_incidents is not None:
+                for website_id in resolves:
+                    self._open_incidents.pop(website_id, None)
+                self._open_incidents.update(opened)
+    
+    def _duration(self, start_time, end_time):
+        """Get the seconds between two ISO format timestamps"""
+        return int((datetime.fromisoformat(end_time) - datetime.fromisoformat(start_time)).total_seconds())
+    
+    def _write_with_events(self, operation, *args):
+        """
+        Run a write that may open or resolve incidents
+        
+        The incident transitions it causes go to the subscribers once the
+        write is committed. If it fails, the open-incident cache may hold
+        changes that were rolled back, so it is reloaded on next use.
+        
+        Returns:
+            Future: As for _write
+        """
+        events = []
+        future = self._write(operation, events, *args)
+        
+        def on_done(future):
+            if future.exception() is not None:
+                with self._incident_lock:
+                    self._open_incidents = None
+            else:
+                self._notify_incident_subscribers(events)
+        
+        future.add_done_callback(on_done)
+        return future
+    
+    def subscribe_incidents(self, callback):
+        """
+        Get told about incidents opening and resolving
+        
+        Args:
+            callback (callable): Called with an event dict once the change is
+                committed: 'seq' (increasing per DataManager), 'event' ('opened'
+                or 'resolved'), 'website_id', 'incident_id', 'start_time', for
+                opened incidents the 'status_code' and 'response_time' of the
+                result that opened them, and for resolved incidents 'end_time'
+                and 'duration' in seconds.
+                Runs on the writing thread, so it should return quickly.
+        """
+        self._incident_subscribers.append(callback)
+    
+    def get_incident_events(self, after=0):
+        """
+        Get recent incident transitions, oldest first
+        
+        Args:
+            after (int): Only return events with a larger 'seq'
             
-        except sqlite3.Error as e:
-            logger.error(f"Database error storing check result: {str(e)}")
-            conn.rollback()
+        Returns:
+            list: Event dicts as passed to subscribe_incidents callbacks
+        """
+        with self._incident_lock:
+            return [event for event in self._incident_events if event['seq'] > after]
+    
+    def _notify_incident_subscribers(self, events):
+        for event in events:
+            with self._incident_lock:
+                self._incident_seq += 1
+                event['seq'] = self._incident_seq
+                self._incident_events.append(event)
+            for callback in self._incident_subscribers:
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.error(f"Error in incident subscriber: {str(e)}")
+    
+    def refresh_open_incidents(self):
+        """
+        Reload the open-incident cache from the database
+        
+        Picks up incidents changed by other processes sharing the database
+        (a separate dashboard or other checker instances). The reload runs
+        as a write, so it sees every incident change queued before it and
+        none queued after it can be lost when the cache is replaced.
+        
+        Returns:
+            list: IDs of websites with an open incident
+        """
+        return self._write(self._reload_open_incidents).result()
     
-    def _update_incidents(self, website_id, is_up):
+    def _reload_open_incidents(self, cursor):
+        """Replace the open-incident cache from the database; runs as a write"""
+        open_incidents = self._load_open_incidents(cursor)
+        with self._incident_lock:
+            self._open_incidents = open_incidents
+        return list(open_incidents)
+    
+    def _load_open_incidents(self, cursor):
+        """Read the unresolved incidents as website_id -> {'id', 'start_time'}"""
+        cursor.execute('''
+        SELECT id, website_id, start_time FROM incidents WHERE resolved = 0
+        ''')
+        return {row['website_id']: {'id': row['id'], 'start_time': row['start_time']}
+                for row in cursor.fetchall()}
+    
+    def _opened_event(self, website_id, incident_id, start_time, result):
+        """Build the event for an incident opened by a down result"""
+        return {'event': 'opened', 'website_id': website_id, 'incident_id': incident_id,
+                'start_time': start_time, 'status_code': result.get('status_code'),
+                'response_time': result.get('response_time')}
+    
+    def _update_incidents(self, cursor, events, website_id, result):
         """
-        Update incidents based on check result
+        Open or resolve a website's incident when its state changes; the caller commits
+        
+        Open incidents are cached in memory, so a result that doesn't change
+        the site's state costs no queries at all.
         
         Args:
+            cursor (sqlite3.Cursor): Cursor of the write's transaction
+            events (list): Transition events are appended here
             website_id (int): ID of the website
-            is_up (bool): Whether the website is up
+            result (dict): Check result
         """
-        conn = self._get_connection()
-        cursor = self._get_cursor()
+        is_up = result.get('is_up', False)
+        with self._incident_lock:
+            if self._open_incidents is None:
+                self._open_incidents = self._load_open_incidents(cursor)
+            incident = self._open_incidents.get(website_id)
         
-        try:
-            if not is_up:
-                # Check if there's an existing unresolved incident
-                cursor.execute('''
-                SELECT id FROM incidents 
-                WHERE website_id = ? AND resolved = 0
-                ''', (website_id,))
-                
-                existing = cursor.fetchone()
-                
-                if not existing:
-                    # Create new incident
-                    cursor.execute('''
-                    INSERT INTO incidents (website_id, start_time)
-                    VALUES (?, ?)
-                    ''', (website_id, datetime.now().isoformat()))
+        if not is_up and incident is None:
+            # Create new incident, unless another process already has
+            start_time = datetime.now().isoformat()
+            cursor.execute('''
+            INSERT INTO incidents (website_id, start_time)
+            SELECT ?, ? WHERE NOT EXISTS (
+                SELECT 1 FROM incidents WHERE website_id = ? AND resolved = 0
+            )
+            ''', (website_id, start_time, website_id))
+            
+            if cursor.rowcount:
+                incident = {'id': cursor.lastrowid, 'start_time': start_time}
+                events.append(self._opened_event(website_id, incident['id'], start_time, result))
             else:
-                # Check if there's an incident to resolve
                 cursor.execute('''
                 SELECT id, start_time FROM incidents 
                 WHERE website_id = ? AND resolved = 0
                 ''', (website_id,))
-                
-                incident = cursor.fetchone()
-                
-                if incident:
-                    # Resolve the incident
-                    now = datetime.now()
-                    start_time = datetime.fromisoformat(incident['start_time'])
-                    duration = int((now - start_time).total_seconds())
-                    
-                    cursor.execute('''
-                    UPDATE incidents SET 
-                        resolved = 1,
-                        end_time = ?,
-                        duration = ?
-                    WHERE id = ?
-                    ''', (now.isoformat(), duration, incident['id']))
+                row = cursor.fetchone()
+                incident = {'id': row['id'], 'start_time': row['start_time']}
+            
+            with self._incident_lock:
+                if self._open_incidents is not None:
+                    self._open_incidents[website_id] = incident
+        
+        elif is_up and incident is not None:
+            # Resolve the incident
+            now = datetime.now()
+            start_time = datetime.fromisoformat(incident['start_time'])
+            duration = int((now - start_time).total_seconds())
+            
+            cursor.execute('''
+            UPDATE incidents SET 
+                resolved = 1,
+                end_time = ?,
+                duration = ?
+            WHERE id = ? AND resolved = 0
+            ''', (now.isoformat(), duration, incident['id']))
+            
+            # Nothing updated if another process resolved it first
+            if cursor.rowcount:
+                events.append({'event': 'resolved', 'website_id': website_id,
+                               'incident_id': incident['id'], 'start_time': incident['start_time'],
+                               'end_time': now.isoformat(), 'duration': duration})
+            
+            with self._incident_lock:
+                if self._open_incidents is not None:
+                    self._open_incidents.pop(website_id, None)
+    
+    def store_ssl_certificate(self, host, port, serial_number, not_after, der, fetched_at):
+        """
+        Store a certificate in the certificate cache table
+        
+        Args:
+            host (str): Hostname
+            port (int): Port
+            serial_number (str): Certificate serial number (hex)
+            not_after (str): Expiry time (ISO format)
+            der (bytes): DER-encoded certificate
+            fetched_at (str): When the certificate was seen (ISO format)
+        """
+        conn = self._get_connection()
+        cursor = self._get_cursor()
+        
+        try:
+            cursor.execute('''
+            INSERT OR REPLACE INTO ssl_certificates (
+                host, port, serial_number, not_after, der, fetched_at
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ''', (host, port, serial_number, not_after, sqlite3.Binary(der), fetched_at))
             
             conn.commit()
         except sqlite3.Error as e:
-            logger.error(f"Database error updating incidents: {str(e)}")
+            logger.error(f"Database error storing SSL certificate: {str(e)}")
             conn.rollback()
     
+    def get_ssl_certificates(self):
+        """
+        Get all cached certificates
+        
+        Returns:
+            list: Certificate rows
+        """
+        cursor = self._get_cursor()
+        
+        cursor.execute("SELECT * FROM ssl_certificates")
+        
+        return [dict(row) for row in cursor.fetchall()]
+    
     def get_check_results(self, website_id, limit=100, offset=0):
         """
         Get check results for a website
@@ -243,6 +793,33 @@ class DataManager:
             
         return results
     
+    def get_latest_check_results(self):
+        """
+        Get the latest check result of every website in one query
+        
+        Returns:
+            dict: Website ID -> latest check result, for sites checked at least once
+        """
+        cursor = self._get_cursor()
+        
+        cursor.execute('''
+        SELECT r.* FROM website_status s
+        JOIN check_results r ON r.id = s.check_result_id
+        ''')
+        
+        results = {}
+        for row in cursor.fetchall():
+            result = dict(row)
+            # Parse JSON details if present
+            if result.get('details'):
+                try:
+                    result['details'] = json.loads(result['details'])
+                except:
+                    pass
+            results[result['website_id']] = result
+            
+        return results
+    
     def get_latest_check_result(self, website_id):
         """
         Get the latest check result for a website
@@ -297,7 +874,7 @@ class DataManager:
                SUM(CASE WHEN is_up=1 THEN 1 ELSE 0 END) as up_count
         FROM check_results
         WHERE website_id = ? AND 
-              datetime(timestamp) BETWEEN ? AND ?
+              timestamp >= ? AND timestamp <= ?
         ''', (website_id, start_date.isoformat(), end_date.isoformat()))
         
         result = cursor.fetchone()
@@ -330,7 +907,7 @@ class DataManager:
                MAX(response_time) as max_time
         FROM check_results
         WHERE website_id = ? AND 
-              datetime(timestamp) BETWEEN ? AND ? AND
+              timestamp >= ? AND timestamp <= ? AND
               is_up = 1
         ''', (website_id, start_date.isoformat(), end_date.isoformat()))
         
@@ -404,17 +981,23 @@ class DataManager:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # SQLite date formatting
+        # Timestamps are ISO strings, so the range is compared on the raw
+        # column (not datetime(timestamp)) and can use the website/time index
         cursor.execute('''
         SELECT 
             date(timestamp) as day,
             COUNT(*) as checks,
             SUM(CASE WHEN is_up=1 THEN 1 ELSE 0 END) as up_count,
             AVG(response_time) as avg_response_time,
-            AVG(security_score) as avg_security_score
+            AVG(security_score) as avg_security_score,
+            AVG(dns_time) as avg_dns_time,
+            AVG(connect_time) as avg_connect_time,
+            AVG(tls_time) as avg_tls_time,
+            AVG(ttfb) as avg_ttfb,
+            AVG(download_time) as avg_download_time
         FROM check_results
         WHERE website_id = ? AND 
-              datetime(timestamp) BETWEEN ? AND ?
+              timestamp >= ? AND timestamp <= ?
         GROUP BY date(timestamp)
         ORDER BY date(timestamp)
         ''', (website_id, start_date.isoformat(), end_date.isoformat()))
@@ -429,11 +1012,182 @@ class DataManager:
                 day_data['uptime_percentage'] = 100.0
                 
             # Round values
-            if day_data['avg_response_time'] is not None:
-                day_data['avg_response_time'] = round(day_data['avg_response_time'], 2)
-            if day_data['avg_security_score'] is not None:
-                day_data['avg_security_score'] = round(day_data['avg_security_score'], 2)
+            for key in ('avg_response_time', 'avg_security_score', 'avg_dns_time',
+                        'avg_connect_time', 'avg_tls_time', 'avg_ttfb', 'avg_download_time'):
+                if day_data[key] is not None:
+                    day_data[key] = round(day_data[key], 2)
                 
             results.append(day_data)
             
-        return results
\ No newline at end of file
+        return results
+    
+    def get_dispatch_histogram(self, minutes=60, bucket_seconds=10):
+        """
+        Count check start times in fixed-size buckets
+        
+        Args:
+            minutes (int): How far back to look
+            bucket_seconds (int): Bucket width in seconds
+            
+        Returns:
+            dict: 'buckets' (list of {'time', 'checks'}, oldest first, including
+                empty buckets), 'mean', 'max' and 'peak_to_mean'
+        """
+        cursor = self._get_cursor()
+        bucket_seconds = max(1, int(bucket_seconds))
+        
+        end_date = datetime.now()
+        start_date = end_date - timedelta(minutes=minutes)
+        
+        # Timestamps are stored as naive local ISO strings; strftime('%s') reads
+        # them as UTC, which is consistent as long as it's undone the same way.
+        # The website_id list lets each site's range seek the website/time
+        # index instead of scanning every result ever stored
+        cursor.execute('''
+        SELECT 
+            CAST(strftime('%s', timestamp) AS INTEGER) / ? AS bucket,
+            COUNT(*) as checks
+        FROM check_results
+        WHERE website_id IN (SELECT id FROM websites) AND timestamp >= ?
+        GROUP BY bucket
+        ''', (bucket_seconds, start_date.isoformat()))
+        counts = {row['bucket']: row['checks'] for row in cursor.fetchall()}
+        
+        epoch = datetime(1970, 1, 1)
+        first = int((start_date - epoch).total_seconds()) // bucket_seconds
+        last = int((end_date - epoch).total_seconds()) // bucket_seconds
+        buckets = [
+            {
+                'time': (epoch + timedelta(seconds=bucket * bucket_seconds)).isoformat(),
+                'checks': counts.get(bucket, 0)
+            }
+            for bucket in range(first, last + 1)
+        ]
+        
+        total = sum(bucket['checks'] for bucket in buckets)
+        mean = total / len(buckets) if buckets else 0
+        peak = max((bucket['checks'] for bucket in buckets), default=0)
+        
+        return {
+            'bucket_seconds': bucket_seconds,
+            'buckets': buckets,
+            'mean': round(mean, 2),
+            'max': peak,
+            'peak_to_mean': round(peak / mean, 2) if mean else None
+        }
+
+    def claim_leases(self, instance_id, website_ids, lease_seconds):
+        """
+        Claim this instance's share of the websites for a time-bounded lease
+        
+        Runs as one write transaction, so concurrent instances never claim the
+        same site. Each live instance (one that has heartbeated within
+        lease_seconds) gets an equal share: leases over the share are
+        released for others to pick up, leases still held are renewed, and
+        unleased or expired sites are claimed up to the share.
+        
+        Args:
+            instance_id (str): This checker instance
+            website_ids (list): All websites that need checking
+            lease_seconds (float): Lease length
+            
+        Returns:
+            list: IDs of the websites this instance now holds, or None on a database error
+        """
+        conn = self._get_connection()
+        cursor = self._get_cursor()
+        now = time.time()
+        expires_at = now + lease_seconds
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            cursor.execute('''
+            INSERT INTO checker_instances (instance_id, heartbeat_at) VALUES (?, ?)
+            ON CONFLICT(instance_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            ''', (instance_id, now))
+            cursor.execute("DELETE FROM checker_instances WHERE heartbeat_at < ?", (now - lease_seconds,))
+            cursor.execute("SELECT COUNT(*) AS live FROM checker_instances")
+            share = math.ceil(len(website_ids) / max(1, cursor.fetchone()['live']))
+            
+            cursor.execute("SELECT website_id, instance_id FROM work_leases WHERE expires_at > ?", (now,))
+            owners = {row['website_id']: row['instance_id'] for row in cursor.fetchall()}
+            
+            wanted = set(website_ids)
+            held = sorted(website_id for website_id, owner in owners.items()
+                          if owner == instance_id and website_id in wanted)
+            release = held[share:]
+            held = held[:share]
+            free = [website_id for website_id in website_ids if website_id not in owners]
+            claimed = free[:share - len(held)]
+            
+            if release:
+                cursor.executemany("DELETE FROM work_leases WHERE website_id = ? AND instance_id = ?",
+                                   [(website_id, instance_id) for website_id in release])
+            # Upsert also takes over expired leases left by instances that stopped
+            cursor.executemany('''
+            INSERT INTO work_leases (website_id, instance_id, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(website_id) DO UPDATE SET
+                instance_id = excluded.instance_id,
+                expires_at = excluded.expires_at
+            ''', [(website_id, instance_id, expires_at) for website_id in held + claimed])
+            
+            conn.commit()
+            return held + claimed
+        except sqlite3.Error as e:
+            logger.error(f"Database error claiming work leases: {str(e)}")
+            conn.rollback()
+            return None
+    
+    def renew_leases(self, instance_id, lease_seconds):
+        """
+        Extend the unexpired leases an instance holds and record its heartbeat
+        
+        Args:
+            instance_id (str): This checker instance
+            lease_seconds (float): Lease length from now
+            
+        Returns:
+            list: IDs of the websites still held, or None on a database error
+        """
+        conn = self._get_connection()
+        cursor = self._get_cursor()
+        now = time.time()
+        
+        try:
+            cursor.execute('''
+            INSERT INTO checker_instances (instance_id, heartbeat_at) VALUES (?, ?)
+            ON CONFLICT(instance_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            ''', (instance_id, now))
+            cursor.execute('''
+            UPDATE work_leases SET expires_at = ? WHERE instance_id = ? AND expires_at > ?
+            ''', (now + lease_seconds, instance_id, now))
+            cursor.execute('''
+            SELECT website_id FROM work_leases WHERE instance_id = ? AND expires_at > ?
+            ''', (instance_id, now))
+            held = [row['website_id'] for row in cursor.fetchall()]
+            
+            conn.commit()
+            return held
+        except sqlite3.Error as e:
+            logger.error(f"Database error renewing work leases: {str(e)}")
+            conn.rollback()
+            return None
+    
+    def release_leases(self, instance_id):
+        """
+        Give up every lease an instance holds, so peers take over immediately
+        
+        Args:
+            instance_id (str): This checker instance
+        """
+        conn = self._get_connection()
+        cursor = self._get_cursor()
+        
+        try:
+            cursor.execute("DELETE FROM work_leases WHERE instance_id = ?", (instance_id,))
+            cursor.execute("DELETE FROM checker_instances WHERE instance_id = ?", (instance_id,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Database error releasing work leases: {str(e)}")
+            conn.rollback()
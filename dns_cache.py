@@ -0,0 +1,125 @@
+"""
+Shared DNS resolver cache for the Personal Domain Health Monitor
+"""
+import time
+import socket
+import logging
+import threading
+
+# Use record TTLs from dnspython when it is installed
+try:
+    import dns.resolver
+    DNSPYTHON_AVAILABLE = True
+except ImportError:
+    DNSPYTHON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class DNSCache:
+    """
+    Resolves each hostname once per TTL window.
+
+    Every probe phase (latency probe, HTTP connection, standalone TLS
+    handshake) asks this cache for the address instead of resolving the name
+    itself. With dnspython installed the record's own TTL is honoured, clamped
+    to [min_ttl, max_ttl]; otherwise ``default_ttl`` is used. Failed lookups
+    are remembered for ``negative_ttl`` seconds.
+    """
+
+    def __init__(self, default_ttl=300, min_ttl=30, max_ttl=3600, negative_ttl=30):
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def _query(self, host):
+        """
+        Resolve a hostname, preferring IPv4
+
+        Returns:
+            tuple: (address, ttl in seconds)
+        """
+        if DNSPYTHON_AVAILABLE:
+            for record_type in ('A', 'AAAA'):
+                try:
+                    answer = dns.resolver.resolve(host, record_type)
+                    return answer[0].to_text(), answer.rrset.ttl
+                except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                    continue
+                except dns.exception.DNSException as e:
+                    logger.debug(f"dnspython lookup for {host} failed, using system resolver: {str(e)}")
+                    break
+
+        infos = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        return infos[0][4][0], self.default_ttl
+
+    def lookup(self, host):
+        """
+        Resolve a hostname through the cache
+
+        Args:
+            host (str): Hostname or IP
+
+        Returns:
+            tuple: (address, resolution time in ms, whether it came from the cache)
+
+        Raises:
+            socket.gaierror: If the name can't be resolved
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None and entry['expires'] > now:
+                self.hits += 1
+                if entry['error'] is not None:
+                    raise socket.gaierror(entry['error'])
+                return entry['address'], 0.0, True
+            self.misses += 1
+
+        start_time = time.perf_counter()
+        try:
+            address, ttl = self._query(host)
+        except (socket.error, UnicodeError) as e:
+            with self._lock:
+                self.failures += 1
+                self._entries[host] = {'address': None, 'error': str(e),
+                                       'expires': time.monotonic() + self.negative_ttl}
+            raise socket.gaierror(str(e))
+        elapsed = round((time.perf_counter() - start_time) * 1000, 2)
+
+        ttl = max(self.min_ttl, min(self.max_ttl, ttl))
+        with self._lock:
+            self._entries[host] = {'address': address, 'error': None,
+                                   'expires': time.monotonic() + ttl}
+
+        return address, elapsed, False
+
+    def resolve(self, host):
+        """
+        Resolve a hostname to an address through the cache
+
+        Raises:
+            socket.gaierror: If the name can't be resolved
+        """
+        return self.lookup(host)[0]
+
+    def clear(self):
+        """Forget all cached addresses"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Return hit/miss counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'failures': self.failures
+            }
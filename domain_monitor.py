@@ -4,36 +4,70 @@ Core monitoring functionality for the Personal Domain Health Monitor
 import time
 import socket
 import ssl
+import random
+import asyncio
+import hashlib
 import logging
+import functools
 import requests
 from datetime import datetime
-import OpenSSL.crypto as crypto
 from urllib.parse import urlparse
-import subprocess
-import platform
+from concurrent.futures import ThreadPoolExecutor
 
 from utils import is_valid_url
+from http_pool import SessionPool
+from latency_probe import LatencyProbe
+from cert_cache import CertificateCache
+from dns_cache import DNSCache
 
 logger = logging.getLogger(__name__)
 
 class DomainMonitor:
     """Handles website monitoring and health checks"""
     
-    def __init__(self, timeout=10, retry_attempts=2, default_headers=None):
+    def __init__(self, timeout=10, retry_attempts=2, default_headers=None,
+                 pool_maxsize=10, idle_timeout=120, ping_method='auto', cert_cache=None,
+                 resolver=None, max_body_bytes=1048576, body_hash='sha256',
+                 retry_backoff=1.0, retry_backoff_max=30.0, retry_jitter=0.5, check_deadline=60):
         self.timeout = timeout
-        self.retry_attempts = retry_attempts
+        self.retry_attempts = max(1, int(retry_attempts))
+        # Retries wait retry_backoff * 2^n seconds (capped, with jitter) and must
+        # start before the check's total deadline
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.retry_jitter = min(max(retry_jitter, 0.0), 1.0)
+        self.check_deadline = check_deadline
         self.default_headers = default_headers or {
             "User-Agent": "Domain-Health-Monitor/1.0"
         }
+        # Bodies are streamed and never buffered past this many bytes
+        self.max_body_bytes = max_body_bytes
+        self.body_hash = body_hash or None
+        # Each hostname is resolved once per TTL and the address shared by every phase
+        self.resolver = resolver or DNSCache()
+        # Keep-alive sessions shared by all checks
+        self.sessions = SessionPool(pool_maxsize=pool_maxsize, idle_timeout=idle_timeout,
+                                    resolver=self.resolver)
+        # ICMP/TCP latency probes run in-process instead of forking ping
+        self.latency_probe = LatencyProbe(timeout=min(self.timeout, 2), method=ping_method,
+                                          resolver=self.resolver)
+        # Certificates are cached so most checks skip the TLS handshake for SSL data
+        self.cert_cache = cert_cache or CertificateCache()
     
-    def check_domain(self, url, check_ssl=True, check_security=True):
+    def check_domain(self, url, check_ssl=True, check_security=True, max_attempts=None):
         """
         Perform a comprehensive health check on a domain
         
+        Failed attempts are retried with exponential backoff until
+        max_attempts is reached or the check deadline would be passed. This
+        blocks the calling thread between attempts; the check pool and the
+        async engine pass max_attempts=1 and schedule retries themselves.
+        
         Args:
             url (str): The URL to check
             check_ssl (bool): Whether to check SSL certificate
             check_security (bool): Whether to perform security checks
+            max_attempts (int, optional): Attempt limit, defaults to retry_attempts
             
         Returns:
             dict: Result of the health check
@@ -44,7 +78,97 @@ class DomainMonitor:
         # Ensure URL has scheme
         if not url.startswith(('http://', 'https://')):
             url = f"https://{url}"
+        
+        max_attempts = min(max_attempts or self.retry_attempts, self.retry_attempts)
+        started_at = time.monotonic()
+        attempts = 0
+        while True:
+            attempts += 1
+            result = self._check_once(url, check_ssl, check_security)
+            delay = self.next_retry_delay(result, attempts, started_at) if attempts < max_attempts else None
+            if delay is None:
+                break
+            time.sleep(delay)
+        
+        self.record_attempts(result, attempts, started_at)
+        return result
+    
+    def is_retryable(self, result):
+        """Check whether a failed attempt is worth retrying"""
+        # Only connection-level failures are retried; an HTTP error status is an answer.
+        # DNS failures are negatively cached, so an immediate retry would learn nothing.
+        return result['status_code'] is None and result['failed_phase'] == 'http'
+    
+    def retry_delay(self, attempt):
+        """
+        Get the backoff before the next attempt
+        
+        Args:
+            attempt (int): Number of attempts made so far (1-based)
             
+        Returns:
+            float: Seconds to wait, with up to retry_jitter of the delay taken off at random
+        """
+        delay = min(self.retry_backoff_max, self.retry_backoff * (2 ** (attempt - 1)))
+        return delay * (1 - self.retry_jitter * random.random())
+    
+    def next_retry_delay(self, result, attempts, started_at):
+        """
+        Decide whether a failed attempt should be retried
+        
+        Args:
+            result (dict): Result of the attempt just made
+            attempts (int): Number of attempts made so far
+            started_at (float): time.monotonic() when the first attempt started
+            
+        Returns:
+            float or None: Seconds to wait before retrying, or None to stop
+        """
+        if attempts >= self.retry_attempts or not self.is_retryable(result):
+            return None
+        
+        delay = self.retry_delay(attempts)
+        if time.monotonic() + delay + self.timeout > started_at + self.check_deadline:
+            # Not enough time left for another attempt to finish
+            result['deadline_exceeded'] = True
+            return None
+        return delay
+    
+    def record_attempts(self, result, attempts, started_at):
+        """
+        Note the retry count and how the final attempt ended on a result
+        
+        Args:
+            result (dict): Result of the final attempt
+            attempts (int): Number of attempts made
+            started_at (float): time.monotonic() when the first attempt started
+        """
+        result['retry_count'] = attempts - 1
+        result['check_duration'] = round((time.monotonic() - started_at) * 1000, 2)
+        if result['is_up']:
+            result['final_attempt_outcome'] = 'up'
+        elif result['status_code'] is not None:
+            result['final_attempt_outcome'] = 'http_error'
+        elif result.get('deadline_exceeded'):
+            result['final_attempt_outcome'] = 'deadline_exceeded'
+        else:
+            result['final_attempt_outcome'] = f"{result['failed_phase'] or 'check'}_failed"
+        
+        if result['status_code'] is None and attempts > 1:
+            logger.warning(f"Failed to connect to {result['url']} after {attempts} attempts: {result['error']}")
+    
+    def _check_once(self, url, check_ssl, check_security):
+        """
+        Run a single check attempt
+        
+        Args:
+            url (str): The URL to check, including its scheme
+            check_ssl (bool): Whether to check SSL certificate
+            check_security (bool): Whether to perform security checks
+            
+        Returns:
+            dict: Result of the attempt
+        """
         result = {
             'url': url,
             'timestamp': datetime.now().isoformat(),
@@ -57,46 +181,107 @@ class DomainMonitor:
             'security_score': None,
             'ping_time': None,
             'redirect_url': None,
-            'content_size': None
+            'content_size': None,
+            'connection_reused': None,
+            'cold_connect_time': None,
+            'warm_request_time': None,
+            'dns_time': None,
+            'dns_cached': None,
+            'content_hash': None,
+            'content_truncated': None,
+            'connect_time': None,
+            'tls_time': None,
+            'ttfb': None,
+            'download_time': None,
+            'failed_phase': None,
+            'retry_count': 0,
+            'final_attempt_outcome': None,
+            'deadline_exceeded': False,
+            'check_duration': None
         }
         
+        # DNS resolution, shared by all of the phases below
+        parsed_url = urlparse(url)
+        try:
+            address, dns_time, result['dns_cached'] = self.resolver.lookup(parsed_url.hostname)
+            # Phases that were skipped (cache hit, reused connection) stay None
+            result['dns_time'] = None if result['dns_cached'] else dns_time
+        except socket.gaierror as e:
+            result['error'] = f"DNS resolution failed: {str(e)}"
+            result['failed_phase'] = 'dns'
+            logger.warning(f"Failed to resolve {parsed_url.hostname}: {str(e)}")
+            return result
+        
         # Ping check
-        result['ping_time'] = self._ping_domain(urlparse(url).netloc)
+        result['ping_time'] = self._ping_domain(
+            address,
+            port=parsed_url.port or (443 if parsed_url.scheme == 'https' else 80)
+        )
         
         # HTTP check
-        for attempt in range(self.retry_attempts):
-            try:
-                start_time = time.time()
-                response = requests.get(
-                    url, 
-                    timeout=self.timeout,
-                    headers=self.default_headers,
-                    allow_redirects=True
-                )
-                end_time = time.time()
-                
-                result['response_time'] = round((end_time - start_time) * 1000, 2)  # in ms
-                result['status_code'] = response.status_code
-                result['is_up'] = 200 <= response.status_code < 400
-                result['content_size'] = len(response.content)
-                
-                # Check if redirected
-                if response.url != url:
-                    result['redirect_url'] = response.url
-                
-                break  # Success, no need to retry
-                
-            except requests.RequestException as e:
-                result['error'] = str(e)
-                # If we've tried all attempts, just continue with other checks
-                if attempt == self.retry_attempts - 1:
-                    logger.warning(f"Failed to connect to {url} after {self.retry_attempts} attempts: {str(e)}")
-                else:
-                    time.sleep(1)  # Wait before retry
+        timing = None
+        ssl_handshake_failed = False
+        try:
+            response, timing = self.sessions.request(
+                'GET',
+                url,
+                timeout=self.timeout,
+                headers=self.default_headers,
+                allow_redirects=True,
+                stream=True
+            )
+            
+            # Stream the body instead of buffering it
+            download_start = time.perf_counter()
+            body = self._read_body(response)
+            download_time = time.perf_counter() - download_start
+            elapsed = timing['elapsed'] + download_time
+            result['content_size'], result['content_hash'], result['content_truncated'] = body
+            
+            result['response_time'] = round(elapsed * 1000, 2)  # in ms
+            # Per-phase breakdown (ms): TCP connect, TLS handshake, time to first byte, body download
+            if timing['new_connections']:
+                result['connect_time'] = round(timing['tcp_time'] * 1000, 2)
+                if parsed_url.scheme == 'https':
+                    result['tls_time'] = round((timing['connect_time'] - timing['tcp_time']) * 1000, 2)
+            result['ttfb'] = round((timing['elapsed'] - timing['connect_time']) * 1000, 2)
+            result['download_time'] = round(download_time * 1000, 2)
+            # Split connection setup from the request itself
+            result['connection_reused'] = timing['new_connections'] == 0
+            if timing['new_connections']:
+                result['cold_connect_time'] = round(timing['connect_time'] * 1000, 2)
+            result['warm_request_time'] = round((elapsed - timing['connect_time']) * 1000, 2)
+            result['status_code'] = response.status_code
+            result['is_up'] = 200 <= response.status_code < 400
+            
+            # Check if redirected
+            if response.url != url:
+                result['redirect_url'] = response.url
+            
+        except requests.RequestException as e:
+            result['error'] = str(e)
+            result['failed_phase'] = 'http'
+            ssl_handshake_failed = isinstance(e, requests.exceptions.SSLError)
         
-        # SSL certificate check
-        if check_ssl and urlparse(url).scheme == 'https':
-            ssl_result = self._check_ssl_certificate(urlparse(url).netloc)
+        # SSL certificate check: prefer the certificate from the HTTP connection,
+        # then the cache, and only then a standalone handshake
+        if check_ssl and parsed_url.scheme == 'https':
+            ssl_host = parsed_url.hostname
+            ssl_port = parsed_url.port or 443
+            peer_certificate = None
+            if timing and result['status_code'] is not None:
+                peer_certificate = timing['certificates'].get((ssl_host, ssl_port))
+
+            if peer_certificate and peer_certificate['cert'] and peer_certificate['der']:
+                entry = self.cert_cache.store(ssl_host, ssl_port, peer_certificate['der'])
+                ssl_result = self._ssl_result_from_entry(entry)
+            else:
+                # A failed TLS handshake must not be masked by a cached certificate
+                entry = None if ssl_handshake_failed else self.cert_cache.get(ssl_host, ssl_port)
+                if entry:
+                    ssl_result = self._ssl_result_from_entry(entry)
+                else:
+                    ssl_result = self._check_ssl_certificate(ssl_host, ssl_port, address=address)
             result.update(ssl_result)
             
         # Security checks
@@ -106,48 +291,140 @@ class DomainMonitor:
             
         return result
     
-    def _ping_domain(self, domain):
+    def _read_body(self, response):
+        """
+        Read a streamed response body in chunks without buffering it
+        
+        Reading stops at max_body_bytes, or once the download has taken longer
+        than the connection timeout, so a huge or endless body can't exhaust
+        memory or stall the cycle.
+        
+        Args:
+            response (requests.Response): Response opened with stream=True
+            
+        Returns:
+            tuple: (bytes read, hex digest or None, whether the body was truncated)
+        """
+        digest = hashlib.new(self.body_hash) if self.body_hash else None
+        size = 0
+        truncated = False
+        deadline = time.monotonic() + self.timeout
+        
+        try:
+            for chunk in response.iter_content(chunk_size=65536):
+                remaining = self.max_body_bytes - size
+                if len(chunk) > remaining:
+                    chunk = chunk[:remaining]
+                    truncated = True
+                size += len(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+                if truncated or time.monotonic() > deadline:
+                    truncated = True
+                    break
+        finally:
+            # Drops the connection if the body wasn't fully read
+            response.close()
+        
+        return size, digest.hexdigest() if digest is not None else None, truncated
+    
+    async def check_many_async(self, websites, concurrency=20, on_result=None, deadline=None):
+        """
+        Check many websites concurrently
+
+        Each site's blocking check runs on a worker thread while the event loop
+        keeps up to ``concurrency`` checks in flight, so a cycle takes roughly as
+        long as its slowest site rather than the sum of all sites. A failed
+        attempt gives up its slot while it waits out the retry backoff. Checks
+        that haven't finished when the deadline passes are abandoned.
+
+        Args:
+            websites (list): Website dicts with 'url' and optional 'check_ssl'/'check_security'
+            concurrency (int): Maximum number of checks in flight at once
+            on_result (callable, optional): Called as on_result(website, result)
+                on the event loop as each check completes
+            deadline (float, optional): Seconds the whole batch may take
+
+        Returns:
+            list: (website, result) tuples in completion order
+        """
+        concurrency = max(1, int(concurrency))
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        completed = []
+
+        async def run_check(website):
+            started_at = time.monotonic()
+            attempts = 0
+            while True:
+                attempts += 1
+                async with semaphore:
+                    try:
+                        result = await loop.run_in_executor(executor, functools.partial(
+                            self.check_domain,
+                            website['url'],
+                            check_ssl=website.get('check_ssl', True),
+                            check_security=website.get('check_security', True),
+                            max_attempts=1
+                        ))
+                    except Exception as e:
+                        logger.error(f"Error checking {website['url']}: {str(e)}")
+                        return
+                delay = self.next_retry_delay(result, attempts, started_at)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+
+            self.record_attempts(result, attempts, started_at)
+            completed.append((website, result))
+            if on_result:
+                try:
+                    on_result(website, result)
+                except Exception as e:
+                    logger.error(f"Error handling result for {website['url']}: {str(e)}")
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='check')
+        tasks = [asyncio.ensure_future(run_check(website)) for website in websites]
+        pending = set()
+        try:
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=deadline or None)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    logger.warning(f"Check batch hit its {deadline}s deadline with {len(pending)} checks unfinished")
+        finally:
+            # Don't wait for abandoned checks still running on worker threads
+            executor.shutdown(wait=not pending)
+
+        return completed
+
+    def _ping_domain(self, domain, port=None):
         """
         Ping a domain and return the response time
         
         Args:
             domain (str): Domain name to ping
+            port (int, optional): Port for the TCP connect fallback
             
         Returns:
             float or None: Ping time in ms, or None if failed
         """
         try:
-            # Different ping command parameters based on OS
-            param = '-n' if platform.system().lower() == 'windows' else '-c'
-            command = ['ping', param, '1', domain]
-            
-            output = subprocess.check_output(command, universal_newlines=True)
-            
-            # Parse the output to get the time
-            if platform.system().lower() == 'windows':
-                try:
-                    # Windows format: "time=<time>ms"
-                    time_str = output.split('time=')[1].split('ms')[0].strip()
-                    return float(time_str)
-                except:
-                    return None
-            else:
-                try:
-                    # Unix format: "time=<time> ms"
-                    time_str = output.split('time=')[1].split(' ms')[0].strip()
-                    return float(time_str)
-                except:
-                    return None
-        except:
+            stats = self.latency_probe.probe(domain, port=port)
+            return stats['avg'] if stats else None
+        except Exception as e:
+            logger.debug(f"Latency probe for {domain} failed: {str(e)}")
             return None
     
-    def _check_ssl_certificate(self, domain, port=443):
+    def _check_ssl_certificate(self, domain, port=443, address=None):
         """
         Check SSL certificate validity and expiration
         
         Args:
             domain (str): Domain name to check
             port (int): Port to connect to
+            address (str, optional): Already-resolved address to connect to
             
         Returns:
             dict: SSL check results
@@ -160,33 +437,26 @@ class DomainMonitor:
         }
         
         try:
+            if address is None:
+                address = self.resolver.resolve(domain)
+            
             # Create SSL context
             context = ssl.create_default_context()
             conn = context.wrap_socket(
-                socket.socket(socket.AF_INET),
+                socket.socket(socket.AF_INET6 if ':' in address else socket.AF_INET),
                 server_hostname=domain
             )
             
             # Connect to the server
             conn.settimeout(self.timeout)
-            conn.connect((domain, port))
+            conn.connect((address, port))
             
             # Get certificate
-            ssl_info = conn.getpeercert()
-            
-            # Extract issuer
-            issuer = dict(x[0] for x in ssl_info['issuer'])
-            result['ssl_issuer'] = issuer.get('organizationName', issuer.get('commonName', 'Unknown'))
-            
-            # Check expiration
-            expires = ssl_info['notAfter']
-            expires_datetime = datetime.strptime(expires, "%b %d %H:%M:%S %Y %Z")
-            days_remaining = (expires_datetime - datetime.now()).days
-            
-            result['ssl_days_remaining'] = days_remaining
-            result['ssl_valid'] = days_remaining > 0
-            
+            cert_bin = conn.getpeercert(binary_form=True)
             conn.close()
+
+            entry = self.cert_cache.store(domain, port, cert_bin)
+            result.update(self._ssl_result_from_entry(entry))
             
         except ssl.SSLError as e:
             result['ssl_error'] = f"SSL Error: {str(e)}"
@@ -197,6 +467,27 @@ class DomainMonitor:
             
         return result
         
+    def _ssl_result_from_entry(self, entry):
+        """
+        Build SSL check results from a certificate cache entry
+        
+        Args:
+            entry (dict): Entry returned by CertificateCache
+            
+        Returns:
+            dict: SSL check results
+        """
+        days_remaining = (entry['not_after'] - datetime.now()).days
+        issuer = entry['issuer']
+        
+        return {
+            'ssl_valid': days_remaining > 0,
+            'ssl_days_remaining': days_remaining,
+            'ssl_issuer': issuer['organization'] or issuer['common_name'] or 'Unknown',
+            'ssl_subject_alt_names': entry['subject_alt_names'],
+            'ssl_error': None
+        }
+        
     def _perform_security_checks(self, url, response=None):
         """
         Perform basic security checks on a website
@@ -288,55 +579,37 @@ class DomainMonitor:
             dict: Detailed SSL certificate information
         """
         try:
-            # Connect to the server and get certificate
-            context = ssl.create_default_context()
-            with socket.create_connection((domain, port)) as sock:
-                with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                    cert_bin = ssock.getpeercert(binary_form=True)
-                    
-            # Parse certificate
-            x509 = crypto.load_certificate(crypto.FILETYPE_ASN1, cert_bin)
-            
-            # Get certificate details
-            issuer = x509.get_issuer()
-            subject = x509.get_subject()
+            entry = self.cert_cache.get(domain, port)
+            if entry is None:
+                # Connect to the server and get certificate
+                context = ssl.create_default_context()
+                address = self.resolver.resolve(domain)
+                with socket.create_connection((address, port), timeout=self.timeout) as sock:
+                    with context.wrap_socket(sock, server_hostname=domain) as ssock:
+                        cert_bin = ssock.getpeercert(binary_form=True)
+                
+                entry = self.cert_cache.store(domain, port, cert_bin)
             
-            # Format expiration time
-            not_after = datetime.strptime(x509.get_notAfter().decode('utf-8'), "%Y%m%d%H%M%SZ")
-            days_remaining = (not_after - datetime.now()).days
+            not_after = entry['not_after']
             
-            cert_info = {
-                'issuer': {
-                    'organization': issuer.O,
-                    'common_name': issuer.CN,
-                    'country': issuer.C
-                },
-                'subject': {
-                    'organization': subject.O,
-                    'common_name': subject.CN,
-                    'country': subject.C
-                },
-                'version': x509.get_version(),
-                'serial_number': x509.get_serial_number(),
-                'not_before': datetime.strptime(x509.get_notBefore().decode('utf-8'), "%Y%m%d%H%M%SZ").isoformat(),
+            return {
+                'issuer': entry['issuer'],
+                'subject': entry['subject'],
+                'version': entry['version'],
+                'serial_number': int(entry['serial_number'], 16),
+                'not_before': entry['not_before'].isoformat(),
                 'not_after': not_after.isoformat(),
-                'days_remaining': days_remaining,
-                'has_expired': x509.has_expired()
+                'days_remaining': (not_after - datetime.now()).days,
+                'has_expired': not_after < datetime.utcnow(),
+                'subject_alt_names': entry['subject_alt_names'],
+                'fetched_at': entry['fetched_at'].isoformat()
             }
-            
-            # Get all SANs (Subject Alternative Names)
-            san_list = []
-            for i in range(x509.get_extension_count()):
-                ext = x509.get_extension(i)
-                if ext.get_short_name() == b'subjectAltName':
-                    san_text = ext.__str__()
-                    # Parse SANs (format: "DNS:example.com, DNS:www.example.com")
-                    for san in san_text.split(', '):
-                        if san.startswith('DNS:'):
-                            san_list.append(san[4:])
-            
-            cert_info['subject_alt_names'] = san_list
-            
-            return cert_info
         except Exception as e:
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+
+
+if __name__ == '__main__':
+    # python -m domain_monitor check --input urls.txt ...
+    import sys
+    from batch_check import main
+    sys.exit(main())
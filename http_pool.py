@@ -0,0 +1,220 @@
+"""
+Pooled keep-alive HTTP sessions for the Personal Domain Health Monitor
+"""
+import time
+import socket
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Timing record for the request running on the current thread
+_probe = threading.local()
+
+
+class _TimedConnectionMixin:
+    """Records how long it takes to open a new connection (TCP dial and TLS handshake)"""
+
+    def _new_conn(self):
+        # Dial the address from the shared resolver cache instead of resolving again
+        record = getattr(_probe, 'record', None)
+        resolver = record.get('resolver') if record is not None else None
+        address = None
+        if resolver is not None:
+            try:
+                address = resolver.resolve(self.host)
+            except socket.gaierror:
+                pass  # Let urllib3 resolve the name and report the failure
+
+        # urllib3 dials _dns_host; swap it only for the dial so TLS still verifies the hostname
+        hostname = self._dns_host
+        if address:
+            self._dns_host = address
+        start_time = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = hostname
+            if record is not None:
+                record['tcp_time'] += time.perf_counter() - start_time
+
+    def connect(self):
+        start_time = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - start_time
+
+        record = getattr(_probe, 'record', None)
+        if record is not None:
+            record['connect_time'] += elapsed
+            record['new_connections'] += 1
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """Keeps the peer certificate so checks can read it without a second handshake"""
+
+    peer_certificate = None
+
+    def connect(self):
+        super().connect()
+        try:
+            self.peer_certificate = {
+                'cert': self.sock.getpeercert(),
+                'der': self.sock.getpeercert(binary_form=True)
+            }
+        except (AttributeError, ValueError, OSError):
+            self.peer_certificate = None
+
+
+class _RecordingPoolMixin:
+    """Notes the certificate of every connection that serves a request"""
+
+    def _make_request(self, conn, *args, **kwargs):
+        response = super()._make_request(conn, *args, **kwargs)
+        # New connections only complete their handshake inside _make_request
+        record = getattr(_probe, 'record', None)
+        peer_certificate = getattr(conn, 'peer_certificate', None)
+        if record is not None and peer_certificate:
+            record['certificates'][(conn.host, conn.port)] = peer_certificate
+        return response
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(_RecordingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report connection setup time"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+
+class SessionPool:
+    """
+    Keeps one keep-alive requests.Session per origin.
+
+    Sessions are reused across checks so repeat checks of a site skip the TCP
+    and TLS handshakes, and sessions idle for longer than ``idle_timeout``
+    seconds are closed to release their sockets.
+    """
+
+    def __init__(self, pool_maxsize=10, idle_timeout=120, resolver=None):
+        self.pool_maxsize = max(1, int(pool_maxsize))
+        self.idle_timeout = idle_timeout
+        self.resolver = resolver
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._last_sweep = time.monotonic()
+        self.evictions = 0
+
+    def _new_session(self):
+        """Create a session with a timed, keep-alive connection pool"""
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _acquire(self, url):
+        """Get the session for a URL's origin and mark it busy"""
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc}"
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = {'session': self._new_session(), 'last_used': now, 'active': 0}
+                self._sessions[key] = entry
+            entry['active'] += 1
+            entry['last_used'] = now
+
+        return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry['active'] -= 1
+            entry['last_used'] = time.monotonic()
+
+    def evict_idle(self):
+        """Close sessions that have not been used for idle_timeout seconds"""
+        now = time.monotonic()
+        idle = []
+
+        with self._lock:
+            self._last_sweep = now
+            for key, entry in list(self._sessions.items()):
+                if entry['active'] == 0 and now - entry['last_used'] > self.idle_timeout:
+                    idle.append(self._sessions.pop(key)['session'])
+
+        for session in idle:
+            session.close()
+        if idle:
+            self.evictions += len(idle)
+            logger.debug(f"Evicted {len(idle)} idle HTTP sessions")
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request on the pooled session for the URL's origin
+
+        Args:
+            method (str): HTTP method
+            url (str): URL to request
+            **kwargs: Passed through to requests.Session.request
+
+        Returns:
+            tuple: (response, timing) where timing holds 'connect_time' (seconds
+                spent opening new connections), 'tcp_time' (the TCP dial part of
+                it), 'new_connections', 'elapsed' (until response headers) and
+                'certificates', the peer certificates keyed by (host, port)
+        """
+        if time.monotonic() - self._last_sweep > self.idle_timeout / 2:
+            self.evict_idle()
+
+        entry = self._acquire(url)
+        record = {'connect_time': 0.0, 'tcp_time': 0.0, 'new_connections': 0, 'elapsed': None,
+                  'certificates': {}, 'resolver': self.resolver}
+        _probe.record = record
+        try:
+            start_time = time.perf_counter()
+            response = entry['session'].request(method, url, **kwargs)
+            record['elapsed'] = time.perf_counter() - start_time
+        finally:
+            _probe.record = None
+            self._release(entry)
+
+        return response, record
+
+    def close(self):
+        """Close all pooled sessions"""
+        with self._lock:
+            sessions = [entry['session'] for entry in self._sessions.values()]
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def get_stats(self):
+        """Return pool statistics"""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'evictions': self.evictions
+            }
@@ -0,0 +1,223 @@
+"""
+In-process ICMP/TCP latency probes for the Personal Domain Health Monitor
+"""
+import os
+import time
+import errno
+import socket
+import struct
+import logging
+import selectors
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+def _checksum(data):
+    """Internet checksum (RFC 1071)"""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _summarize(rtts, sent):
+    """Build the min/avg/max/loss structure returned by utils.ping_host"""
+    if not rtts:
+        return {'min': None, 'avg': None, 'max': None, 'loss': 100 if sent else None}
+
+    return {
+        'min': round(min(rtts), 2),
+        'avg': round(sum(rtts) / len(rtts), 2),
+        'max': round(max(rtts), 2),
+        'loss': round((sent - len(rtts)) / sent * 100, 2)
+    }
+
+
+class LatencyProbe:
+    """
+    Measures round-trip time without spawning a ping process.
+
+    Uses unprivileged ICMP datagram sockets where the OS allows them (Linux
+    with net.ipv4.ping_group_range, macOS) and falls back to timing a TCP
+    connect otherwise. All hosts in a batch are probed at once: ICMP echoes go
+    out from a single socket, and TCP connects are multiplexed with selectors.
+    """
+
+    def __init__(self, timeout=2, method='auto', tcp_port=443, resolver=None):
+        self.timeout = timeout
+        self.method = method
+        self.tcp_port = tcp_port
+        self.resolver = resolver
+        self._icmp_available = None
+        self._ident = os.getpid() & 0xffff
+
+    def icmp_available(self):
+        """Check once whether unprivileged ICMP sockets can be opened"""
+        if self._icmp_available is None:
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+                sock.close()
+                self._icmp_available = True
+            except (OSError, AttributeError):
+                self._icmp_available = False
+                logger.info("ICMP datagram sockets unavailable, using TCP connect latency probes")
+        return self._icmp_available
+
+    def probe(self, host, count=1, port=None):
+        """
+        Probe a single host
+
+        Args:
+            host (str): Hostname or IP
+            count (int): Number of probes
+            port (int, optional): TCP port to use for the connect fallback
+
+        Returns:
+            dict: min/avg/max in ms and loss in percent, or None if the host can't be resolved
+        """
+        return self.probe_many([host], count=count, port=port).get(host)
+
+    def probe_many(self, hosts, count=1, port=None):
+        """
+        Probe many hosts at once
+
+        Args:
+            hosts (iterable): Hostnames or IPs
+            count (int): Number of probes per host
+            port (int, optional): TCP port to use for the connect fallback
+
+        Returns:
+            dict: host -> stats dict (see probe), None for unresolvable hosts
+        """
+        results = {}
+        addresses = {}
+        for host in hosts:
+            try:
+                if self.resolver is not None:
+                    addresses[host] = self.resolver.resolve(host)
+                else:
+                    addresses[host] = socket.gethostbyname(host)
+            except (socket.error, UnicodeError):
+                results[host] = None
+
+        if not addresses:
+            return results
+
+        rtts = {}
+        tcp_addresses = addresses
+        use_icmp = self.method == 'icmp' or (self.method == 'auto' and self.icmp_available())
+        if use_icmp:
+            # ICMP datagram probes are IPv4 only; IPv6 hosts get TCP probes
+            icmp_addresses = {host: address for host, address in addresses.items() if ':' not in address}
+            tcp_addresses = {host: address for host, address in addresses.items() if ':' in address}
+            try:
+                rtts.update(self._icmp_probe(icmp_addresses, count))
+            except OSError as e:
+                logger.warning(f"ICMP probe failed, falling back to TCP: {str(e)}")
+                tcp_addresses = addresses
+        if tcp_addresses:
+            rtts.update(self._tcp_probe(tcp_addresses, count, port))
+
+        for host in addresses:
+            results[host] = _summarize(rtts.get(host, []), count)
+
+        return results
+
+    def _icmp_probe(self, addresses, count):
+        """Send all echo requests from one datagram socket and collect the replies"""
+        rtts = {host: [] for host in addresses}
+        in_flight = {}
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        try:
+            sock.setblocking(False)
+            seq = 0
+            for _ in range(count):
+                for host, address in addresses.items():
+                    seq = (seq + 1) & 0xffff
+                    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, self._ident, seq)
+                    payload = struct.pack('!d', time.perf_counter())
+                    packet = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0,
+                                         _checksum(header + payload), self._ident, seq) + payload
+                    try:
+                        sock.sendto(packet, (address, 0))
+                        in_flight[seq] = (host, address, time.perf_counter())
+                    except OSError as e:
+                        logger.debug(f"ICMP send to {host} failed: {str(e)}")
+
+            with selectors.DefaultSelector() as selector:
+                selector.register(sock, selectors.EVENT_READ)
+                deadline = time.perf_counter() + self.timeout
+                while in_flight:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not selector.select(remaining):
+                        break
+                    while True:
+                        try:
+                            data, (source, _) = sock.recvfrom(1024)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        received_at = time.perf_counter()
+                        # Some platforms (macOS) include the IP header on datagram ICMP sockets
+                        if data and data[0] >> 4 == 4:
+                            data = data[(data[0] & 0x0f) * 4:]
+                        if len(data) < 8:
+                            continue
+                        icmp_type, _, _, _, reply_seq = struct.unpack('!BBHHH', data[:8])
+                        sent = in_flight.get(reply_seq)
+                        if icmp_type != ICMP_ECHO_REPLY or sent is None or sent[1] != source:
+                            continue
+                        del in_flight[reply_seq]
+                        rtts[sent[0]].append((received_at - sent[2]) * 1000)
+        finally:
+            sock.close()
+
+        return rtts
+
+    def _tcp_probe(self, addresses, count, port=None):
+        """Time non-blocking TCP connects to every host, one round per count"""
+        rtts = {host: [] for host in addresses}
+        port = port or self.tcp_port
+
+        for _ in range(count):
+            with selectors.DefaultSelector() as selector:
+                for host, address in addresses.items():
+                    family = socket.AF_INET6 if ':' in address else socket.AF_INET
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    started = time.perf_counter()
+                    code = sock.connect_ex((address, port))
+                    if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                        sock.close()
+                        continue
+                    selector.register(sock, selectors.EVENT_WRITE, (host, started))
+
+                deadline = time.perf_counter() + self.timeout
+                while selector.get_map():
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    events = selector.select(remaining)
+                    if not events:
+                        break
+                    for key, _ in events:
+                        sock = key.fileobj
+                        host, started = key.data
+                        elapsed = (time.perf_counter() - started) * 1000
+                        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                        # A refused connection still proves the host answered
+                        if error in (0, errno.ECONNREFUSED):
+                            rtts[host].append(elapsed)
+                        selector.unregister(sock)
+                        sock.close()
+
+                for key in list(selector.get_map().values()):
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+
+        return rtts
@@ -0,0 +1,130 @@
+"""
+Import-on-first-use helpers and startup import profiling for the Personal Domain Health Monitor
+"""
+import sys
+import time
+import logging
+import builtins
+import threading
+import importlib.util
+from types import ModuleType
+
+logger = logging.getLogger(__name__)
+
+class LazyModule(ModuleType):
+    """
+    Stands in for a module until one of its attributes is used.
+
+    pandas, plotly, matplotlib and twilio take hundreds of milliseconds and
+    tens of megabytes to import, yet only a few dashboard pages and alerts
+    need them; with a lazy module the cost is paid by the first caller
+    instead of by every process at start-up.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            start_time = time.perf_counter()
+            # __import__ (not importlib) so ImportProfiler sees the import too
+            __import__(self.__name__)
+            module = sys.modules[self.__name__]
+            self.__dict__['_module'] = module
+            logger.debug(f"Imported {self.__name__} on first use in "
+                         f"{(time.perf_counter() - start_time) * 1000:.0f}ms")
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """
+    Get a module that is imported the first time it is used
+
+    Args:
+        name (str): Dotted module name, e.g. 'plotly.express'
+
+    Returns:
+        module: The module itself if it is already imported, else a LazyModule.
+            A missing module raises ImportError at first use, not here.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+def module_available(name):
+    """Check whether a top-level module can be imported, without importing it"""
+    return importlib.util.find_spec(name) is not None
+
+def is_loaded(name):
+    """Check whether a module has actually been imported"""
+    return name in sys.modules
+
+
+class ImportProfiler:
+    """
+    Records how long each module import takes from install() on.
+
+    Wraps builtins.__import__, so every import statement that actually loads
+    a module is timed: 'cumulative' includes the modules it imported in
+    turn, 'self' excludes them.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._original_import = None
+        self._local = threading.local()
+
+    def install(self):
+        """Start timing imports"""
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def uninstall(self):
+        """Stop timing imports"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Already-loaded modules and relative imports (counted in their package) pass straight through
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start_time = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            entry = self.timings.setdefault(name, {'cumulative': 0.0, 'self': 0.0})
+            entry['cumulative'] += elapsed
+            entry['self'] += elapsed - children
+
+    def report(self, limit=25):
+        """
+        Format the slowest imports as a table
+
+        Args:
+            limit (int): Number of modules to list
+
+        Returns:
+            str: Report text, slowest cumulative time first
+        """
+        rows = sorted(self.timings.items(), key=lambda item: item[1]['cumulative'], reverse=True)
+        total = sum(entry['self'] for entry in self.timings.values())
+        lines = [f"{'cumulative ms':>14} {'self ms':>9}  module"]
+        for name, entry in rows[:limit]:
+            lines.append(f"{entry['cumulative'] * 1000:>14.1f} {entry['self'] * 1000:>9.1f}  {name}")
+        lines.append(f"{len(self.timings)} modules imported in {total * 1000:.1f}ms")
+        return '\n'.join(lines)
@@ -6,19 +6,43 @@ Desktop application entry point
 import os
 import sys
 import time
+
+# Reference point for the startup timings
+PROCESS_START = time.monotonic()
+
+# --profile-startup times every import from here on
+if '--profile-startup' in sys.argv:
+    from lazy_imports import ImportProfiler
+    import_profiler = ImportProfiler().install()
+else:
+    import_profiler = None
+
+import argparse
 import logging
+import asyncio
 import threading
-import webview
+import multiprocessing
+import concurrent.futures
 import socket
-from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from config import Config
 from domain_monitor import DomainMonitor
+from check_pool import CheckPool
+from check_scheduler import CheckScheduler, AdaptiveIntervalPolicy
+from check_shards import ShardedChecker
+from cert_cache import CertificateCache
+from dns_cache import DNSCache
 from data_manager import DataManager
 from notification_manager import NotificationManager
-from dashboard import create_app
 from website_manager import WebsiteManager
+from status_channel import StatusPublisher, StatusListener
+from work_leases import WorkLeases
+from result_buffer import ResultBuffer
+from lazy_imports import is_loaded
+
+# Modules a headless checker should never need
+HEAVY_MODULES = ['flask', 'pandas', 'plotly', 'matplotlib', 'twilio', 'webview']
 
 # Set up logging
 logging.basicConfig(
@@ -36,14 +60,144 @@ config = None
 data_manager = None
 notification_manager = None
 domain_monitor = None
+check_pool = None
 website_manager = None
 scheduler = None
 flask_app = None
+# Set in --checker mode to send live status to a --dashboard process
+status_publisher = None
+# Set when instance_id is configured, to share the sites with other checker instances
+work_leases = None
+# Stores the per-site scheduler's results in bulk
+scheduler_results = None
+# Sends incident alerts one at a time, off the database writer thread; None
+# in a --dashboard process, which leaves alerting to the checker
+alert_executor = None
+
+# Full checks start the most important sites first, so a deadline cuts the least important
+PRIORITY_ORDER = {'high': 0, 'normal': 1, 'low': 2}
+
+# Progress of the current full check, shown by the dashboard as results land
+check_progress_lock = threading.Lock()
+check_progress = {'running': False, 'total': 0, 'checked': 0, 'up': 0, 'down': 0,
+                  'started_at': None, 'finished_at': None}
+first_paint_logged = threading.Event()
+
+def process_result(website, result, results_buffer=None):
+    """
+    Store a check result
+
+    Alerts are sent when the result opens or resolves an incident (see
+    handle_incident_event), so the quick rechecks of a failing site don't
+    alert again.
+
+    Args:
+        website (dict): Website checked
+        result (dict): Check result
+        results_buffer (ResultBuffer, optional): Store through this buffer in
+            bulk instead of one result at a time
+    """
+    if results_buffer:
+        results_buffer.add(website['id'], result)
+    else:
+        data_manager.store_check_result(website['id'], result)
+    if status_publisher:
+        status_publisher.publish_result(website, result)
+
+    logger.info(f"Checked {website['url']} - Status: {'Up' if result['is_up'] else 'Down'}")
+
+def handle_incident_event(event):
+    """Log an incident opening or resolving, alert on it and pass it on to a --dashboard process"""
+    if event['event'] == 'opened':
+        logger.warning(f"Incident {event['incident_id']} opened for website {event['website_id']}")
+    else:
+        logger.info(f"Incident {event['incident_id']} for website {event['website_id']} "
+                    f"resolved after {event['duration']}s")
+
+    if alert_executor:
+        alert_executor.submit(send_incident_alert, event)
+    if status_publisher:
+        status_publisher.publish('incident', event)
+
+def send_incident_alert(event):
+    """Tell a site's alert contacts that it went down or recovered"""
+    try:
+        website = website_manager.get_website(event['website_id'])
+        if not website or not website.get('alerts_enabled', True):
+            return
+
+        if event['event'] == 'opened':
+            notification_manager.send_alert(
+                website['name'],
+                website['url'],
+                event['status_code'],
+                event['response_time'],
+                website.get('alert_emails') or [],
+                website.get('alert_phone')
+            )
+        else:
+            notification_manager.send_recovery_notification(
+                website['name'],
+                website['url'],
+                event['duration'],
+                website.get('alert_emails') or [],
+                website.get('alert_phone')
+            )
+    except Exception as e:
+        logger.error(f"Error sending alert for website {event['website_id']}: {str(e)}")
+
+def save_check_summary(check_results):
+    """Save a check summary to the file the UI polls"""
+    # Resolver cache counters for the summary
+    check_results['dns_cache'] = domain_monitor.resolver.get_stats()
+    if work_leases:
+        check_results['leases'] = work_leases.get_stats()
+
+    try:
+        with open('last_check.json', 'w') as f:
+            json.dump(check_results, f)
+    except Exception as e:
+        logger.error(f"Error saving check results: {str(e)}")
+
+    if status_publisher:
+        status_publisher.publish('summary', check_results)
+
+def update_check_progress(**changes):
+    """Update the full check's progress and pass it on to a --dashboard process"""
+    with check_progress_lock:
+        check_progress.update(changes)
+        progress = dict(check_progress)
+
+    if status_publisher:
+        status_publisher.publish('progress', progress)
+
+def get_check_progress():
+    """Get a snapshot of the full check's progress"""
+    with check_progress_lock:
+        return dict(check_progress)
+
+def log_first_paint(source):
+    """Log the time from process start until the dashboard is first shown"""
+    if first_paint_logged.is_set():
+        return
+    first_paint_logged.set()
+    logger.info(f"Time to first paint ({source}): {time.monotonic() - PROCESS_START:.2f}s")
 
 def monitor_task():
-    """Scheduled task to monitor all domains"""
-    logger.info("Running scheduled domain health check")
+    """
+    Check every website once, highest priority first, within the cycle deadline
+
+    Returns:
+        dict: website_id -> is_up for the sites checked
+    """
+    logger.info("Running full domain health check")
     websites = website_manager.get_all_websites()
+    # Pick up incidents another process opened or resolved since the last cycle
+    data_manager.refresh_open_incidents()
+    if work_leases:
+        websites = work_leases.claim(websites)
+    websites.sort(key=lambda website: PRIORITY_ORDER.get(website.get('priority'), 1))
+    deadline = config.CYCLE_DEADLINE_SECONDS or config.CHECK_INTERVAL_MINUTES * 60
 
     # Track completion time for UI updates
     check_results = {
@@ -52,70 +206,155 @@ def monitor_task():
         'websites_up': 0,
         'websites_down': 0
     }
+    statuses = {}
+    stats_lock = threading.Lock()
+    # The cycle's results are stored in chunks, one transaction each
+    results_buffer = ResultBuffer(data_manager, max_rows=config.WRITE_BATCH_ROWS,
+                                  max_age_ms=config.WRITE_BATCH_MS)
+    update_check_progress(running=True, total=len(websites), checked=0, up=0, down=0,
+                          started_at=check_results['timestamp'], finished_at=None)
 
-    for website in websites:
-        try:
-            result = domain_monitor.check_domain(
-                website['url'],
-                check_ssl=website.get('check_ssl', True),
-                check_security=website.get('check_security', True)
-            )
-
-            # Store results
-            data_manager.store_check_result(website['id'], result)
+    def handle_result(website, result):
+        # Store results as each check lands
+        process_result(website, result, results_buffer)
 
-            # Update stats
+        # Update stats
+        with stats_lock:
+            statuses[website['id']] = result['is_up']
             check_results['websites_checked'] += 1
             if result['is_up']:
                 check_results['websites_up'] += 1
             else:
                 check_results['websites_down'] += 1
+            update_check_progress(checked=check_results['websites_checked'],
+                                  up=check_results['websites_up'],
+                                  down=check_results['websites_down'])
 
-            # Check for alerts
-            if not result['is_up'] and website.get('alerts_enabled', True):
-                notification_manager.send_alert(
-                    website['name'],
-                    website['url'],
-                    result['status_code'],
-                    result['response_time'],
-                    website.get('alert_emails', []),
-                    website.get('alert_phone', None)
-                )
-
-            logger.info(f"Checked {website['url']} - Status: {'Up' if result['is_up'] else 'Down'}")
-        except Exception as e:
-            logger.error(f"Error checking {website['url']}: {str(e)}")
+    if config.CHECK_ENGINE == 'async' and not isinstance(check_pool, ShardedChecker):
+        start_time = time.monotonic()
+        asyncio.run(domain_monitor.check_many_async(
+            websites,
+            concurrency=config.CHECK_CONCURRENCY,
+            on_result=handle_result,
+            deadline=deadline
+        ))
+        check_results['wall_time_seconds'] = round(time.monotonic() - start_time, 3)
+        check_results['deadline_exceeded'] = check_results['wall_time_seconds'] >= deadline
+    else:
+        # Wall time, peak in-flight checks, queue wait and deadline misses for the cycle summary
+        check_results.update(check_pool.run_cycle(websites, on_result=handle_result, deadline=deadline))
+
+    # The dashboard reloads when the check finishes, so its results must be committed by
+    # then; checks that outlived the deadline report later and are stored one by one
+    # (the buffer logs any batch that fails)
+    _, not_done = concurrent.futures.wait(results_buffer.close(), timeout=30)
+    if not_done:
+        logger.warning(f"{len(not_done)} result batches were not committed within 30s")
+    update_check_progress(running=False, finished_at=datetime.now().isoformat())
 
     # Save the last check results to a file that the UI can access
-    try:
-        with open('last_check.json', 'w') as f:
-            json.dump(check_results, f)
-    except Exception as e:
-        logger.error(f"Error saving check results: {str(e)}")
+    save_check_summary(check_results)
+
+    logger.info(f"Completed domain health check: {check_results['websites_up']} up, {check_results['websites_down']} down "
+                f"in {check_results['wall_time_seconds']}s")
 
-    logger.info(f"Completed domain health check: {check_results['websites_up']} up, {check_results['websites_down']} down")
+    return statuses
 
 
-def start_scheduler(interval_minutes=5):
-    """Start the background scheduler for regular checks"""
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(monitor_task, 'interval', minutes=interval_minutes)
-    scheduler.start()
-    logger.info(f"Scheduler started with {interval_minutes} minute interval")
+def start_scheduler(initial_status=None):
+    """Start the scheduler that checks each website on its own interval"""
+    global scheduler_results
+    # The scheduler's results are stored in chunks, one transaction each
+    scheduler_results = ResultBuffer(data_manager, max_rows=config.WRITE_BATCH_ROWS,
+                                     max_age_ms=config.WRITE_BATCH_MS)
+
+    policy = None
+    if config.ADAPTIVE_SCHEDULING:
+        policy = AdaptiveIntervalPolicy(
+            confirmation_interval=config.CONFIRMATION_INTERVAL_SECONDS,
+            stable_after=config.STABLE_AFTER_CHECKS,
+            backoff_factor=config.INTERVAL_BACKOFF_FACTOR,
+            min_interval=config.MIN_CHECK_INTERVAL_SECONDS,
+            max_interval=config.MAX_CHECK_INTERVAL_SECONDS
+        )
+
+    scheduler = CheckScheduler(
+        check_pool,
+        website_manager.get_all_websites,
+        default_interval=config.CHECK_INTERVAL_MINUTES * 60,
+        on_result=lambda website, result: process_result(website, result, scheduler_results),
+        on_summary=save_check_summary,
+        jitter=config.DISPATCH_JITTER_SECONDS,
+        policy=policy,
+        load_open_incidents=data_manager.refresh_open_incidents,
+        overrun_mode=config.OVERRUN_MODE,
+        max_lag=config.MAX_SCHEDULER_LAG_SECONDS,
+        leases=work_leases
+    )
+    scheduler.start(initial_status=initial_status)
     return scheduler
 
 def run_flask_app():
     """Run the Flask dashboard app"""
     global flask_app
     try:
-        flask_app = create_app(data_manager, website_manager, domain_monitor)
+        from dashboard import create_app
+
+        flask_app = create_app(data_manager, website_manager, domain_monitor,
+                               check_progress=get_check_progress)
         flask_app.run(host='127.0.0.1', port=5000, debug=False, use_reloader=False, threaded=True)
     except Exception as e:
         logger.error(f"Error starting Flask app: {e}")
 
-def initialize_components():
-    """Initialize all components"""
-    global config, data_manager, notification_manager, domain_monitor, website_manager
+def create_domain_monitor(config, data_manager=None):
+    """
+    Build the check engine from the configuration
+
+    Also called in each check shard's process, which opens its own
+    DataManager to read the certificate cache; the shard sends the
+    certificates it sees back to this process to store.
+
+    Args:
+        config (Config): Application configuration
+        data_manager (DataManager, optional): Database access for the certificate cache
+
+    Returns:
+        DomainMonitor: The configured monitor
+    """
+    if data_manager is None:
+        data_manager = DataManager(config.DATABASE_PATH)
+
+    return DomainMonitor(
+        timeout=config.CONNECTION_TIMEOUT,
+        retry_attempts=config.RETRY_ATTEMPTS,
+        default_headers=config.DEFAULT_HTTP_HEADERS,
+        pool_maxsize=config.HTTP_POOL_MAXSIZE,
+        idle_timeout=config.HTTP_IDLE_TIMEOUT,
+        ping_method=config.PING_METHOD,
+        cert_cache=CertificateCache(
+            data_manager,
+            ttl=timedelta(hours=config.SSL_CACHE_TTL_HOURS),
+            refresh_days=config.SSL_REFRESH_DAYS
+        ),
+        resolver=DNSCache(default_ttl=config.DNS_CACHE_TTL_SECONDS),
+        max_body_bytes=config.HTTP_MAX_BODY_BYTES,
+        body_hash=config.HTTP_BODY_HASH,
+        retry_backoff=config.RETRY_BACKOFF_SECONDS,
+        retry_backoff_max=config.RETRY_BACKOFF_MAX_SECONDS,
+        retry_jitter=config.RETRY_JITTER,
+        check_deadline=config.CHECK_DEADLINE_SECONDS
+    )
+
+def initialize_components(start_checks=True):
+    """
+    Initialize all components
+
+    Args:
+        start_checks (bool): Create the check pool (or start the check shards);
+            False for a dashboard-only process
+    """
+    global config, data_manager, notification_manager, domain_monitor, check_pool, website_manager, work_leases
+    global alert_executor
 
     # Initialize components
     config = Config()
@@ -130,39 +369,128 @@ def initialize_components():
         config.TWILIO_AUTH_TOKEN,
         config.TWILIO_PHONE_NUMBER
     )
-    domain_monitor = DomainMonitor()
+    domain_monitor = create_domain_monitor(config, data_manager)
+    if not start_checks:
+        check_pool = None
+    elif config.SHARD_COUNT > 1:
+        # Checks run in worker processes; this process stays the only result writer
+        check_pool = ShardedChecker(
+            create_domain_monitor,
+            (config,),
+            shard_count=config.SHARD_COUNT,
+            max_workers=config.CHECK_CONCURRENCY,
+            per_host_limit=config.PER_HOST_CONCURRENCY,
+            on_certificate=domain_monitor.cert_cache.store
+        )
+        check_pool.start()
+    else:
+        check_pool = CheckPool(
+            domain_monitor,
+            max_workers=config.CHECK_CONCURRENCY,
+            per_host_limit=config.PER_HOST_CONCURRENCY
+        )
     website_manager = WebsiteManager(data_manager)
 
     # Ensure database and tables exist
     data_manager.initialize_database()
+    # Check results are committed in batches on one writer thread
+    data_manager.start_writer(batch_ms=config.WRITE_BATCH_MS, batch_rows=config.WRITE_BATCH_ROWS)
+    if start_checks:
+        alert_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='alerts')
+    data_manager.subscribe_incidents(handle_incident_event)
+
+    if start_checks and config.INSTANCE_ID:
+        work_leases = WorkLeases(data_manager, config.INSTANCE_ID, lease_seconds=config.LEASE_SECONDS)
+        work_leases.start()
 
 def is_port_in_use(port):
     """Check if a port is in use"""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(('127.0.0.1', port)) == 0
 
+def run_checker():
+    """Run the checks headless, publishing live status for a --dashboard process"""
+    global scheduler, status_publisher
+
+    initialize_components()
+    status_publisher = StatusPublisher(port=config.STATUS_CHANNEL_PORT)
+
+    try:
+        # Run initial check, then check each site when its interval comes due
+        scheduler = start_scheduler(initial_status=monitor_task())
+        logger.info(f"Checker running, publishing status to port {config.STATUS_CHANNEL_PORT}")
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Checker shutting down")
+    finally:
+        stop_checks()
+        status_publisher.close()
+
+def stop_checks():
+    """Stop the checks and commit every result they produced"""
+    if scheduler:
+        scheduler.shutdown()
+    if work_leases:
+        work_leases.stop()
+    check_pool.shutdown()
+    if scheduler_results:
+        scheduler_results.close()
+    data_manager.stop_writer()
+    # Send the alerts for the last results committed
+    alert_executor.shutdown(wait=True)
+
+def run_dashboard():
+    """Serve the dashboard only; checks run in a separate --checker process"""
+    global flask_app
+    # Imported per mode so --checker never loads Flask
+    from dashboard import create_app
+
+    initialize_components(start_checks=False)
+
+    status_listener = StatusListener(port=config.STATUS_CHANNEL_PORT)
+    try:
+        status_listener.start()
+    except OSError as e:
+        logger.warning(f"Live status unavailable, serving status from the database: {str(e)}")
+        status_listener = None
+
+    flask_app = create_app(data_manager, website_manager, domain_monitor, status_listener=status_listener,
+                           check_progress=status_listener.get_progress if status_listener else None)
+
+    # Without a window to report its first paint, time the first dashboard page served
+    @flask_app.after_request
+    def time_first_page(response):
+        if response.mimetype == 'text/html':
+            log_first_paint('first page served')
+        return response
+
+    logger.info("Dashboard running at http://127.0.0.1:5000")
+    try:
+        flask_app.run(host='127.0.0.1', port=5000, debug=False, use_reloader=False, threaded=True)
+    finally:
+        data_manager.stop_writer()
+
+def run_initial_check():
+    """Check every site once, then hand over to the per-site scheduler"""
+    global scheduler
+    try:
+        scheduler = start_scheduler(initial_status=monitor_task())
+    except Exception as e:
+        logger.error(f"Error running initial check: {str(e)}")
+
 def start_app():
     """Start the desktop application"""
-    # Set the working directory to the script location
-    if getattr(sys, 'frozen', False):
-        # Running as compiled exe
-        os.chdir(os.path.dirname(sys.executable))
-    else:
-        # Running as script
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    # Only the desktop window needs pywebview, so --checker runs on headless machines
+    import webview
 
     # Initialize all components
     initialize_components()
 
-    # Start the monitoring scheduler in the background
     global scheduler
-    scheduler = start_scheduler(config.CHECK_INTERVAL_MINUTES)
-
     try:
-        # Run initial check
-        monitor_task()
-
-        # Start the Flask app in a separate thread
+        # Start the Flask app in a separate thread; it shows the last stored
+        # results until the initial check below catches up
         logger.info("Starting web dashboard")
         flask_thread = threading.Thread(target=run_flask_app)
         flask_thread.daemon = True
@@ -170,19 +498,20 @@ def start_app():
 
         # Wait for Flask to start by checking if the port is in use
         logger.info("Waiting for Flask server to start...")
-        wait_time = 0
-        while not is_port_in_use(5000) and wait_time < 20:
-            time.sleep(1)
-            wait_time += 1
-            logger.info(f"Waiting for Flask... ({wait_time}s)")
+        give_up_at = time.monotonic() + 20
+        while not is_port_in_use(5000) and time.monotonic() < give_up_at:
+            time.sleep(0.05)
 
         if not is_port_in_use(5000):
             logger.error("Flask server failed to start within timeout")
-            if scheduler:
-                scheduler.shutdown()
             sys.exit(1)
 
-        logger.info("Flask server started successfully!")
+        logger.info(f"Flask server started successfully after {time.monotonic() - PROCESS_START:.2f}s")
+
+        # Run the initial check in the background (the dashboard shows its
+        # progress), then check each site when its interval comes due
+        initial_check = threading.Thread(target=run_initial_check, name='initial-check', daemon=True)
+        initial_check.start()
 
         # Create the window
         window = webview.create_window(
@@ -196,6 +525,7 @@ def start_app():
             confirm_close=True,
             background_color='#FFFFFF'
         )
+        window.events.loaded += lambda: log_first_paint('window loaded')
 
         # Start the webview
         logger.info("Starting web view...")
@@ -203,13 +533,79 @@ def start_app():
 
     except KeyboardInterrupt:
         logger.info("Application shutting down")
-        if scheduler:
-            scheduler.shutdown()
     except Exception as e:
         logger.error(f"Error starting application: {str(e)}")
-        if scheduler:
-            scheduler.shutdown()
         raise
+    finally:
+        # Commit the results still queued when the window closes
+        stop_checks()
+
+def profile_startup(args):
+    """
+    Print how long start-up spends importing each module
+
+    Loads what the selected mode loads before it starts checking or serving,
+    then reports the slowest imports, the total start-up time, peak memory
+    and which heavy modules ended up imported.
+    """
+    initialize_components(start_checks=False)
+    if not args.checker:
+        import dashboard  # noqa: F401
+    if not args.checker and not args.dashboard:
+        try:
+            import webview  # noqa: F401
+        except ImportError:
+            print("pywebview is not installed; the desktop window would fail to start")
+
+    import_profiler.uninstall()
+    mode = 'checker' if args.checker else 'dashboard' if args.dashboard else 'desktop'
+    print(f"Start-up imports ({mode} mode):")
+    print(import_profiler.report(limit=args.profile_limit))
+    print(f"Start-up time: {(time.monotonic() - PROCESS_START) * 1000:.0f}ms")
+
+    try:
+        import resource
+        # Kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"Peak memory: {peak / 1024 / (1024 if sys.platform == 'darwin' else 1):.1f}MB")
+    except ImportError:
+        pass  # Not available on Windows
+
+    loaded = [name for name in HEAVY_MODULES if is_loaded(name)]
+    print(f"Heavy modules loaded: {', '.join(loaded) if loaded else 'none'}")
+
+def main():
+    """Parse the command line and start the requested mode"""
+    parser = argparse.ArgumentParser(description='Personal Domain Health Monitor')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--checker', action='store_true',
+                      help='run the checks only, without the dashboard or desktop window')
+    mode.add_argument('--dashboard', action='store_true',
+                      help='serve the dashboard only, showing status from a separate --checker process')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='report import time per module for the selected mode and exit')
+    parser.add_argument('--profile-limit', type=int, default=25,
+                        help='number of modules listed by --profile-startup (default 25)')
+    args = parser.parse_args()
+
+    # Set the working directory to the script location
+    if getattr(sys, 'frozen', False):
+        # Running as compiled exe
+        os.chdir(os.path.dirname(sys.executable))
+    else:
+        # Running as script
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if args.profile_startup:
+        profile_startup(args)
+    elif args.checker:
+        run_checker()
+    elif args.dashboard:
+        run_dashboard()
+    else:
+        start_app()
 
 if __name__ == "__main__":
-    start_app()
+    # Needed for check shards in frozen Windows builds
+    multiprocessing.freeze_support()
+    main()
@@ -7,12 +7,11 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 
-# Import Twilio client for SMS alerts
-try:
-    from twilio.rest import Client
-    TWILIO_AVAILABLE = True
-except ImportError:
-    TWILIO_AVAILABLE = False
+from lazy_imports import lazy_import, module_available
+
+# Twilio client for SMS alerts, imported when the first SMS is sent
+TWILIO_AVAILABLE = module_available('twilio')
+twilio_rest = lazy_import('twilio.rest')
 
 logger = logging.getLogger(__name__)
 
@@ -32,15 +31,23 @@ class NotificationManager:
         self.twilio_account_sid = twilio_account_sid
         self.twilio_auth_token = twilio_auth_token
         self.twilio_phone_number = twilio_phone_number
+        # Created on the first SMS alert (see _get_twilio_client)
         self.twilio_client = None
-        
-        # Initialize Twilio client if credentials provided
-        if TWILIO_AVAILABLE and twilio_account_sid and twilio_auth_token:
+    
+    def _get_twilio_client(self):
+        """
+        Get the Twilio client, creating it on first use
+
+        Returns:
+            Client: Twilio client, or None if Twilio isn't configured
+        """
+        if self.twilio_client is None and self.twilio_account_sid and self.twilio_auth_token:
             try:
-                self.twilio_client = Client(twilio_account_sid, twilio_auth_token)
+                self.twilio_client = twilio_rest.Client(self.twilio_account_sid, self.twilio_auth_token)
                 logger.info("Twilio client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Twilio client: {str(e)}")
+        return self.twilio_client
     
     def send_alert(self, website_name, website_url, status_code, response_time, 
                   email_recipients=None, phone_number=None):
@@ -226,16 +233,17 @@ class NotificationManager:
             logger.warning("Twilio package not installed, skipping SMS alert")
             return
             
-        if not self.twilio_client or not self.twilio_phone_number:
-            logger.warning("Twilio not configured, skipping SMS alert")
+        if not phone_number:
             return
             
-        if not phone_number:
+        twilio_client = self._get_twilio_client()
+        if not twilio_client or not self.twilio_phone_number:
+            logger.warning("Twilio not configured, skipping SMS alert")
             return
             
         try:
             # Send SMS via Twilio
-            sms = self.twilio_client.messages.create(
+            sms = twilio_client.messages.create(
                 body=message,
                 from_=self.twilio_phone_number,
                 to=phone_number
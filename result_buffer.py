@@ -0,0 +1,129 @@
+"""
+Chunked check result storage for the Personal Domain Health Monitor
+"""
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ResultBuffer:
+    """
+    Collects the results of a check run and stores them in chunks.
+
+    Each chunk goes to DataManager.store_check_results_bulk as one
+    executemany and one commit. A chunk is sent once ``max_rows`` results are
+    waiting, or by the buffer's flusher thread ``max_age_ms`` after its first
+    result arrived, so the dashboard stays close to live during a long run;
+    flush() sends whatever is left at the end.
+
+    After close(), results that still come in (e.g. checks that outlived a
+    cycle deadline) are stored one at a time instead of being buffered.
+
+    Futures are only kept until their chunk is committed; a chunk that fails
+    is logged and then dropped, so a buffer can stay open for the life of the
+    process.
+
+    add() may be called from several check threads at once.
+    """
+
+    def __init__(self, data_manager, max_rows=500, max_age_ms=50):
+        self.data_manager = data_manager
+        self.max_rows = max(1, int(max_rows))
+        self.max_age = max(0, max_age_ms) / 1000
+
+        self._cond = threading.Condition()
+        self._pending = []
+        # time.monotonic() when the pending chunk's first result arrived
+        self._first_at = None
+        self._closed = False
+        self._futures = set()
+        self._flusher = None
+
+    def add(self, website_id, result):
+        """Queue a result, storing the chunk if it is full"""
+        chunk = None
+        with self._cond:
+            closed = self._closed
+            if not closed:
+                self._pending.append((website_id, result))
+                if len(self._pending) >= self.max_rows:
+                    chunk = self._take()
+                elif len(self._pending) == 1:
+                    # The flusher stores the chunk when this result has waited long enough
+                    self._first_at = time.monotonic()
+                    if self._flusher is None:
+                        self._flusher = threading.Thread(target=self._run, name='result-buffer', daemon=True)
+                        self._flusher.start()
+                    self._cond.notify()
+
+        if closed:
+            self._track(self.data_manager.store_check_result(website_id, result), 1)
+        elif chunk:
+            self._store(chunk)
+
+    def flush(self):
+        """
+        Store the results still waiting
+
+        Returns:
+            list: Futures of the chunks stored by this buffer that are not committed yet
+        """
+        with self._cond:
+            chunk = self._take()
+        if chunk:
+            self._store(chunk)
+        with self._cond:
+            return list(self._futures)
+
+    def close(self):
+        """
+        Flush, stop the flusher thread, and store any later results directly
+
+        Returns:
+            list: Futures of the chunks not committed yet, as for flush()
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        return self.flush()
+
+    def _take(self):
+        """Take the pending chunk; must hold the lock"""
+        chunk, self._pending = self._pending, []
+        self._first_at = None
+        return chunk
+
+    def _run(self):
+        """Flusher thread: store each chunk once its first result is max_age old"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    # close() flushes whatever is left
+                    self._flusher = None
+                    return
+                delay = self._first_at + self.max_age - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                chunk = self._take()
+
+            self._store(chunk)
+
+    def _store(self, chunk):
+        self._track(self.data_manager.store_check_results_bulk(chunk), len(chunk))
+
+    def _track(self, future, count):
+        """Keep a store's future until it completes, logging it if it failed"""
+        with self._cond:
+            self._futures.add(future)
+
+        def on_done(future):
+            with self._cond:
+                self._futures.discard(future)
+            if future.exception() is not None:
+                logger.error(f"{count} check results could not be stored: {str(future.exception())}")
+
+        future.add_done_callback(on_done)
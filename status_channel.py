@@ -0,0 +1,148 @@
+"""
+Local live-status channel between the checker and dashboard processes
+"""
+import json
+import socket
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Largest datagram the listener will read; summaries and results are far smaller
+MAX_MESSAGE_BYTES = 65507
+# Incident transitions the listener remembers
+MAX_INCIDENT_EVENTS = 100
+
+
+class StatusPublisher:
+    """
+    Sends check results and summaries as JSON datagrams to a local port.
+
+    Publishing is fire-and-forget: nothing blocks or fails when no dashboard
+    is listening, so the checker never waits on the UI.
+    """
+
+    def __init__(self, host='127.0.0.1', port=5055):
+        self.address = (host, port)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.errors = 0
+
+    def publish(self, kind, payload):
+        """
+        Send a message
+
+        Args:
+            kind (str): 'result', 'summary', 'progress' or 'incident'
+            payload (dict): JSON-serializable message body
+        """
+        try:
+            data = json.dumps({'type': kind, 'data': payload}, default=str).encode('utf-8')
+            with self._lock:
+                self._sock.sendto(data, self.address)
+                self.sent += 1
+        except (OSError, TypeError, ValueError) as e:
+            # Nobody listening (ECONNREFUSED) or an oversized message; the database still has it
+            with self._lock:
+                self.errors += 1
+            logger.debug(f"Could not publish {kind} status: {str(e)}")
+
+    def publish_result(self, website, result):
+        """Send the fields of a check result the dashboard shows live"""
+        self.publish('result', {
+            'website_id': website['id'],
+            'is_up': result['is_up'],
+            'status_code': result.get('status_code'),
+            'response_time': result.get('response_time'),
+            'ssl_valid': result.get('ssl_valid'),
+            'security_score': result.get('security_score'),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def close(self):
+        self._sock.close()
+
+
+class StatusListener:
+    """
+    Receives the checker's datagrams and keeps the latest state in memory.
+
+    The dashboard serves live status from here and falls back to the
+    database for sites it hasn't heard about (e.g. right after it starts).
+    """
+
+    def __init__(self, host='127.0.0.1', port=5055):
+        self.address = (host, port)
+        self._lock = threading.Lock()
+        self._statuses = {}
+        self._summary = None
+        self._progress = None
+        self._incident_events = deque(maxlen=MAX_INCIDENT_EVENTS)
+        self._sock = None
+        self._thread = None
+        self.received = 0
+
+    def start(self):
+        """Bind the port and start receiving in a background thread"""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(self.address)
+        self._thread = threading.Thread(target=self._receive, name='status-listener', daemon=True)
+        self._thread.start()
+        logger.info(f"Listening for checker status on {self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+
+    def _receive(self):
+        while True:
+            try:
+                data = self._sock.recv(MAX_MESSAGE_BYTES)
+            except OSError:
+                return  # Socket closed
+
+            try:
+                message = json.loads(data.decode('utf-8'))
+                kind, payload = message['type'], message['data']
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring malformed status message: {str(e)}")
+                continue
+
+            with self._lock:
+                self.received += 1
+                if kind == 'result':
+                    self._statuses[payload['website_id']] = payload
+                elif kind == 'summary':
+                    self._summary = payload
+                elif kind == 'progress':
+                    self._progress = payload
+                elif kind == 'incident':
+                    self._incident_events.append(payload)
+
+    def get_status(self, website_id):
+        """Get the latest published result for a website, or None"""
+        with self._lock:
+            return self._statuses.get(website_id)
+
+    def get_summary(self):
+        """Get the latest published check summary, or None"""
+        with self._lock:
+            return self._summary
+
+    def get_progress(self):
+        """Get the latest published full-check progress, or None"""
+        with self._lock:
+            return self._progress
+
+    def get_incident_events(self, after=0):
+        """
+        Get the recently published incident openings and resolutions, oldest first
+
+        Args:
+            after (int): Only return events with a larger 'seq'
+        """
+        with self._lock:
+            return [event for event in self._incident_events if event.get('seq', 0) > after]
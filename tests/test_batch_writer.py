@@ -0,0 +1,106 @@
+"""
+Tests for batched database writes and their per-write savepoints
+"""
+import os
+import sys
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_writer import BatchWriter
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'writer.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (value INTEGER UNIQUE)")
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def writer(db_path):
+    # A long batch window so every write in a test shares one transaction
+    writer = BatchWriter(lambda: sqlite3.connect(db_path), batch_ms=500, batch_rows=100)
+    writer.start()
+    yield writer
+    writer.stop()
+
+def stored(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT value FROM items"))
+    finally:
+        conn.close()
+
+def insert(cursor, *values):
+    for value in values:
+        cursor.execute("INSERT INTO items (value) VALUES (?)", (value,))
+    return len(values)
+
+def insert_then_fail(cursor, value):
+    insert(cursor, value)
+    raise RuntimeError('write failed')
+
+def test_failed_write_is_rolled_back_alone(writer, db_path):
+    futures = [
+        writer.submit(insert, 1),
+        writer.submit(insert_then_fail, 2),
+        writer.submit(insert, 3, 4)
+    ]
+
+    assert futures[0].result(timeout=5) == 1
+    with pytest.raises(RuntimeError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 2
+
+    # The failed write's own insert is undone; the rest of its batch commits
+    assert stored(db_path) == [1, 3, 4]
+    stats = writer.get_stats()
+    assert stats['batches'] == 1
+    assert stats['writes'] == 3
+    assert stats['errors'] == 1
+
+def test_constraint_error_rolls_back_the_whole_write(writer, db_path):
+    futures = [writer.submit(insert, 1), writer.submit(insert, 2, 1), writer.submit(insert, 3)]
+
+    assert futures[0].result(timeout=5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 1
+
+    # 2 was inserted before the duplicate failed, and rolled back with it
+    assert stored(db_path) == [1, 3]
+
+def test_flush_waits_for_queued_writes(writer, db_path):
+    writer.submit(insert, 1)
+    writer.submit(insert, 2)
+
+    assert writer.flush(timeout=5)
+    assert stored(db_path) == [1, 2]
+
+def test_stop_commits_queued_writes(db_path):
+    writer = BatchWriter(lambda: sqlite3.connect(db_path), batch_ms=10_000, batch_rows=100)
+    writer.start()
+    future = writer.submit(insert, 1)
+    writer.stop()
+
+    assert future.result(timeout=0) == 1
+    assert stored(db_path) == [1]
+
+def test_batches_are_capped_at_batch_rows(db_path):
+    writer = BatchWriter(lambda: sqlite3.connect(db_path), batch_ms=500, batch_rows=2)
+    writer.start()
+    try:
+        futures = [writer.submit(insert, value) for value in range(5)]
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        writer.stop()
+
+    stats = writer.get_stats()
+    assert stats['writes'] == 5
+    assert stats['largest_batch'] == 2
+    assert stats['batches'] == 3
@@ -0,0 +1,89 @@
+"""
+Tests for the set-based incident updates of bulk check result storage
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager
+
+@pytest.fixture
+def data_manager(tmp_path):
+    data_manager = DataManager(str(tmp_path / 'incidents.db'))
+    data_manager.initialize_database()
+    conn = data_manager._get_connection()
+    conn.executemany("INSERT INTO websites (name, url) VALUES (?, ?)",
+                     [(f"site{i}", f"https://site{i}.example") for i in range(1, 5)])
+    conn.commit()
+    yield data_manager
+    data_manager.close()
+
+def result(is_up, second):
+    return {'is_up': is_up, 'status_code': 200 if is_up else 503,
+            'timestamp': f"2026-01-01T00:00:{second:02d}"}
+
+def incidents(data_manager):
+    rows = data_manager._get_cursor().execute(
+        "SELECT website_id, start_time, end_time, duration, resolved FROM incidents ORDER BY id"
+    ).fetchall()
+    return [tuple(row) for row in rows]
+
+def test_bulk_opens_resolves_and_keeps_incidents(data_manager):
+    events = []
+    data_manager.subscribe_incidents(events.append)
+
+    # Site 1 goes down, site 2 goes down and recovers, site 3 stays up
+    data_manager.store_check_results_bulk([
+        (1, result(False, 0)), (2, result(False, 0)), (3, result(True, 0)),
+        (2, result(True, 10)), (1, result(False, 10))
+    ]).result()
+
+    assert incidents(data_manager) == [
+        (2, '2026-01-01T00:00:00', '2026-01-01T00:00:10', 10, 1),
+        (1, '2026-01-01T00:00:00', None, None, 0)
+    ]
+    assert [(event['event'], event['website_id']) for event in events] == [
+        ('opened', 2), ('resolved', 2), ('opened', 1)
+    ]
+    # Opened events carry the result that opened the incident, for its alert
+    assert all(event['status_code'] == 503 for event in events if event['event'] == 'opened')
+    assert data_manager.refresh_open_incidents() == [1]
+
+    # Site 1 recovers; a later down result for site 4 opens its own incident
+    events.clear()
+    data_manager.store_check_results_bulk([(1, result(True, 30)), (4, result(False, 30))]).result()
+
+    assert incidents(data_manager)[1] == (1, '2026-01-01T00:00:00', '2026-01-01T00:00:30', 30, 1)
+    assert [(event['event'], event['website_id']) for event in events] == [('resolved', 1), ('opened', 4)]
+    assert sorted(data_manager.refresh_open_incidents()) == [4]
+
+def test_bulk_leaves_incidents_resolved_elsewhere(data_manager):
+    data_manager.store_check_results_bulk([(1, result(False, 0))]).result()
+
+    # Another process resolves the incident after this one cached it as open
+    conn = data_manager._get_connection()
+    conn.execute("UPDATE incidents SET resolved = 1, end_time = 'elsewhere', duration = 1")
+    conn.commit()
+
+    events = []
+    data_manager.subscribe_incidents(events.append)
+    data_manager.store_check_results_bulk([(1, result(True, 5))]).result()
+
+    assert incidents(data_manager) == [(1, '2026-01-01T00:00:00', 'elsewhere', 1, 1)]
+    assert events == []
+
+def test_bulk_does_not_duplicate_an_incident_opened_elsewhere(data_manager):
+    data_manager.refresh_open_incidents()
+
+    # Another process opens an incident after this one loaded its cache
+    conn = data_manager._get_connection()
+    conn.execute("INSERT INTO incidents (website_id, start_time) VALUES (1, '2026-01-01T00:00:00')")
+    conn.commit()
+
+    data_manager.store_check_results_bulk([(1, result(False, 5))]).result()
+
+    assert incidents(data_manager) == [(1, '2026-01-01T00:00:00', None, None, 0)]
+    assert data_manager.refresh_open_incidents() == [1]
@@ -0,0 +1,233 @@
+"""
+Tests for per-website check scheduling
+"""
+import os
+import sys
+import time
+import zlib
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from check_scheduler import CheckScheduler, AdaptiveIntervalPolicy
+
+class InstantPool:
+    """Stands in for a CheckPool, completing every check as soon as it is submitted"""
+
+    max_workers = 10
+
+    def __init__(self):
+        self.submitted = []
+        self._lock = threading.Lock()
+
+    def submit(self, website, on_result=None, on_done=None, on_start=None):
+        with self._lock:
+            self.submitted.append((website['id'], time.time()))
+        if on_start:
+            on_start()
+        if on_result:
+            on_result(website, {'is_up': True, 'status_code': 200})
+        if on_done:
+            on_done()
+
+    def backlog(self):
+        return 0
+
+    def get_stats(self):
+        return {}
+
+    def count(self, website_id):
+        with self._lock:
+            return sum(1 for submitted_id, _ in self.submitted if submitted_id == website_id)
+
+def website(website_id, interval=None, **fields):
+    return dict(fields, id=website_id, url=f"https://site{website_id}.example",
+                check_interval_seconds=interval)
+
+def make_scheduler(websites, **kwargs):
+    return CheckScheduler(InstantPool(), lambda: list(websites), default_interval=300, **kwargs)
+
+def test_phase_offset_is_a_stable_hash_of_the_id():
+    scheduler = make_scheduler([])
+    site = website(42, interval=60)
+
+    expected = zlib.crc32(b'42') / 2 ** 32 * 60
+    assert scheduler.phase_offset(site) == expected
+    assert scheduler.phase_offset(dict(site)) == expected
+    assert 0 <= expected < 60
+
+def test_phase_offsets_spread_sites_over_the_interval():
+    scheduler = make_scheduler([])
+    offsets = sorted(scheduler.phase_offset(website(website_id, interval=60)) for website_id in range(1, 201))
+
+    # Every tenth of the interval holds some of the 200 sites
+    assert {int(offset // 6) for offset in offsets} == set(range(10))
+
+@pytest.mark.parametrize('after', [0.0, 1000.0, 1234.5, 1_700_000_017.25])
+def test_next_slot_is_the_first_phase_slot_after(after):
+    scheduler = make_scheduler([])
+    site = website(7, interval=30)
+    offset = scheduler.phase_offset(site)
+
+    slot = scheduler.next_slot(site, after)
+    assert after < slot <= after + 30
+    assert (slot - offset) % 30 == pytest.approx(0, abs=1e-6)
+
+def test_next_slot_uses_the_default_interval():
+    scheduler = make_scheduler([])
+    site = website(7)
+    assert scheduler.interval_for(site) == 300
+    assert scheduler.next_slot(site, 1000.0) - scheduler.next_slot(site, 999.0) in (0, 300)
+
+def test_jitter_never_moves_a_check_past_half_its_interval():
+    scheduler = make_scheduler([], jitter=1000)
+    site = website(3, interval=10)
+
+    for _ in range(200):
+        with scheduler._lock:
+            scheduler._schedule(site, 100.0)
+        assert 100.0 <= scheduler._due[3] <= 105.0
+
+def test_jitter_is_added_on_top_of_the_slot():
+    scheduler = make_scheduler([], jitter=2)
+    site = website(3, interval=60)
+
+    dues = set()
+    for _ in range(50):
+        with scheduler._lock:
+            scheduler._schedule(site, 100.0)
+        dues.add(scheduler._due[3])
+    assert all(100.0 <= due <= 102.0 for due in dues)
+    assert len(dues) > 1
+
+def test_heap_dispatches_each_site_on_its_own_interval():
+    sites = [website(1, interval=1), website(2, interval=3600)]
+    scheduler = make_scheduler(sites)
+    scheduler.start(first_check_now=True)
+    try:
+        time.sleep(2.5)
+    finally:
+        scheduler.shutdown()
+
+    # Both checked at start; the 1s site then on each of its slots, the hourly one not again
+    assert 3 <= scheduler.check_pool.count(1) <= 4
+    assert scheduler.check_pool.count(2) == 1
+
+    # The 1s site's later checks land on its phase slots
+    offset = scheduler.phase_offset(sites[0])
+    for website_id, submitted_at in scheduler.check_pool.submitted[2:]:
+        assert website_id == 1
+        assert (submitted_at - offset) % 1 < 0.3
+
+def test_stale_heap_entries_are_not_dispatched():
+    scheduler = make_scheduler([website(1, interval=60)])
+    scheduler.reload(first_check_now=False)
+
+    # Moving an overdue site to a later slot pushes a new entry and leaves the old one in the heap
+    site = scheduler._websites[1]
+    with scheduler._lock:
+        scheduler._schedule(site, time.time() - 1, jitter=False)
+        scheduler._schedule(site, time.time() + 3600, jitter=False)
+    assert len(scheduler._heap) == 3
+
+    scheduler._next_reload = scheduler._next_summary = time.time() + 3600
+    thread = threading.Thread(target=scheduler._loop, daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.2)
+    finally:
+        scheduler.shutdown()
+        thread.join(timeout=5)
+    assert scheduler.check_pool.count(1) == 0
+
+def test_loop_wakes_for_a_site_moved_sooner():
+    scheduler = make_scheduler([website(1, interval=3600)])
+    scheduler.start()
+    try:
+        # The loop is now sleeping until the site's slot, up to an hour away
+        time.sleep(0.1)
+        site = scheduler._websites[1]
+        with scheduler._lock:
+            scheduler._schedule(site, time.time(), jitter=False)
+        scheduler._wake.set()
+
+        give_up_at = time.time() + 2
+        while not scheduler.check_pool.count(1) and time.time() < give_up_at:
+            time.sleep(0.01)
+    finally:
+        scheduler.shutdown()
+    assert scheduler.check_pool.count(1) == 1
+
+@pytest.fixture
+def policy():
+    return AdaptiveIntervalPolicy(confirmation_interval=30, stable_after=10, backoff_factor=2,
+                                  min_interval=30, max_interval=3600, recovery_checks=3)
+
+def test_policy_keeps_the_base_interval_until_stable(policy):
+    assert policy.interval(website(1), 300, streak=0) == 300
+    assert policy.interval(website(1), 300, streak=9) == 300
+
+def test_policy_backs_off_each_stable_run_up_to_the_maximum(policy):
+    assert policy.interval(website(1), 300, streak=10) == 600
+    assert policy.interval(website(1), 300, streak=25) == 1200
+    assert policy.interval(website(1), 300, streak=10_000) == 3600
+
+def test_policy_rechecks_failing_sites_at_the_confirmation_interval(policy):
+    assert policy.interval(website(1), 300, streak=50, failing=True) == 30
+
+def test_policy_never_rechecks_a_failing_site_slower_than_its_base_interval(policy):
+    # A 10s site is below the policy's minimum and its confirmation interval
+    assert policy.interval(website(1), 10, failing=True) == 10
+    assert policy.interval(website(1), 10) == 10
+
+def test_policy_respects_per_site_bounds(policy):
+    site = website(1, min_check_interval_seconds=60, max_check_interval_seconds=900)
+    assert policy.interval(site, 300, failing=True) == 60
+    assert policy.interval(site, 300, streak=100) == 900
+
+def test_policy_widens_its_bounds_to_the_base_interval(policy):
+    # An hourly site isn't forced faster than its own schedule by the policy's maximum
+    assert policy.bounds(website(1), 7200) == (30, 7200)
+    assert policy.interval(website(1), 7200) == 7200
+
+def test_policy_failure_resets_the_streak_until_recovered(policy):
+    state = {'streak': 0, 'failing': False}
+    for _ in range(12):
+        policy.update(state, {'is_up': True})
+    assert state == {'streak': 12, 'failing': False}
+
+    policy.update(state, {'is_up': False})
+    assert state == {'streak': 0, 'failing': True}
+
+    # Confirmed only after recovery_checks passes in a row
+    policy.update(state, {'is_up': True})
+    policy.update(state, {'is_up': True})
+    assert state == {'streak': 2, 'failing': True}
+    policy.update(state, {'is_up': True})
+    assert state == {'streak': 3, 'failing': False}
+
+def test_policy_treats_a_check_that_needed_retries_as_failing(policy):
+    state = {'streak': 20, 'failing': False}
+    policy.update(state, {'is_up': True, 'retry_count': 1})
+    assert state == {'streak': 0, 'failing': True}
+
+def test_scheduler_rechecks_a_failing_site_sooner(policy):
+    scheduler = make_scheduler([website(1, interval=600)], policy=policy)
+    scheduler.reload(first_check_now=False)
+    site = scheduler._websites[1]
+
+    scheduler._handle_result(site, {'is_up': False})
+
+    assert scheduler.interval_for(site) == 30
+    assert scheduler._slot[1] <= time.time() + 30
+    assert scheduler._stats()['confirming'] == 1
+
+def test_scheduler_treats_sites_with_open_incidents_as_failing(policy):
+    scheduler = make_scheduler([website(1, interval=600), website(2, interval=600)], policy=policy,
+                               load_open_incidents=lambda: [2])
+    scheduler.reload(first_check_now=False)
+
+    assert scheduler.interval_for(scheduler._websites[1]) == 600
+    assert scheduler.interval_for(scheduler._websites[2]) == 30
@@ -0,0 +1,120 @@
+"""
+Tests for reading the peer certificate from a pooled HTTPS check's own connection
+"""
+import os
+import sys
+import ssl
+import threading
+import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_pool import SessionPool
+
+@pytest.fixture(scope='module')
+def certificate(tmp_path_factory):
+    """A self-signed certificate for localhost, as (cert path, key path, DER bytes)"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=30))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+
+    directory = tmp_path_factory.mktemp('tls')
+    cert_path = directory / 'cert.pem'
+    key_path = directory / 'key.pem'
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM,
+                                           serialization.PrivateFormat.TraditionalOpenSSL,
+                                           serialization.NoEncryption()))
+    return str(cert_path), str(key_path), cert.public_bytes(serialization.Encoding.DER)
+
+class CountingHTTPSServer(ThreadingHTTPServer):
+    """Serves HTTPS and counts the connections (and so the handshakes) it accepts"""
+
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        sock, address = super().get_request()
+        self.connections += 1
+        return sock, address
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = 5
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server(certificate):
+    cert_path, key_path, _ = certificate
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+
+    server = CountingHTTPSServer(('127.0.0.1', 0), OkHandler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_cold_https_request_records_its_own_certificate(certificate, server):
+    cert_path, _, der = certificate
+    port = server.server_address[1]
+    sessions = SessionPool()
+    try:
+        response, timing = sessions.request('GET', f"https://localhost:{port}/", verify=cert_path, timeout=5)
+        assert response.status_code == 200
+        response.close()
+    finally:
+        sessions.close()
+
+    # The certificate came from the request's own, newly opened connection
+    assert timing['new_connections'] == 1
+    assert server.connections == 1
+    peer_certificate = timing['certificates'][('localhost', port)]
+    assert peer_certificate['der'] == der
+    assert ('commonName', 'localhost') in peer_certificate['cert']['subject'][0]
+
+def test_reused_connection_records_its_certificate_again(certificate, server):
+    cert_path, _, der = certificate
+    port = server.server_address[1]
+    sessions = SessionPool()
+    try:
+        for _ in range(2):
+            response, timing = sessions.request('GET', f"https://localhost:{port}/", verify=cert_path, timeout=5)
+            response.content
+            response.close()
+    finally:
+        sessions.close()
+
+    # The second request reused the keep-alive connection without a new handshake
+    assert timing['new_connections'] == 0
+    assert server.connections == 1
+    assert timing['certificates'][('localhost', port)]['der'] == der
@@ -0,0 +1,57 @@
+"""
+Query plan regression tests for the time-range queries on check_results
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager
+
+INDEX_NAME = 'idx_check_results_website_time'
+
+@pytest.fixture
+def data_manager(tmp_path):
+    data_manager = DataManager(str(tmp_path / 'plans.db'))
+    data_manager.initialize_database()
+    yield data_manager
+    data_manager.close()
+
+def captured_queries(data_manager, method, *args):
+    """Run a DataManager method and return the check_results SELECTs it executed, with values bound"""
+    statements = []
+    conn = data_manager._get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        method(*args)
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements
+            if sql.lstrip().upper().startswith('SELECT') and 'check_results' in sql]
+
+@pytest.mark.parametrize('method_name', [
+    'get_uptime_percentage',
+    'get_response_time_stats',
+    'get_daily_stats'
+])
+def test_time_range_query_uses_website_time_index(data_manager, method_name):
+    queries = captured_queries(data_manager, getattr(data_manager, method_name), 1, 30)
+    assert queries, f"{method_name} ran no query on check_results"
+
+    for sql in queries:
+        plan = data_manager._get_connection().execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+        details = [row['detail'] for row in plan]
+        assert any(detail.startswith('SEARCH') and INDEX_NAME in detail and 'timestamp>' in detail
+                   for detail in details), f"{method_name} does not seek {INDEX_NAME}: {details}"
+
+def test_dispatch_histogram_seeks_website_time_index(data_manager):
+    queries = captured_queries(data_manager, data_manager.get_dispatch_histogram, 60, 10)
+    assert queries, "get_dispatch_histogram ran no query on check_results"
+
+    for sql in queries:
+        plan = data_manager._get_connection().execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+        details = [row['detail'] for row in plan]
+        assert not any(detail.startswith('SCAN check_results') for detail in details), \
+            f"get_dispatch_histogram scans check_results: {details}"
@@ -0,0 +1,109 @@
+"""
+Tests for chunked check result storage
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_buffer import ResultBuffer
+
+class RecordingStore:
+    """Stands in for a DataManager; stores complete at once, or fail when told to"""
+
+    def __init__(self, fail=False, complete=True):
+        self.fail = fail
+        self.complete = complete
+        self.chunks = []
+        self.singles = []
+        self.futures = []
+
+    def _future(self, value):
+        future = Future()
+        self.futures.append(future)
+        if self.complete:
+            if self.fail:
+                future.set_exception(RuntimeError('disk full'))
+            else:
+                future.set_result(value)
+        return future
+
+    def store_check_results_bulk(self, results):
+        self.chunks.append(list(results))
+        return self._future(len(results))
+
+    def store_check_result(self, website_id, result):
+        self.singles.append(website_id)
+        return self._future(None)
+
+def wait_for(condition, timeout=2):
+    give_up_at = time.monotonic() + timeout
+    while not condition() and time.monotonic() < give_up_at:
+        time.sleep(0.01)
+    return condition()
+
+def test_full_chunks_are_stored_at_once():
+    store = RecordingStore()
+    buffer = ResultBuffer(store, max_rows=3, max_age_ms=60_000)
+    for website_id in range(7):
+        buffer.add(website_id, {'is_up': True})
+
+    assert [len(chunk) for chunk in store.chunks] == [3, 3]
+    buffer.close()
+    assert [len(chunk) for chunk in store.chunks] == [3, 3, 1]
+
+def test_one_flusher_thread_stores_chunks_by_age():
+    store = RecordingStore()
+    buffer = ResultBuffer(store, max_rows=100, max_age_ms=20)
+    threads_before = threading.active_count()
+
+    for round_number in range(5):
+        buffer.add(round_number, {'is_up': True})
+        assert wait_for(lambda: len(store.chunks) == round_number + 1)
+
+    # Every chunk was stored by the same long-lived thread
+    assert threading.active_count() <= threads_before + 1
+    assert [chunk[0][0] for chunk in store.chunks] == list(range(5))
+
+    buffer.close()
+    assert wait_for(lambda: buffer._flusher is None)
+
+def test_results_after_close_are_stored_one_by_one():
+    store = RecordingStore()
+    buffer = ResultBuffer(store, max_rows=100, max_age_ms=60_000)
+    buffer.add(1, {'is_up': True})
+    buffer.close()
+    buffer.add(2, {'is_up': False})
+
+    assert store.chunks == [[(1, {'is_up': True})]]
+    assert store.singles == [2]
+
+def test_committed_and_failed_futures_are_dropped(caplog):
+    store = RecordingStore(fail=True)
+    buffer = ResultBuffer(store, max_rows=2, max_age_ms=60_000)
+
+    with caplog.at_level(logging.ERROR, logger='result_buffer'):
+        for website_id in range(4):
+            buffer.add(website_id, {'is_up': True})
+
+    # Both failed chunks were logged once and not kept
+    assert buffer.flush() == []
+    assert [record.getMessage() for record in caplog.records] == [
+        '2 check results could not be stored: disk full'
+    ] * 2
+
+def test_flush_returns_only_chunks_not_committed_yet():
+    store = RecordingStore(complete=False)
+    buffer = ResultBuffer(store, max_rows=2, max_age_ms=60_000)
+    for website_id in range(3):
+        buffer.add(website_id, {'is_up': True})
+
+    pending = buffer.close()
+    assert len(pending) == 2
+
+    store.futures[0].set_result(2)
+    assert buffer.flush() == [store.futures[1]]
@@ -0,0 +1,118 @@
+"""
+Tests for retry backoff and deferred retries on the check pool
+"""
+import os
+import sys
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from check_pool import CheckPool
+from domain_monitor import DomainMonitor
+
+@pytest.fixture
+def monitor():
+    return DomainMonitor(retry_attempts=4, retry_backoff=1.0, retry_backoff_max=5.0,
+                         retry_jitter=0, timeout=1, check_deadline=60)
+
+def failed(phase='http', status_code=None):
+    return {'url': 'https://example.com', 'is_up': False, 'status_code': status_code,
+            'failed_phase': phase, 'error': 'failed'}
+
+def test_retry_delay_doubles_up_to_the_cap(monitor):
+    assert [monitor.retry_delay(attempt) for attempt in range(1, 6)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+def test_retry_delay_jitter_only_shortens_the_delay(monitor, monkeypatch):
+    monitor.retry_jitter = 0.5
+    monkeypatch.setattr('domain_monitor.random.random', lambda: 1.0)
+    assert monitor.retry_delay(2) == 1.0
+    monkeypatch.setattr('domain_monitor.random.random', lambda: 0.0)
+    assert monitor.retry_delay(2) == 2.0
+
+def test_next_retry_delay_retries_connection_failures(monitor):
+    assert monitor.next_retry_delay(failed(), 1, time.monotonic()) == 1.0
+    assert monitor.next_retry_delay(failed(), 3, time.monotonic()) == 4.0
+
+@pytest.mark.parametrize('result', [
+    failed(status_code=503),
+    failed(phase='dns'),
+    dict(failed(), is_up=True, status_code=200)
+])
+def test_next_retry_delay_does_not_retry_answers_or_dns_failures(monitor, result):
+    assert monitor.next_retry_delay(result, 1, time.monotonic()) is None
+
+def test_next_retry_delay_stops_after_the_last_attempt(monitor):
+    assert monitor.next_retry_delay(failed(), 4, time.monotonic()) is None
+
+def test_next_retry_delay_stops_at_the_check_deadline(monitor):
+    result = failed()
+    # 58s in, a 1s backoff and a 1s timeout would end past the 60s deadline
+    assert monitor.next_retry_delay(result, 1, time.monotonic() - 58.5) is None
+    assert result['deadline_exceeded']
+
+
+class FlakyMonitor:
+    """Fails each URL's first `failures` attempts, retrying after `delay` seconds"""
+
+    def __init__(self, failures, delay):
+        self.failures = failures
+        self.delay = delay
+        self.attempts = {}
+        self.calls = []
+        self._lock = threading.Lock()
+        self.resolver = SimpleNamespace(resolve=lambda hostname: hostname)
+
+    def check_domain(self, url, check_ssl=True, check_security=True, max_attempts=None):
+        with self._lock:
+            self.attempts[url] = self.attempts.get(url, 0) + 1
+            self.calls.append(url)
+            attempt = self.attempts[url]
+        if attempt <= self.failures.get(url, 0):
+            return dict(failed(), url=url)
+        return {'url': url, 'is_up': True, 'status_code': 200, 'failed_phase': None}
+
+    def next_retry_delay(self, result, attempts, started_at):
+        return None if result['is_up'] else self.delay
+
+    def record_attempts(self, result, attempts, started_at):
+        result['retry_count'] = attempts - 1
+
+
+def test_check_pool_defers_retries_without_holding_a_worker():
+    monitor = FlakyMonitor({'https://flaky.example': 2}, delay=0.2)
+    pool = CheckPool(monitor, max_workers=1)
+    results = []
+    try:
+        stats = pool.run_cycle(
+            [{'url': 'https://flaky.example'}, {'url': 'https://steady.example'}],
+            on_result=lambda website, result: results.append((website['url'], result['retry_count'])),
+            deadline=5
+        )
+    finally:
+        pool.shutdown()
+
+    # The steady site ran while the flaky one waited out its backoff on the only worker
+    assert monitor.calls[:2] == ['https://flaky.example', 'https://steady.example']
+    assert results == [('https://steady.example', 0), ('https://flaky.example', 2)]
+    assert stats['retries'] == 2
+    assert not stats['deadline_exceeded']
+
+def test_check_pool_submit_reports_done_once_after_retries():
+    monitor = FlakyMonitor({'https://flaky.example': 1}, delay=0.05)
+    pool = CheckPool(monitor, max_workers=2)
+    results = []
+    done = threading.Event()
+    try:
+        pool.submit({'url': 'https://flaky.example'},
+                    on_result=lambda website, result: results.append(result['retry_count']),
+                    on_done=done.set)
+        assert done.wait(timeout=5)
+    finally:
+        pool.shutdown()
+
+    assert results == [1]
+    assert monitor.attempts['https://flaky.example'] == 2
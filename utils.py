@@ -4,16 +4,19 @@ Utility functions for the Personal Domain Health Monitor
 import re
 import socket
 from urllib.parse import urlparse
-import platform
-import subprocess
 import logging
 import datetime
-import matplotlib.pyplot as plt
 import io
 import base64
-import pandas as pd
 from pathlib import Path
 
+from latency_probe import LatencyProbe
+from lazy_imports import lazy_import
+
+# Only the chart helpers need these; headless checks never import the plotting stack
+pd = lazy_import('pandas')
+plt = lazy_import('matplotlib.pyplot')
+
 logger = logging.getLogger(__name__)
 
 def is_valid_url(url):
@@ -216,18 +219,22 @@ def generate_response_time_chart(daily_stats, days=30):
         logger.error(f"Error generating response time chart: {str(e)}")
         return None
 
-def can_resolve_domain(domain):
+def can_resolve_domain(domain, resolver=None):
     """
     Check if a domain can be resolved via DNS
     
     Args:
         domain (str): Domain name
+        resolver (DNSCache, optional): Shared resolver cache to use
         
     Returns:
         bool: True if resolvable, False otherwise
     """
     try:
-        socket.gethostbyname(domain)
+        if resolver is not None:
+            resolver.resolve(domain)
+        else:
+            socket.gethostbyname(domain)
         return True
     except socket.gaierror:
         return False
@@ -245,59 +252,9 @@ def ping_host(host, count=1, timeout=2):
         dict: Ping statistics or None if failed
     """
     try:
-        # Determine command based on platform
-        param = '-n' if platform.system().lower() == 'windows' else '-c'
-        timeout_param = '-w' if platform.system().lower() == 'windows' else '-W'
-        
-        # Build command
-        command = ['ping', param, str(count), timeout_param, str(timeout), host]
-        
-        # Execute command
-        output = subprocess.check_output(command, universal_newlines=True)
-        
-        # Parse output
-        if platform.system().lower() == 'windows':
-            # Windows output parsing
-            try:
-                time_ms = re.search(r'Average = (\d+)ms', output)
-                time_ms = int(time_ms.group(1)) if time_ms else None
-                
-                loss = re.search(r'Lost = (\d+)', output)
-                loss_count = int(loss.group(1)) if loss else None
-                
-                return {
-                    'min': time_ms,
-                    'avg': time_ms,
-                    'max': time_ms,
-                    'loss': (loss_count / count) * 100 if loss_count is not None else None
-                }
-            except:
-                return None
-        else:
-            # Unix output parsing
-            try:
-                # Extract times (min/avg/max/mdev)
-                times = re.search(r'= ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)', output)
-                if times:
-                    min_time = float(times.group(1))
-                    avg_time = float(times.group(2))
-                    max_time = float(times.group(3))
-                else:
-                    min_time = avg_time = max_time = None
-                
-                # Extract packet loss
-                loss = re.search(r'(\d+)% packet loss', output)
-                loss_pct = int(loss.group(1)) if loss else None
-                
-                return {
-                    'min': min_time,
-                    'avg': avg_time,
-                    'max': max_time,
-                    'loss': loss_pct
-                }
-            except:
-                return None
-    except:
+        return LatencyProbe(timeout=timeout).probe(host, count=count)
+    except Exception as e:
+        logger.error(f"Error probing {host}: {str(e)}")
         return None
 
 def create_default_config_file(config_path="config.yaml"):
@@ -320,7 +277,34 @@ def create_default_config_file(config_path="config.yaml"):
         "monitor_settings": {
             "check_interval_minutes": 5,
             "retry_attempts": 2,
-            "connection_timeout": 10
+            "connection_timeout": 10,
+            "check_concurrency": 20,
+            "per_host_concurrency": 4,
+            "check_engine": "threads",
+            "ping_method": "auto",
+            "ssl_cache_ttl_hours": 6,
+            "ssl_refresh_days": 14,
+            "dns_cache_ttl_seconds": 300,
+            "retry_backoff_seconds": 1,
+            "retry_backoff_max_seconds": 30,
+            "retry_jitter": 0.5,
+            "check_deadline_seconds": 60,
+            "dispatch_jitter_seconds": 0,
+            "adaptive_scheduling": True,
+            "confirmation_interval_seconds": 30,
+            "stable_after_checks": 10,
+            "interval_backoff_factor": 1.5,
+            "min_check_interval_seconds": 30,
+            "max_check_interval_seconds": 3600,
+            "overrun_mode": "coalesce",
+            "cycle_deadline_seconds": 0,
+            "max_scheduler_lag_seconds": 30,
+            "shard_count": 1,
+            "status_channel_port": 5055,
+            "instance_id": "",
+            "lease_seconds": 90,
+            "write_batch_ms": 50,
+            "write_batch_rows": 500
         },
         "email_settings": {
             "smtp_server": "smtp.gmail.com",
@@ -337,7 +321,11 @@ def create_default_config_file(config_path="config.yaml"):
         "http_settings": {
             "default_headers": {
                 "User-Agent": "Domain-Health-Monitor/1.0"
-            }
+            },
+            "pool_maxsize": 10,
+            "idle_timeout": 120,
+            "max_body_bytes": 1048576,
+            "body_hash": "sha256"
         }
     }
     
@@ -16,7 +16,9 @@ class WebsiteManager:
     
     def add_website(self, name, url, description=None, check_ssl=True, 
                    check_security=True, alerts_enabled=True, 
-                   alert_emails=None, alert_phone=None):
+                   alert_emails=None, alert_phone=None, check_interval_seconds=None,
+                   min_check_interval_seconds=None, max_check_interval_seconds=None,
+                   priority='normal'):
         """
         Add a new website to monitor
         
@@ -29,6 +31,10 @@ class WebsiteManager:
             alerts_enabled (bool): Whether alerts are enabled
             alert_emails (list, optional): List of email addresses for alerts
             alert_phone (str, optional): Phone number for SMS alerts
+            check_interval_seconds (int, optional): Seconds between checks, None for the global interval
+            min_check_interval_seconds (int, optional): Fastest adaptive check interval
+            max_check_interval_seconds (int, optional): Slowest adaptive check interval
+            priority (str): 'high', 'normal' or 'low'; low-priority checks are deferred when the monitor falls behind
             
         Returns:
             int: ID of the new website, or None if failed
@@ -47,11 +53,13 @@ class WebsiteManager:
             cursor.execute('''
             INSERT INTO websites (
                 name, url, description, check_ssl, check_security,
-                alerts_enabled, alert_emails, alert_phone
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                alerts_enabled, alert_emails, alert_phone, check_interval_seconds,
+                min_check_interval_seconds, max_check_interval_seconds, priority
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 name, url, description, check_ssl, check_security,
-                alerts_enabled, alert_emails_json, alert_phone
+                alerts_enabled, alert_emails_json, alert_phone, check_interval_seconds,
+                min_check_interval_seconds, max_check_interval_seconds, priority or 'normal'
             ))
             
             conn.commit()
@@ -89,7 +97,8 @@ class WebsiteManager:
         
         for key, value in kwargs.items():
             if key in ['name', 'url', 'description', 'check_ssl', 'check_security',
-                      'alerts_enabled', 'alert_emails', 'alert_phone']:
+                      'alerts_enabled', 'alert_emails', 'alert_phone', 'check_interval_seconds',
+                      'min_check_interval_seconds', 'max_check_interval_seconds', 'priority']:
                 fields.append(f"{key} = ?")
                 values.append(value)
         
@@ -0,0 +1,103 @@
+"""
+Lease-based work sharing between checker instances for the Personal Domain Health Monitor
+"""
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class WorkLeases:
+    """
+    Decides which websites this checker instance is responsible for.
+
+    Instances sharing one database each hold time-bounded leases on an equal
+    share of the sites (see DataManager.claim_leases). A heartbeat thread
+    renews them every third of ``lease_seconds`` while the instance is alive;
+    when an instance stops, its leases expire and the others take its sites
+    over on their next claim.
+    """
+
+    def __init__(self, data_manager, instance_id, lease_seconds=90):
+        self.data_manager = data_manager
+        self.instance_id = instance_id
+        self.lease_seconds = max(3, lease_seconds)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._held = set()
+        # Until when the held leases are known to be valid
+        self._valid_until = 0.0
+
+    def start(self):
+        """Start renewing leases in the background"""
+        self._thread = threading.Thread(target=self._heartbeat, name='work-leases', daemon=True)
+        self._thread.start()
+        logger.info(f"Sharing checks as instance '{self.instance_id}' with {self.lease_seconds}s leases")
+
+    def stop(self):
+        """Stop renewing and release every lease so peers take over at once"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.data_manager.release_leases(self.instance_id)
+        with self._lock:
+            self._held = set()
+
+    def claim(self, websites):
+        """
+        Claim this instance's share of the websites
+
+        Args:
+            websites (list): All website dicts
+
+        Returns:
+            list: The website dicts this instance should check
+        """
+        now = time.time()
+        held = self.data_manager.claim_leases(
+            self.instance_id, [website['id'] for website in websites], self.lease_seconds
+        )
+
+        with self._lock:
+            if held is not None:
+                self._update(set(held), now)
+            elif now >= self._valid_until:
+                # Can't reach the database and our leases may have lapsed; a
+                # peer may own these sites now, so stop checking them
+                self._held = set()
+            held = self._held
+
+        return [website for website in websites if website['id'] in held]
+
+    def holds(self, website_id):
+        """Whether this instance currently holds the lease for a website"""
+        with self._lock:
+            return website_id in self._held and time.time() < self._valid_until
+
+    def _update(self, held, now):
+        """Record the leases held after a claim or renewal; must hold the lock"""
+        gained, lost = held - self._held, self._held - held
+        if gained or lost:
+            logger.info(f"Now holding {len(held)} leases (+{len(gained)} -{len(lost)})")
+        self._held = held
+        self._valid_until = now + self.lease_seconds
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            now = time.time()
+            held = self.data_manager.renew_leases(self.instance_id, self.lease_seconds)
+            if held is None:
+                continue
+            with self._lock:
+                self._update(set(held), now)
+
+    def get_stats(self):
+        """Return lease counters"""
+        with self._lock:
+            return {
+                'instance_id': self.instance_id,
+                'lease_seconds': self.lease_seconds,
+                'held': len(self._held)
+            }